@@ -5,32 +5,107 @@ import json
 import os
 import sys
 import logging
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
-from reportlab.pdfgen import canvas
-from PIL import Image as PILImage, ImageDraw, ImageFont
-
-# Konfigurer logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('it_risikovurdering.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+import argparse
+import importlib
+import queue
+import threading
+import time
+
+import arkiv
+import autogem
+import lager
+import logopsaetning
+import risikomotor
+import virtuel_liste
+
+# PDF-stakken (reportlab) indlæses først når den skal bruges, eller
+# i baggrunden når hovedvinduet er vist, så programmet starter hurtigere
+RAPPORT_MODUL = "rapport"
+
+
+def hent_rapport_modul():
+    """Returnerer rapport-modulet og indlæser det ved første kald"""
+    return importlib.import_module(RAPPORT_MODUL)
+
+
+def forvarm_rapport_modul():
+    """Indlæser PDF-stakken i en baggrundstråd mens brugeren arbejder"""
+    threading.Thread(target=hent_rapport_modul, name="forvarm-rapport", daemon=True).start()
+
+
+# Hvor ofte Tk-tråden henter meldinger fra en igangværende PDF eksport
+PDF_POLL_MS = 100
+
+
+class PdfEksport:
+    """Bygger en PDF-rapport i en baggrundstråd.
+
+    Tråden lægger sine meldinger i en kø, som Tk-tråden tømmer med after(),
+    så vinduet kan bruges mens rapporten bygges. Rapporten bygges af et
+    øjebliksbillede af vurderingen, så brugeren kan redigere videre imens.
+    Meldingerne er ('fremskridt', (andel, tekst)) og til sidst én af
+    ('faerdig', None), ('annulleret', None) eller ('fejl', tekst).
+    """
+
+    def __init__(self, data, filename):
+        self.filename = filename
+        self.meldinger = queue.Queue()
+        self.annulleret = threading.Event()
+        self._traad = threading.Thread(target=self._koer, args=(data,), name="pdf-eksport", daemon=True)
+        self._traad.start()
+
+    def annuller(self):
+        """Beder tråden stoppe; filen røres ikke hvis rapporten ikke er færdig"""
+        self.annulleret.set()
+
+    def _koer(self, data):
+        try:
+            rapport = hent_rapport_modul()
+        except Exception as e:
+            logger.exception("PDF-stakken kunne ikke indlæses")
+            self.meldinger.put(('fejl', str(e)))
+            return
+        try:
+            rapport.byg_pdf(data, self.filename, self._fremskridt, self.annulleret)
+        except rapport.Annulleret:
+            self.meldinger.put(('annulleret', None))
+        except Exception as e:
+            logger.exception("Fejl under PDF eksport")
+            self.meldinger.put(('fejl', str(e)))
+        else:
+            self.meldinger.put(('faerdig', None))
+
+    def _fremskridt(self, andel, tekst):
+        self.meldinger.put(('fremskridt', (andel, tekst)))
+
+
+# Porteføljeoverblikket kræver NumPy, som kun indlæses når overblikket åbnes
+PORTEFOELJE_MODUL = "portefoelje"
+
+# Samme farver som risikomatrixen i PDF-rapporten
+RISIKO_FARVER = {"Lav": "#008000", "Middel": "#ffff00", "Høj": "#ffa500", "Kritisk": "#ff0000"}
+
+logger = logging.getLogger(__name__)
 
 class ITRisikovurderingsApp:
-    def __init__(self, master):
+    def __init__(self, master, database=lager.STANDARD_DB):
         self.master = master
         self.master.title("IT Risikovurdering v1.0.0")
         self.master.geometry("1200x800")
         
         # Program information
         self.VERSION = "1.0.0"
+        
+        # Gemte vurderinger ligger i SQLite; vurdering_id er den åbne vurderings række
+        self.lager = lager.Lager(database)
+        self.vurdering_id = None
+
+        # Hver ændring journaliseres i baggrunden, så et nedbrud ikke koster ugemt arbejde
+        self.autogem = autogem.Autogemmer(self.saml_vurdering_data, autogem.journal_mappe(database))
+        self._beskrivelse_after = None
+        self.pdf_eksport = None
+        # Sand mens en vurdering indlæses, så ændringshåndteringen springes over
+        self._indlaeser = False
         self.DEVELOPER = "Alfred Lysholm Clausen"
         self.SUPPORT_EMAIL = "alcla@trafikstyrelsen.dk"
         self.SUPPORT_PHONE = "+4541781909"
@@ -141,21 +216,43 @@ class ITRisikovurderingsApp:
         self.assessment_responsible = tk.StringVar()
         self.assessment_date = tk.StringVar()
         
-        # Initialiser variabler for vurderinger
-        self.kritikalitet_vars = {}
-        self.gdpr_vars = {}
-        self.fortrolighed_vars = {}
-        self.integritet_vars = {}
-        self.robusthed_vars = {}
-        self.tilgaengelighed_vars = {}
+        # Versionstæller pr. kategori, som tælles op ved hver ændring. Den
+        # samlede rapport husker hvilken version den sidst viste, og opdaterer
+        # kun de sektioner hvor versionen er ændret
+        self.versioner = dict.fromkeys(('system_info',) + risikomotor.KATEGORIER, 0)
+        self.rapport_versioner = {}
+        self.system_felter = {"navn": self.system_name, "ejer": self.system_owner,
+                              "leverandør": self.system_supplier, "ansvarlig": self.assessment_responsible,
+                              "dato": self.assessment_date}
+        for felt, var in self.system_felter.items():
+            var.trace_add('write', lambda *args, felt=felt, var=var: self.ved_system_aendring(felt, var.get()))
+        
+        # Initialiser variabler for vurderinger. Svarene oprettes her og ikke
+        # når fanerne bygges, så de findes uanset hvilke faner der er åbnet.
+        # Rækkefølgen følger kataloget, så position i dict = spørgsmålets indeks
+        for kategori in risikomotor.KATALOG:
+            setattr(self, f"{kategori.noegle}_vars",
+                    {sp.tekst: tk.StringVar(value=kategori.standardsvar) for sp in kategori.spoergsmaal})
+        
+        # Svarene og de afledte tal holdes uden for widgets, så et klik kun
+        # justerer de løbende scorer og beregningerne aldrig læser en label
+        self.tilstand = risikomotor.Vurderingstilstand()
         
         # Initialiser kommentar dictionaries
-        self.kritikalitet_comments = {}
-        self.gdpr_comments = {}
-        self.fortrolighed_comments = {}
-        self.integritet_comments = {}
-        self.robusthed_comments = {}
-        self.tilgaengelighed_comments = {}
+        self.kritikalitet_comments = {s: tk.StringVar() for s in self.kritikalitet_vars}
+        self.gdpr_comments = {s: tk.StringVar() for s in self.gdpr_vars}
+        self.fortrolighed_comments = {s: tk.StringVar() for s in self.fortrolighed_vars}
+        self.integritet_comments = {s: tk.StringVar() for s in self.integritet_vars}
+        self.robusthed_comments = {s: tk.StringVar() for s in self.robusthed_vars}
+        self.tilgaengelighed_comments = {p: tk.StringVar() for p in self.tilgaengelighed_vars}
+        for kategori in risikomotor.KATEGORIER:
+            for sp, var in zip(risikomotor.KATALOG[kategori].spoergsmaal,
+                               getattr(self, f"{kategori}_comments").values()):
+                var.trace_add('write', lambda *args, kategori=kategori, sp=sp, var=var:
+                              self.autogem.registrer(kategori, sp.id, "kommentar", var.get()))
+        
+        # Systembeskrivelsen gemmes her indtil System Information fanen er bygget
+        self.system_beskrivelse_tekst = ""
         
         # Initialiser current_assessment dictionary
         self.current_assessment = {
@@ -178,13 +275,24 @@ class ITRisikovurderingsApp:
         self.file_menu.add_command(label="Gem vurdering", command=self.save_assessment)
         self.file_menu.add_command(label="Åbn vurdering", command=self.open_assessment)
         self.file_menu.add_separator()
-        self.file_menu.add_command(label="Afslut", command=self.master.quit)
+        self.file_menu.add_command(label="Eksportér som JSON...", command=self.gem_vurdering)
+        self.file_menu.add_command(label="Eksportér alle som arkiv...", command=self.eksporter_arkiv)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="Afslut", command=self.afslut)
+        self.master.protocol("WM_DELETE_WINDOW", self.afslut)
 
         # Info menu
         self.info_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label="Info", menu=self.info_menu)
         self.info_menu.add_command(label="Om programmet", command=self.show_about)
 
+        # Portefølje menu
+        self.portefoelje_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.menu_bar.add_cascade(label="Portefølje", menu=self.portefoelje_menu)
+        self.portefoelje_menu.add_command(label="Porteføljeoverblik", command=self.vis_portefoelje)
+        self.portefoelje_menu.add_command(label="Porteføljeoverblik fra arkiv...",
+                                          command=self.vis_portefoelje_fra_arkiv)
+
         # Opret notebook
         self.notebook = ttk.Notebook(self.master)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
@@ -251,24 +359,43 @@ Vi håber, at dette værktøj vil gøre det lettere for dig at arbejde strukture
         )
         open_assessment_btn.pack()
 
-        # Initialiser svar dictionaries
-        self.kritikalitet_svar = {}
-        self.gdpr_svar = {}
-        self.gdpr_text_vars = {}
-        self.fortrolighed_svar = {}
-        self.integritet_svar = {}
-        self.robusthed_svar = {}
-        self.tilgaengelighed_svar = {}
-        
-        # Opret alle sider
-        self.create_assessment_page()
-        self.create_kritikalitet_page()
-        self.create_gdpr_page()
-        self.create_fortrolighed_page()
-        self.create_integritet_page()
-        self.create_robusthed_page()
-        self.create_tilgaengelighed_page()
-        self.create_rapport_page()
+        # Seneste vurderinger fra databasen; dobbeltklik åbner en vurdering.
+        # Søgefeltet søger i systemnavne, beskrivelser og kommentarer
+        recent_frame = ttk.LabelFrame(welcome_container, text="Seneste vurderinger")
+        recent_frame.pack(fill=tk.X, pady=(20, 0))
+        soege_frame = ttk.Frame(recent_frame)
+        soege_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        self.soege_tekst = tk.StringVar()
+        soege_felt = ttk.Entry(soege_frame, textvariable=self.soege_tekst)
+        soege_felt.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        soege_felt.bind("<Return>", self.soeg_vurderinger)
+        ttk.Button(soege_frame, text="Søg", command=self.soeg_vurderinger).pack(side=tk.LEFT, padx=(5, 0))
+        self.recent_listbox = tk.Listbox(recent_frame, height=8)
+        self.recent_listbox.pack(fill=tk.X, padx=10, pady=10)
+        self.recent_listbox.bind("<Double-Button-1>", self.on_recent_select)
+        self.recent_ids = []
+        self.load_recent_assessments()
+
+        # Initialiser svar dictionaries, nøglet på spørgsmålenes stabile id
+        self.gdpr_text_vars = {sp.id: tk.StringVar() for sp in risikomotor.KATALOG['gdpr'].spoergsmaal
+                               if sp.tekstfelt}
+        for spørgsmål_id, var in self.gdpr_text_vars.items():
+            var.trace_add('write', lambda *args, spørgsmål_id=spørgsmål_id, var=var:
+                          self.autogem.registrer('gdpr', spørgsmål_id, "uddybende", var.get().strip()))
+        
+        # Sideregister: fanerne bygges først ved første besøg og kun én gang
+        self.sider = {
+            1: ("system_info", self.create_assessment_page),
+            2: ("kritikalitet", self.create_kritikalitet_page),
+            3: ("gdpr", self.create_gdpr_page),
+            4: ("fortrolighed", self.create_fortrolighed_page),
+            5: ("integritet", self.create_integritet_page),
+            6: ("robusthed", self.create_robusthed_page),
+            7: ("tilgaengelighed", self.create_tilgaengelighed_page),
+            8: ("rapport", self.create_rapport_page)
+        }
+        self.byggede_sider = {0}  # Velkomstsiden er bygget ovenfor
+        self.side_byggetider = {}
         
         # Bind tab-skift event
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_change)
@@ -277,42 +404,22 @@ Vi håber, at dette værktøj vil gøre det lettere for dig at arbejde strukture
         current_tab = self.notebook.select()
         tab_id = self.notebook.index(current_tab)
         
-        if tab_id == 1:  # System Information
-            if not hasattr(self, 'system_info_created'):
-                self.create_assessment_page()
-                self.system_info_created = True
-        elif tab_id == 2:  # Kritikalitetsvurdering
-            if not hasattr(self, 'kritikalitet_created'):
-                self.create_kritikalitet_page()
-                self.kritikalitet_created = True
-        elif tab_id == 3:  # GDPR Vurdering
-            if not hasattr(self, 'gdpr_created'):
-                self.create_gdpr_page()
-                self.gdpr_created = True
-        elif tab_id == 4:  # Fortrolighed
-            if not hasattr(self, 'fortrolighed_created'):
-                self.create_fortrolighed_page()
-                self.fortrolighed_created = True
-        elif tab_id == 5:  # Integritet
-            if not hasattr(self, 'integritet_created'):
-                self.create_integritet_page()
-                self.integritet_created = True
-        elif tab_id == 6:  # Robusthed
-            if not hasattr(self, 'robusthed_created'):
-                self.create_robusthed_page()
-                self.robusthed_created = True
-        elif tab_id == 7:  # Tilgængelighed
-            if not hasattr(self, 'tilgaengelighed_created'):
-                self.create_tilgaengelighed_page()
-                self.tilgaengelighed_created = True
-        elif tab_id == 8:  # Samlet Rapport
-            self.create_rapport_page()
+        self.byg_side(tab_id)
+        if tab_id == 8:  # Samlet Rapport
+            self.opdater_rapport_side()
+
+    def byg_side(self, tab_id):
+        """Bygger en fane første gang den vises og registrerer byggetiden"""
+        if tab_id in self.byggede_sider or tab_id not in self.sider:
+            return
+        navn, byg = self.sider[tab_id]
+        start = time.perf_counter()
+        byg()
+        self.byggede_sider.add(tab_id)
+        self.side_byggetider[navn] = time.perf_counter() - start
+        logger.debug("Fane '%s' bygget på %.1f ms", navn, self.side_byggetider[navn] * 1000)
 
     def create_assessment_page(self):
-        # Ryd eksisterende widgets
-        for widget in self.system_info_frame.winfo_children():
-            widget.destroy()
-            
         # Opret container med padding og hvid baggrund
         container = ttk.Frame(self.system_info_frame, style='TFrame', padding="40 40 40 40")
         container.pack(fill=tk.BOTH, expand=True)
@@ -355,12 +462,17 @@ Vi håber, at dette værktøj vil gøre det lettere for dig at arbejde strukture
         date_entry.pack(anchor=tk.W, pady=(0, 15))
         # Sæt den aktuelle dato hvis feltet er tomt
         if not self.assessment_date.get():
-            self.assessment_date.set(datetime.now().strftime("%Y-%m-%d"))
+            with self.autogem.pauset():
+                self.assessment_date.set(datetime.now().strftime("%Y-%m-%d"))
         
         # System beskrivelse
         ttk.Label(input_frame, text="System beskrivelse:", style='TLabel').pack(anchor=tk.W, pady=(0, 5))
         self.system_description = tk.Text(input_frame, width=50, height=10)
         self.system_description.pack(anchor=tk.W, pady=(0, 20))
+        if self.system_beskrivelse_tekst:
+            self.system_description.insert("1.0", self.system_beskrivelse_tekst)
+        self.system_description.edit_modified(False)
+        self.system_description.bind("<<Modified>>", self.ved_beskrivelse_aendret)
         
         # Knapper i bunden
         button_frame = ttk.Frame(container, style='TFrame')
@@ -385,9 +497,6 @@ Vi håber, at dette værktøj vil gøre det lettere for dig at arbejde strukture
         next_button.pack(side=tk.LEFT, padx=10)
 
     def create_kritikalitet_page(self):
-        for widget in self.kritikalitet_frame.winfo_children():
-            widget.destroy()
-            
         # Overskrift og forklaring
         header_label = ttk.Label(
             self.kritikalitet_frame,
@@ -405,87 +514,18 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         )
         info_label.pack(pady=(0,20))
         
-        # Opret en canvas og scrollbar
-        canvas = tk.Canvas(self.kritikalitet_frame)
-        scrollbar = ttk.Scrollbar(self.kritikalitet_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Spørgsmål og radiobuttons
-        self.kritikalitet_vars = {}
-        spørgsmål = [
-            "1. Indeholder systemet data, som er væsentlige for at styrelsen kan udføre sine kerneopgaver?",
-            "2. Vil styrelsens kerneaktiviteter blive væsentligt påvirkede, hvis systemet er utilgængeligt i mere end 24 timer?",
-            "3. Vil et længerevarende systemnedbrud kunne have indvirkning på personers liv og helbred?",
-            "4. Kan en fejl eller kompromittering af systemet føre til fysiske skader på personer eller materiel i forbindelse med luftfart?",
-            "5. Har systemet en direkte eller indirekte rolle i sikkerheden ved luftfart?",
-            "6. Er systemet samfundskritisk? (er det omfattet af NIS2-direktivets krav til væsentlige eller vigtige sektorer + DIGST's definition)?",
-            "7. Er der risiko for væsentlige økonomiske eller omdømmemæssige tab for styrelsen, hvis systemet kompromitteres eller fejler?",
-            "8. Kan nedetid i systemet påvirke andre organisationer, myndigheder eller sektorer negativt?",
-            "9. Er systemet integreret med andre kritiske systemer, hvor fejl kan skabe dominoeffekter?",
-            "10. Behandler systemet personoplysninger?",
-            "11. Behandler systemet data, som er omfattet af Sikkerhedscirkulæret? (klassificeret information TTJ/FTR/HEM/YHEM)",
-            "12. Er systemet udsat for en væsentlig risiko for cyberangreb eller misbrug?",
-            "13. Anvender systemet nye teknologier som fx kunstig intelligens, hvor bias eller fejl i output kan føre til væsentlige konsekvenser for styrelsen eller de registrerede (GDPR?)?",
-            "14. Kan fejl i systemet føre til juridiske eller regulatoriske sanktioner, fx bøder?"
-        ]
-
-        # Point for hvert spørgsmål
-        self.point_vægte = {spørgsmål[i]: vægt for i, vægt in enumerate([5,5,8,8,8,6,4,4,4,3,5,4,3,3])}
-
-        for spørgsmål_text in spørgsmål:
-            frame = ttk.Frame(scrollable_frame)
-            frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            # Spørgsmålstekst
-            label = ttk.Label(frame, text=spørgsmål_text, wraplength=750)
-            label.pack(side=tk.LEFT, pady=5)
-            
-            # Opret StringVar med standardværdi "Nej"
-            var = tk.StringVar()
-            var.set("Nej")  # Sæt standardværdi
-            self.kritikalitet_vars[spørgsmål_text] = var
-            
-            # Radio-knapper frame
-            radio_frame = ttk.Frame(frame)
-            radio_frame.pack(side=tk.RIGHT, padx=30)
-            
-            # Ja knap
-            ja_radio = ttk.Radiobutton(
-                radio_frame,
-                text="Ja",
-                value="Ja",
-                variable=var,
-                command=lambda s=spørgsmål_text: self.on_radio_click(s)
-            )
-            ja_radio.pack(side=tk.LEFT, padx=15)
-            
-            # Nej knap
-            nej_radio = ttk.Radiobutton(
-                radio_frame,
-                text="Nej",
-                value="Nej",
-                variable=var,
-                command=lambda s=spørgsmål_text: self.on_radio_click(s)
-            )
-            nej_radio.pack(side=tk.LEFT, padx=15)
-            
-            # Kommentarfelt
-            comment_frame = self.create_comment_section(frame, 'kritikalitet', spørgsmål_text)
-            comment_frame.pack(side=tk.RIGHT, padx=10)
+        # Spørgsmålene vises i en virtualiseret liste, der kun opretter
+        # widgets til de rækker der kan ses
+        spoergsmaalsliste = self.opret_spoergsmaalsliste(
+            self.kritikalitet_frame, 'kritikalitet', self.on_radio_click,
+            radio_klasse=ttk.Radiobutton, radio_stil={})
+        spoergsmaalsliste.pack(fill=tk.BOTH, expand=True, padx=(20, 0))
 
         # Separator
-        ttk.Separator(scrollable_frame, orient='horizontal').pack(fill=tk.X, pady=20)
+        ttk.Separator(self.kritikalitet_frame, orient='horizontal').pack(fill=tk.X, pady=20)
 
         # Resultat frame
-        result_frame = ttk.LabelFrame(scrollable_frame, text="Resultat af kritikalitetsvurdering")
+        result_frame = ttk.LabelFrame(self.kritikalitet_frame, text="Resultat af kritikalitetsvurdering")
         result_frame.pack(fill=tk.X, padx=20, pady=20)
         
         inner_result_frame = ttk.Frame(result_frame)
@@ -515,73 +555,111 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
 
         # Gem knap
         save_button = ttk.Button(
-            scrollable_frame,
+            self.kritikalitet_frame,
             text="Gem vurdering",
             command=self.save_assessment
         )
         save_button.pack(pady=20)
 
-        # Pack canvas og scrollbar
-        canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
-        scrollbar.pack(side="right", fill="y")
+        # Vis resultatet for de aktuelle svar
+        self.vis_kritikalitet()
         
-        print("Kritikalitetsvurdering oprettet")
+        logger.debug("Kritikalitetsvurdering oprettet")
 
-    def on_radio_click(self, spørgsmål_text):
+    def on_radio_click(self, sp):
         """Håndterer klik på radio-knap"""
-        var = self.kritikalitet_vars[spørgsmål_text]
-        value = var.get()
-        
-        print(f"\nRadio-knap klikket:")
-        print(f"Spørgsmål: '{spørgsmål_text}'")
-        print(f"Valgt værdi: {value}")
-        
-        self.update_kritikalitet()
-
-    def update_kritikalitet(self):
-        """Opdaterer den samlede kritikalitetsscore"""
-        print("\nBeregner kritikalitetsscore:")
-        total_score = 0
-        
-        # Beregn total score
-        for spørgsmål, var in self.kritikalitet_vars.items():
-            svar = var.get()
-            print(f"\nSpørgsmål: '{spørgsmål}'")
-            print(f"Svar: {svar}")
-            if svar == "Ja":
-                vægt = self.point_vægte.get(spørgsmål, 0)
-                total_score += vægt
-                print(f"Vægt: {vægt}")
-                print(f"Løbende score: {total_score}")
-        
-        # Bestem kritikalitet og forklaring baseret på score
-        if total_score > 50:  # A: Over 50 point
-            kritikalitet = "A"
-            forklaring = "Korte systemafbrud (timer) vil medføre katastrofale følgevirkninger for forretningen som følge af væsentlige og uoprettelige svigt i målopfyldelse eller brud på love og aftaler"
-        elif total_score >= 21:  # B: 21-50 point
-            kritikalitet = "B"
-            forklaring = "Langvarige system-afbrud (dage) vil medføre alvorlige følgevirkninger for forretningen som følge af væsentlige og uoprettelige svigt i målopnåelse eller brud på love og aftaler."
-        elif total_score >= 12:  # C: 12-20 point
-            kritikalitet = "C"
-            forklaring = "Systemafbrud vil medføre væsentlig ulempe, men ikke i væsentlig grad hindre målopfyldelse eller føre til brud på love eller aftaler."
-        else:  # D: Under 11 point
-            kritikalitet = "D"
-            forklaring = "Systemafbrud medfører mindre ulemper og begrænsede tab eller omkostninger."
-        
-        print(f"\nEndelig vurdering:")
-        print(f"Total score: {total_score}")
-        print(f"Kritikalitet: {kritikalitet}")
-        print(f"Forklaring: {forklaring}")
-        
-        # Opdater labels
-        self.score_label.config(text=f"Score: {total_score}")
+        # Scoren vises ved hvert klik, også når klassen er den samme
+        self.gem_svar('kritikalitet', sp)
+        self.vis_kritikalitet()
+
+    def opret_spoergsmaalsliste(self, parent, kategori, ved_aendring, radio_klasse=tk.Radiobutton,
+                                radio_stil=None, tekstfelt_vars=None):
+        """Opretter den virtualiserede spørgsmålsliste for en kategori"""
+        if radio_stil is None:
+            radio_stil = {
+                "font": ("Helvetica", 10),
+                "bg": "white",
+                "selectcolor": "lightblue",
+                "width": 6,
+                "height": 1
+            }
+        k = risikomotor.KATALOG[kategori]
+        return virtuel_liste.VirtuelSpoergsmaalsliste(
+            parent, k.spoergsmaal, getattr(self, f"{kategori}_vars"), k.svarmuligheder, ved_aendring,
+            ved_kommentar=lambda sp: self.show_comment_dialog(kategori, sp.tekst),
+            tekstfelt_vars=tekstfelt_vars, radio_klasse=radio_klasse, radio_stil=radio_stil)
+
+    def marker_aendret(self, kategori):
+        """Tæller kategoriens version op, så rapporten ved at den skal opdateres"""
+        self.versioner[kategori] += 1
+
+    def ved_system_aendring(self, felt, vaerdi):
+        if self._indlaeser:
+            return
+        self.marker_aendret('system_info')
+        self.autogem.registrer('system_info', None, felt, vaerdi)
+
+    def gendan_autogemt(self):
+        """Tilbyder at gendanne ugemt arbejde fra sidste session"""
+        ugemte = self.autogem.ugemte()
+        if not ugemte:
+            return
+        noegle = ugemte[0]
+        vurdering_id = autogem.vurdering_id_fra_noegle(noegle)
+        grundlag = self.lager.hent(vurdering_id) if vurdering_id is not None else None
+        if vurdering_id is not None and grundlag is None:
+            # Vurderingen er slettet fra databasen; ændringerne gendannes som en ny
+            vurdering_id = None
+        if not self.gendan_ugemt(noegle, grundlag or {}):
+            return
+        self.vurdering_id = vurdering_id
+
+    def gendan_ugemt(self, noegle, grundlag):
+        """Afspiller journalen for noegle oven på grundlag, hvis brugeren vil.
+
+        Returnerer True hvis ændringerne blev gendannet. Ellers kasseres de.
+        """
+        snapshot, poster = self.autogem.hent(noegle)
+        if snapshot is None and not poster:
+            return False
+        data = autogem.anvend(snapshot or grundlag, poster)
+        navn = data.get("system_info", {}).get("navn") or "Unavngivet system"
+        tidspunkt = poster[-1]["tid"] if poster else "sidste session"
+        if not messagebox.askyesno(
+                "Gendan vurdering",
+                f"Der er ugemte ændringer til \"{navn}\" fra {tidspunkt}.\n\n"
+                "Vil du gendanne dem?"):
+            self.autogem.kasser(noegle)
+            return False
+        self.indlaes_vurdering(data)
+        nr = max([post["nr"] for post in poster] + [(snapshot or {}).get("nr", 0)])
+        self.autogem.skift(noegle, nr)
+        logger.info("%d ugemte ændringer gendannet for %s", len(poster), noegle)
+        return True
+
+    def gem_svar(self, kategori, sp):
+        """Opdaterer ét svar i tilstanden efter et klik.
+
+        Returnerer True hvis kategoriens resultat skiftede.
+        """
+        svar = getattr(self, f"{kategori}_vars")[sp.tekst].get()
+        skiftet = self.tilstand.saet(kategori, sp.indeks, svar)
+        self.marker_aendret(kategori)
+        self.autogem.registrer(kategori, sp.id, "svar", svar)
+        return skiftet
+
+    def vis_kritikalitet(self):
+        """Viser den aktuelle score, kritikalitet og forklaring"""
+        # Opdater labels hvis fanen er bygget
+        if not hasattr(self, 'score_label'):
+            return
+        kritikalitet = self.tilstand.kritikalitet
+        forklaring = risikomotor.KRITIKALITET_FORKLARINGER[kritikalitet]
+        self.score_label.config(text=f"Score: {self.tilstand.score}")
         self.kritikalitet_label.config(text=f"Kritikalitet: {kritikalitet}")
         self.forklaring_label.config(text=f"Forklaring: {forklaring}")
 
     def create_gdpr_page(self):
-        for widget in self.gdpr_frame.winfo_children():
-            widget.destroy()
-            
         # Overskrift
         header_label = ttk.Label(
             self.gdpr_frame,
@@ -590,128 +668,26 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         )
         header_label.pack(pady=20)
         
-        # Opret en canvas og scrollbar
-        canvas = tk.Canvas(self.gdpr_frame)
-        scrollbar = ttk.Scrollbar(self.gdpr_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # GDPR spørgsmål med kombineret ja/nej og tekstfelter
-        gdpr_spørgsmål = [
-            ("1. Behandler systemet almindelige personoplysninger?", True),
-            ("2. Behandler systemet CPR-numre eller oplysninger om strafbare forhold?", False),
-            ("3. Behandler systemet følsomme eller særligt beskyttelsesværdige personoplysninger?", True),
-            ("4. Behandler systemet persondata om flere end 5000 personer?", False),
-            ("5. Bliver der overført data til lande uden for EU/EØS?", True),
-            ("6. Er der hjemmel til behandlingen?", True),
-            ("7. Gør systemet brug af automatisk beslutningstagning eller profilering?", False),
-            ("8. Foretager systemet systematisk overvågning?", False),
-            ("9. Er der udarbejdet en databehandleraftale?", False),
-            ("10. Er der etableret procedurer for sletning af personoplysninger?", False),
-            ("11. Er behandlingsaktiviteterne beskrevet i fortegnelsen?", False),
-            ("12. Skal der udarbejdes en konsekvensanalyse?", False)
-        ]
-
-        self.gdpr_vars = {}
-        self.gdpr_text_vars = {}
-
-        for spørgsmål, has_text in gdpr_spørgsmål:
-            frame = ttk.Frame(scrollable_frame)
-            frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            # Spørgsmålstekst
-            label = ttk.Label(frame, text=spørgsmål, wraplength=750)
-            label.pack(side=tk.LEFT, pady=5)
-            
-            # Radio buttons frame
-            radio_frame = ttk.Frame(frame)
-            radio_frame.pack(side=tk.RIGHT, padx=30)
-            
-            var = tk.StringVar(value="Nej")
-            self.gdpr_vars[spørgsmål] = var
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Ja", 
-                value="Ja", 
-                variable=var,
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1,
-                command=lambda s=spørgsmål: self.on_gdpr_change(s)
-            ).pack(side=tk.LEFT, padx=15)
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Nej", 
-                value="Nej", 
-                variable=var,
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1,
-                command=lambda s=spørgsmål: self.on_gdpr_change(s)
-            ).pack(side=tk.LEFT, padx=15)
-
-            # Hvis spørgsmålet skal have tekstfelt
-            if has_text:
-                text_frame = ttk.Frame(scrollable_frame)
-                text_frame.pack(fill=tk.X, padx=50, pady=(0, 10))
-                
-                text_var = tk.Text(text_frame, height=2, width=80)
-                text_var.pack(fill=tk.X)
-                self.gdpr_text_vars[spørgsmål] = text_var
-                
-            # Tilføj kommentarfelt
-            comment_frame = self.create_comment_section(frame, 'gdpr', spørgsmål)
-            comment_frame.pack(side=tk.RIGHT, padx=10)
-
-        # Pack canvas og scrollbar
-        canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
-        scrollbar.pack(side="right", fill="y")
+        # Spørgsmålene vises i en virtualiseret liste, der kun opretter
+        # widgets til de rækker der kan ses
+        spoergsmaalsliste = self.opret_spoergsmaalsliste(
+            self.gdpr_frame, 'gdpr', self.on_gdpr_change,
+            tekstfelt_vars=self.gdpr_text_vars)
+        spoergsmaalsliste.pack(fill=tk.BOTH, expand=True, padx=(20, 0))
 
         # Gem knap
         save_button = ttk.Button(
-            scrollable_frame,
+            self.gdpr_frame,
             text="Gem vurdering",
             command=self.save_assessment
         )
         save_button.pack(pady=20)
 
-    def on_gdpr_change(self, spørgsmål):
+    def on_gdpr_change(self, sp):
         # Gem GDPR svar når der laves ændringer
-        self.save_gdpr_data()
-
-    def save_gdpr_data(self):
-        gdpr_data = {}
-        for spørgsmål, var in self.gdpr_vars.items():
-            # Brug et unikt ID i stedet for hele spørgsmålsteksten
-            spørgsmål_id = f"gdpr_spm_{list(self.gdpr_vars.keys()).index(spørgsmål) + 1}"
-            svar = {
-                "spørgsmål": spørgsmål,  # Gem selve spørgsmålet som en værdi
-                "svar": var.get()
-            }
-            if spørgsmål in self.gdpr_text_vars:
-                uddybende = self.gdpr_text_vars[spørgsmål].get("1.0", tk.END).strip()
-                if uddybende:
-                    svar["uddybende"] = uddybende
-            gdpr_data[spørgsmål_id] = svar
-        self.gdpr_svar = gdpr_data
+        self.gem_svar('gdpr', sp)
 
     def create_fortrolighed_page(self):
-        for widget in self.fortrolighed_frame.winfo_children():
-            widget.destroy()
-            
         # Overskrift
         header_label = ttk.Label(
             self.fortrolighed_frame,
@@ -720,80 +696,17 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         )
         header_label.pack(pady=20)
         
-        # Opret en canvas og scrollbar
-        canvas = tk.Canvas(self.fortrolighed_frame)
-        scrollbar = ttk.Scrollbar(self.fortrolighed_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Fortroligheds spørgsmål
-        fortrolighed_spørgsmål = [
-            "1. Kan læk af data skade Trafikstyrelsen eller andre?",
-            "2. Har brugerne af systemet adgang til data ud over deres arbejdsrelaterede behov?",
-            "3. Er data, der behandles i systemet, tilgængelige for eksterne parter?",
-            "4. Mangler der kryptering i systemet under overførsel og under lagring?",
-            "5. Har uvedkommende tidligere haft adgang til data i systemet?"
-        ]
-
-        self.fortrolighed_vars = {}
-
-        for spørgsmål in fortrolighed_spørgsmål:
-            frame = ttk.Frame(scrollable_frame)
-            frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            # Spørgsmålstekst
-            label = ttk.Label(frame, text=spørgsmål, wraplength=750)
-            label.pack(side=tk.LEFT, pady=5)
-            
-            # Radio buttons frame
-            radio_frame = ttk.Frame(frame)
-            radio_frame.pack(side=tk.RIGHT, padx=30)
-            
-            var = tk.StringVar(value="Nej")
-            self.fortrolighed_vars[spørgsmål] = var
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Ja", 
-                value="Ja", 
-                variable=var,
-                command=lambda s=spørgsmål: self.on_fortrolighed_change(s),
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1
-            ).pack(side=tk.LEFT, padx=15)
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Nej", 
-                value="Nej", 
-                variable=var,
-                command=lambda s=spørgsmål: self.on_fortrolighed_change(s),
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1
-            ).pack(side=tk.LEFT, padx=15)
-            
-            # Tilføj kommentarfelt
-            comment_frame = self.create_comment_section(frame, 'fortrolighed', spørgsmål)
-            comment_frame.pack(side=tk.RIGHT, padx=10)
+        # Spørgsmålene vises i en virtualiseret liste, der kun opretter
+        # widgets til de rækker der kan ses
+        spoergsmaalsliste = self.opret_spoergsmaalsliste(
+            self.fortrolighed_frame, 'fortrolighed', self.on_fortrolighed_change)
+        spoergsmaalsliste.pack(fill=tk.BOTH, expand=True, padx=(20, 0))
 
         # Separator før resultat
-        ttk.Separator(scrollable_frame, orient='horizontal').pack(fill=tk.X, pady=20)
+        ttk.Separator(self.fortrolighed_frame, orient='horizontal').pack(fill=tk.X, pady=20)
 
         # Resultat frame
-        result_frame = ttk.LabelFrame(scrollable_frame, text="Resultat af fortrolighedsvurdering")
+        result_frame = ttk.LabelFrame(self.fortrolighed_frame, text="Resultat af fortrolighedsvurdering")
         result_frame.pack(fill=tk.X, padx=20, pady=20)
         
         # Indre frame til resultatet
@@ -807,49 +720,25 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
             style='Result.TLabel'
         )
         self.fortrolighed_result_label.pack(pady=5)
-
-        # Pack canvas og scrollbar
-        canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
-        scrollbar.pack(side="right", fill="y")
+        self.vis_fortrolighed_result()
 
         # Gem knap
         save_button = ttk.Button(
-            scrollable_frame,
+            self.fortrolighed_frame,
             text="Gem vurdering",
             command=self.save_assessment
         )
         save_button.pack(pady=20)
 
-    def on_fortrolighed_change(self, spørgsmål):
-        self.save_fortrolighed_data()
-        self.update_fortrolighed_result()
+    def on_fortrolighed_change(self, sp):
+        if self.gem_svar('fortrolighed', sp):
+            self.vis_fortrolighed_result()
 
-    def update_fortrolighed_result(self):
-        # Tæl antal "Ja" svar
-        ja_count = sum(1 for var in self.fortrolighed_vars.values() if var.get() == "Ja")
-        
-        if ja_count == 0:
-            result = "Ingen kritiske fortrolighedsproblemer identificeret"
-        elif ja_count <= 2:
-            result = "Der er identificeret nogle fortrolighedsproblemer som bør adresseres"
-        else:
-            result = "Der er identificeret kritiske fortrolighedsproblemer som kræver øjeblikkelig handling"
-            
-        self.fortrolighed_result_label.config(text=result)
-
-    def save_fortrolighed_data(self):
-        fortrolighed_data = {}
-        for spørgsmål, var in self.fortrolighed_vars.items():
-            fortrolighed_data[f"spm_{list(self.fortrolighed_vars.keys()).index(spørgsmål) + 1}"] = {
-                "spørgsmål": spørgsmål,
-                "svar": var.get()
-            }
-        self.fortrolighed_svar = fortrolighed_data
+    def vis_fortrolighed_result(self):
+        if hasattr(self, 'fortrolighed_result_label'):
+            self.fortrolighed_result_label.config(text=self.tilstand.resultat('fortrolighed'))
 
     def create_integritet_page(self):
-        for widget in self.integritet_frame.winfo_children():
-            widget.destroy()
-            
         # Overskrift
         header_label = ttk.Label(
             self.integritet_frame,
@@ -858,80 +747,17 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         )
         header_label.pack(pady=20)
         
-        # Opret en canvas og scrollbar
-        canvas = tk.Canvas(self.integritet_frame)
-        scrollbar = ttk.Scrollbar(self.integritet_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Integritets spørgsmål
-        integritet_spørgsmål = [
-            "1. Er der risiko for uautoriseret ændring af data?",
-            "2. Kan fejl i data medføre alvorlige konsekvenser?",
-            "3. Er der krav om sporbarhed af dataændringer?",
-            "4. Er systemets integritet afgørende for forretningen?",
-            "5. Er der særlige lovkrav til datakvalitet?"
-        ]
-
-        self.integritet_vars = {}
-
-        for spørgsmål in integritet_spørgsmål:
-            frame = ttk.Frame(scrollable_frame)
-            frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            # Spørgsmålstekst
-            label = ttk.Label(frame, text=spørgsmål, wraplength=750)
-            label.pack(side=tk.LEFT, pady=5)
-            
-            # Radio buttons frame
-            radio_frame = ttk.Frame(frame)
-            radio_frame.pack(side=tk.RIGHT, padx=30)
-            
-            var = tk.StringVar(value="Nej")
-            self.integritet_vars[spørgsmål] = var
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Ja", 
-                value="Ja", 
-                variable=var,
-                command=lambda s=spørgsmål: self.on_integritet_change(s),
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1
-            ).pack(side=tk.LEFT, padx=15)
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Nej", 
-                value="Nej", 
-                variable=var,
-                command=lambda s=spørgsmål: self.on_integritet_change(s),
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1
-            ).pack(side=tk.LEFT, padx=15)
-            
-            # Tilføj kommentarfelt
-            comment_frame = self.create_comment_section(frame, 'integritet', spørgsmål)
-            comment_frame.pack(side=tk.RIGHT, padx=10)
+        # Spørgsmålene vises i en virtualiseret liste, der kun opretter
+        # widgets til de rækker der kan ses
+        spoergsmaalsliste = self.opret_spoergsmaalsliste(
+            self.integritet_frame, 'integritet', self.on_integritet_change)
+        spoergsmaalsliste.pack(fill=tk.BOTH, expand=True, padx=(20, 0))
 
         # Separator før resultat
-        ttk.Separator(scrollable_frame, orient='horizontal').pack(fill=tk.X, pady=20)
+        ttk.Separator(self.integritet_frame, orient='horizontal').pack(fill=tk.X, pady=20)
 
         # Resultat frame
-        result_frame = ttk.LabelFrame(scrollable_frame, text="Resultat af integritetsvurdering")
+        result_frame = ttk.LabelFrame(self.integritet_frame, text="Resultat af integritetsvurdering")
         result_frame.pack(fill=tk.X, padx=20, pady=20)
         
         # Indre frame til resultatet
@@ -945,49 +771,25 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
             style='Result.TLabel'
         )
         self.integritet_result_label.pack(pady=5)
-
-        # Pack canvas og scrollbar
-        canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
-        scrollbar.pack(side="right", fill="y")
+        self.vis_integritet_result()
 
         # Gem knap
         save_button = ttk.Button(
-            scrollable_frame,
+            self.integritet_frame,
             text="Gem vurdering",
             command=self.save_assessment
         )
         save_button.pack(pady=20)
 
-    def on_integritet_change(self, spørgsmål):
-        self.save_integritet_data()
-        self.update_integritet_result()
+    def on_integritet_change(self, sp):
+        if self.gem_svar('integritet', sp):
+            self.vis_integritet_result()
 
-    def update_integritet_result(self):
-        # Tæl antal "Ja" svar
-        ja_count = sum(1 for var in self.integritet_vars.values() if var.get() == "Ja")
-        
-        if ja_count <= 1:
-            result = "Systemet har normal integritetsbehov"
-        elif ja_count <= 3:
-            result = "Systemet har forhøjet integritetsbehov - implementer passende kontroller"
-        else:
-            result = "Systemet har kritisk integritetsbehov - strenge kontroller er påkrævet"
-            
-        self.integritet_result_label.config(text=result)
-
-    def save_integritet_data(self):
-        integritet_data = {}
-        for spørgsmål, var in self.integritet_vars.items():
-            integritet_data[f"spm_{list(self.integritet_vars.keys()).index(spørgsmål) + 1}"] = {
-                "spørgsmål": spørgsmål,
-                "svar": var.get()
-            }
-        self.integritet_svar = integritet_data
+    def vis_integritet_result(self):
+        if hasattr(self, 'integritet_result_label'):
+            self.integritet_result_label.config(text=self.tilstand.resultat('integritet'))
 
     def create_robusthed_page(self):
-        for widget in self.robusthed_frame.winfo_children():
-            widget.destroy()
-            
         # Overskrift
         header_label = ttk.Label(
             self.robusthed_frame,
@@ -996,80 +798,17 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         )
         header_label.pack(pady=20)
         
-        # Opret en canvas og scrollbar
-        canvas = tk.Canvas(self.robusthed_frame)
-        scrollbar = ttk.Scrollbar(self.robusthed_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Robustheds spørgsmål
-        robusthed_spørgsmål = [
-            "1. Har systemet tidligere været udsat for nedbrud eller sikkerhedshændelser med væsentlige konsekvenser?",
-            "2. Kan fejl eller sikkerhedsbrud i systemet føre til tab eller ødelæggelse af data, som ikke kan genskabes fra andre systemer eller kilder?",
-            "3. Er systemet afhængigt af en specifik teknologi eller leverandør, hvor der ikke findes alternativer?",
-            "4. Er der risiko for, at leverandøren ikke kan levere som aftalt, fx pga. økonomiske problemer, konkurser eller geopolitiske forhold?",
-            "5. Er leverandøren afhængig af underleverandører, der kan påvirke systemets sikkerhed eller drift?"
-        ]
-
-        self.robusthed_vars = {}
-
-        for spørgsmål in robusthed_spørgsmål:
-            frame = ttk.Frame(scrollable_frame)
-            frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            # Spørgsmålstekst
-            label = ttk.Label(frame, text=spørgsmål, wraplength=750)
-            label.pack(side=tk.LEFT, pady=5)
-            
-            # Radio buttons frame
-            radio_frame = ttk.Frame(frame)
-            radio_frame.pack(side=tk.RIGHT, padx=30)
-            
-            var = tk.StringVar(value="Nej")
-            self.robusthed_vars[spørgsmål] = var
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Ja", 
-                value="Ja", 
-                variable=var,
-                command=lambda s=spørgsmål: self.on_robusthed_change(s),
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1
-            ).pack(side=tk.LEFT, padx=15)
-            
-            tk.Radiobutton(
-                radio_frame, 
-                text="Nej", 
-                value="Nej", 
-                variable=var,
-                command=lambda s=spørgsmål: self.on_robusthed_change(s),
-                font=("Helvetica", 10),
-                bg="white",
-                selectcolor="lightblue",
-                width=6,
-                height=1
-            ).pack(side=tk.LEFT, padx=15)
-            
-            # Tilføj kommentarfelt
-            comment_frame = self.create_comment_section(frame, 'robusthed', spørgsmål)
-            comment_frame.pack(side=tk.RIGHT, padx=10)
+        # Spørgsmålene vises i en virtualiseret liste, der kun opretter
+        # widgets til de rækker der kan ses
+        spoergsmaalsliste = self.opret_spoergsmaalsliste(
+            self.robusthed_frame, 'robusthed', self.on_robusthed_change)
+        spoergsmaalsliste.pack(fill=tk.BOTH, expand=True, padx=(20, 0))
 
         # Separator før resultat
-        ttk.Separator(scrollable_frame, orient='horizontal').pack(fill=tk.X, pady=20)
+        ttk.Separator(self.robusthed_frame, orient='horizontal').pack(fill=tk.X, pady=20)
 
         # Resultat frame
-        result_frame = ttk.LabelFrame(scrollable_frame, text="Resultat af robusthedsvurdering")
+        result_frame = ttk.LabelFrame(self.robusthed_frame, text="Resultat af robusthedsvurdering")
         result_frame.pack(fill=tk.X, padx=20, pady=20)
         
         # Indre frame til resultatet
@@ -1083,49 +822,25 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
             style='Result.TLabel'
         )
         self.robusthed_result_label.pack(pady=5)
-
-        # Pack canvas og scrollbar
-        canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
-        scrollbar.pack(side="right", fill="y")
+        self.vis_robusthed_result()
 
         # Gem knap
         save_button = ttk.Button(
-            scrollable_frame,
+            self.robusthed_frame,
             text="Gem vurdering",
             command=self.save_assessment
         )
         save_button.pack(pady=20)
 
-    def on_robusthed_change(self, spørgsmål):
-        self.save_robusthed_data()
-        self.update_robusthed_result()
+    def on_robusthed_change(self, sp):
+        if self.gem_svar('robusthed', sp):
+            self.vis_robusthed_result()
 
-    def update_robusthed_result(self):
-        # Tæl antal "Ja" svar
-        ja_count = sum(1 for var in self.robusthed_vars.values() if var.get() == "Ja")
-        
-        if ja_count == 0:
-            result = "Systemet har tilstrækkelig robusthed"
-        elif ja_count <= 2:
-            result = "Der er identificeret robusthedsudfordringer som bør adresseres"
-        else:
-            result = "Der er alvorlige robusthedsudfordringer som kræver øjeblikkelig handling"
-            
-        self.robusthed_result_label.config(text=result)
-
-    def save_robusthed_data(self):
-        robusthed_data = {}
-        for spørgsmål, var in self.robusthed_vars.items():
-            robusthed_data[f"spm_{list(self.robusthed_vars.keys()).index(spørgsmål) + 1}"] = {
-                "spørgsmål": spørgsmål,
-                "svar": var.get()
-            }
-        self.robusthed_svar = robusthed_data
+    def vis_robusthed_result(self):
+        if hasattr(self, 'robusthed_result_label'):
+            self.robusthed_result_label.config(text=self.tilstand.resultat('robusthed'))
 
     def create_tilgaengelighed_page(self):
-        for widget in self.tilgaengelighed_frame.winfo_children():
-            widget.destroy()
-            
         # Overskrift
         header_label = ttk.Label(
             self.tilgaengelighed_frame,
@@ -1156,15 +871,8 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         canvas.configure(yscrollcommand=scrollbar.set)
 
         # Tidsperioder og svar muligheder
-        tidsperioder = ["1 time", "4 timer", "1 dag", "2 dage", "1 uge"]
-        svar_muligheder = [
-            "Ingen konsekvens",
-            "Mindre konsekvenser",
-            "Alvorlige konsekvenser",
-            "Kritiske konsekvenser"
-        ]
-
-        self.tilgaengelighed_vars = {}
+        tilgaengelighed = risikomotor.KATALOG['tilgaengelighed']
+        svar_muligheder = tilgaengelighed.svarmuligheder
 
         # Lav en header række med svarmuligheder
         header_frame = ttk.Frame(scrollable_frame)
@@ -1181,16 +889,15 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         ttk.Separator(scrollable_frame, orient='horizontal').pack(fill=tk.X, pady=5)
 
         # Opret rækker for hver tidsperiode
-        for periode in tidsperioder:
+        for sp in tilgaengelighed.spoergsmaal:
+            periode = sp.tekst
             frame = ttk.Frame(scrollable_frame)
             frame.pack(fill=tk.X, padx=5, pady=10)
             
             # Tidsperiode label
             ttk.Label(frame, text=periode, width=20).pack(side=tk.LEFT, padx=5)
             
-            # Opret variabel til at gemme svaret
-            var = tk.StringVar(value="Ingen konsekvens")
-            self.tilgaengelighed_vars[periode] = var
+            var = self.tilgaengelighed_vars[periode]
             
             # Radio buttons for hver svarmulighed
             for svar in svar_muligheder:
@@ -1203,7 +910,7 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
                     selectcolor="lightblue",
                     width=18,
                     anchor="center",
-                    command=lambda p=periode: self.on_tilgaengelighed_change(p)
+                    command=lambda sp=sp: self.on_tilgaengelighed_change(sp)
                 ).pack(side=tk.LEFT, padx=5)
             
             # Tilføj kommentarfelt
@@ -1228,6 +935,7 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
             style='Result.TLabel'
         )
         self.tilgaengelighed_result_label.pack(pady=5)
+        self.vis_tilgaengelighed_result()
 
         # Pack canvas og scrollbar
         canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
@@ -1241,39 +949,43 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         )
         save_button.pack(pady=20)
 
-    def on_tilgaengelighed_change(self, periode):
-        self.save_tilgaengelighed_data()
-        self.update_tilgaengelighed_result()
-
-    def update_tilgaengelighed_result(self):
-        # Point for hver svartype
-        point_skala = {
-            "Ingen konsekvens": 0,
-            "Mindre konsekvenser": 1,
-            "Alvorlige konsekvenser": 2,
-            "Kritiske konsekvenser": 3
-        }
-        
-        # Beregn total score
-        total_score = sum(point_skala[var.get()] for var in self.tilgaengelighed_vars.values())
-        
-        if total_score <= 3:
-            result = "Systemet har normal tilgængelighedsbehov"
-        elif total_score <= 8:
-            result = "Systemet har forhøjet tilgængelighedsbehov - implementer nødvendige kontroller"
-        else:
-            result = "Systemet har kritisk tilgængelighedsbehov - strenge tilgængelighedskrav skal implementeres"
-            
-        self.tilgaengelighed_result_label.config(text=result)
-
-    def save_tilgaengelighed_data(self):
-        tilgaengelighed_data = {}
-        for periode, var in self.tilgaengelighed_vars.items():
-            tilgaengelighed_data[f"periode_{list(self.tilgaengelighed_vars.keys()).index(periode) + 1}"] = {
-                "periode": periode,
-                "svar": var.get()
-            }
-        self.tilgaengelighed_svar = tilgaengelighed_data
+    def on_tilgaengelighed_change(self, sp):
+        if self.gem_svar('tilgaengelighed', sp):
+            self.vis_tilgaengelighed_result()
+
+    def vis_tilgaengelighed_result(self):
+        if hasattr(self, 'tilgaengelighed_result_label'):
+            self.tilgaengelighed_result_label.config(text=self.tilstand.resultat('tilgaengelighed'))
+
+    def hent_system_beskrivelse(self):
+        """Returnerer systembeskrivelsen, også før System Information fanen er bygget"""
+        if hasattr(self, 'system_description'):
+            return self.system_description.get("1.0", tk.END).strip()
+        return self.system_beskrivelse_tekst
+
+    def ved_beskrivelse_aendret(self, event=None):
+        # <<Modified>> kommer kun igen når flaget er nulstillet
+        if self.system_description.edit_modified():
+            self.system_description.edit_modified(False)
+            if self._indlaeser:
+                return
+            self.marker_aendret('system_info')
+            # Teksten journaliseres først når brugeren holder en pause i skrivningen
+            if self._beskrivelse_after is not None:
+                self.master.after_cancel(self._beskrivelse_after)
+            self._beskrivelse_after = self.master.after(1000, self.registrer_beskrivelse)
+
+    def registrer_beskrivelse(self):
+        self._beskrivelse_after = None
+        self.autogem.registrer('system_info', None, "system_description", self.hent_system_beskrivelse())
+
+    def saet_system_beskrivelse(self, tekst):
+        self.system_beskrivelse_tekst = tekst
+        if hasattr(self, 'system_description'):
+            self.system_description.delete("1.0", tk.END)
+            self.system_description.insert("1.0", tekst)
+            # Indsættelsen er ikke en ændring fra brugeren
+            self.system_description.edit_modified(False)
 
     def save_current_page_data(self):
         # Gem system information
@@ -1287,38 +999,20 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
             'tilgaengelighed': {}
         }
         
-        # Tilføj system beskrivelse hvis den findes
-        if hasattr(self, 'system_description'):
-            self.current_assessment["system_info"]["system_description"] = self.system_description.get("1.0", tk.END).strip()
+        # Tilføj system beskrivelse
+        self.current_assessment["system_info"]["system_description"] = self.hent_system_beskrivelse()
 
     def save_assessment(self):
         try:
-            self.gem_vurdering()
+            self.gem_i_lager()
         except Exception as e:
             messagebox.showerror("Fejl", f"Der opstod en fejl under gemning af vurdering: {str(e)}")
-            print(f"Fejl under gemning af vurdering: {str(e)}")
+            logger.exception("Fejl under gemning af vurdering")
 
     def open_assessment(self):
-        # Informer brugeren om at funktionen ikke er færdig
-        messagebox.showwarning("Under udvikling", "Funktionen 'Åbn vurdering' er endnu ikke færdig. Der arbejdes på at implementere denne funktion.")
-        return  # Return immediately after showing the warning
-        
-    def load_recent_assessments(self):
-        # Her skal vi tilføje koden til at indlæse seneste vurderinger
-        # Dette er bare eksempel data
-        self.recent_listbox.delete(0, tk.END)
-        example_assessments = [
-            "Risikovurdering - Server infrastruktur (21-01-2025)",
-            "Risikovurdering - Netværkssikkerhed (20-01-2025)",
-            "Risikovurdering - Cloud services (19-01-2025)"
-        ]
-        for assessment in example_assessments:
-            self.recent_listbox.insert(tk.END, assessment)
+        self.aabn_vurdering()
 
     def create_rapport_page(self):
-        for widget in self.rapport_frame.winfo_children():
-            widget.destroy()
-            
         # Overskrift
         header_label = ttk.Label(
             self.rapport_frame,
@@ -1349,50 +1043,24 @@ samt planlægning af nødberedskab (forretningsvidereførelse)."""
         canvas.configure(yscrollcommand=scrollbar.set)
 
         # System Information sektion
-        if hasattr(self, 'system_name'):
-            system_frame = ttk.LabelFrame(scrollable_frame, text="System Information")
-            system_frame.pack(fill=tk.X, padx=20, pady=10)
-            
-            system_info_text = f"""
-System: {self.system_name.get()}
-Ejer: {self.system_owner.get()}
-Leverandør: {self.system_supplier.get()}
-Ansvarlig: {self.assessment_responsible.get()}
-Dato: {self.assessment_date.get()}
-"""
-            ttk.Label(system_frame, text=system_info_text, justify=tk.LEFT).pack(padx=10, pady=10)
-            
-        # Fortrolighed sektion
-        fort_frame = ttk.LabelFrame(scrollable_frame, text="Fortrolighedsvurdering")
-        fort_frame.pack(fill=tk.X, padx=20, pady=10)
-        if hasattr(self, 'fortrolighed_result_label') and self.fortrolighed_result_label:
-            ttk.Label(fort_frame, text=self.fortrolighed_result_label.cget("text"), justify=tk.LEFT).pack(padx=10, pady=10)
-        else:
-            ttk.Label(fort_frame, text="Ingen fortrolighedsvurdering udført endnu", justify=tk.LEFT).pack(padx=10, pady=10)
-            
-        # Integritet sektion
-        int_frame = ttk.LabelFrame(scrollable_frame, text="Integritetsvurdering")
-        int_frame.pack(fill=tk.X, padx=20, pady=10)
-        if hasattr(self, 'integritet_result_label') and self.integritet_result_label:
-            ttk.Label(int_frame, text=self.integritet_result_label.cget("text"), justify=tk.LEFT).pack(padx=10, pady=10)
-        else:
-            ttk.Label(int_frame, text="Ingen integritetsvurdering udført endnu", justify=tk.LEFT).pack(padx=10, pady=10)
-            
-        # Robusthed sektion
-        rob_frame = ttk.LabelFrame(scrollable_frame, text="Robusthedsvurdering")
-        rob_frame.pack(fill=tk.X, padx=20, pady=10)
-        if hasattr(self, 'robusthed_result_label') and self.robusthed_result_label:
-            ttk.Label(rob_frame, text=self.robusthed_result_label.cget("text"), justify=tk.LEFT).pack(padx=10, pady=10)
-        else:
-            ttk.Label(rob_frame, text="Ingen robusthedsvurdering udført endnu", justify=tk.LEFT).pack(padx=10, pady=10)
-            
-        # Tilgængelighed sektion
-        til_frame = ttk.LabelFrame(scrollable_frame, text="Tilgængelighedsvurdering")
-        til_frame.pack(fill=tk.X, padx=20, pady=10)
-        if hasattr(self, 'tilgaengelighed_result_label') and self.tilgaengelighed_result_label:
-            ttk.Label(til_frame, text=self.tilgaengelighed_result_label.cget("text"), justify=tk.LEFT).pack(padx=10, pady=10)
-        else:
-            ttk.Label(til_frame, text="Ingen tilgængelighedsvurdering udført endnu", justify=tk.LEFT).pack(padx=10, pady=10)
+        system_frame = ttk.LabelFrame(scrollable_frame, text="System Information")
+        system_frame.pack(fill=tk.X, padx=20, pady=10)
+        self.rapport_system_label = ttk.Label(system_frame, justify=tk.LEFT)
+        self.rapport_system_label.pack(padx=10, pady=10)
+        
+        # Resultatsektioner for hver vurdering
+        self.rapport_labels = {}
+        for kategori, titel in [
+            ('fortrolighed', "Fortrolighedsvurdering"),
+            ('integritet', "Integritetsvurdering"),
+            ('robusthed', "Robusthedsvurdering"),
+            ('tilgaengelighed', "Tilgængelighedsvurdering")
+        ]:
+            frame = ttk.LabelFrame(scrollable_frame, text=titel)
+            frame.pack(fill=tk.X, padx=20, pady=10)
+            label = ttk.Label(frame, justify=tk.LEFT)
+            label.pack(padx=10, pady=10)
+            self.rapport_labels[kategori] = label
 
         # Tilføj forklaringstekst om risici og ledelsens rolle
         risk_explanation_frame = ttk.LabelFrame(scrollable_frame, text="Opsummering af Risici")
@@ -1413,233 +1081,72 @@ Ledelsens rolle og beslutningstagning:
             style='Description.TLabel'
         ).pack(padx=10, pady=10)
 
+        # Risikoniveau, identificerede risici og handlingsplan for de aktuelle svar
+        self.rapport_risiko_label = ttk.Label(risk_explanation_frame, justify=tk.LEFT, wraplength=800)
+        self.rapport_risiko_label.pack(anchor='w', padx=10, pady=10)
+        handlingsplan_frame = ttk.LabelFrame(scrollable_frame, text="Handlingsplan")
+        handlingsplan_frame.pack(fill=tk.X, padx=20, pady=10)
+        self.rapport_handlingsplan_label = ttk.Label(handlingsplan_frame, justify=tk.LEFT, wraplength=800)
+        self.rapport_handlingsplan_label.pack(anchor='w', padx=10, pady=10)
+
         # Pack canvas og scrollbar
         canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
         scrollbar.pack(side="right", fill="y")
 
-    def generer_handlingsplan(self):
-        handlinger = {
-            "Dette skal gøres med det samme (Høj prioritet)": [],
-            "Dette bør gøres snart (Mellem prioritet)": [],
-            "Dette kan gøres på længere sigt (Lav prioritet)": []
-        }
-        
-        # GDPR handlinger
-        if hasattr(self, 'gdpr_vars'):
-            gdpr_ja = [spørgsmål for spørgsmål, var in self.gdpr_vars.items() if var.get() == "Ja"]
-            
-            # Hvis der behandles følsomme personoplysninger
-            if any(x in gdpr_ja for x in [
-                "3. Behandler systemet følsomme eller særligt beskyttelsesværdige personoplysninger?",
-                "2. Behandler systemet CPR-numre eller oplysninger om strafbare forhold?"
-            ]):
-                handlinger["Dette skal gøres med det samme (Høj prioritet)"].append("Beskyt følsomme personoplysninger:")
-                handlinger["Dette skal gøres med det samme (Høj prioritet)"].extend([
-                    "  • Lav en procedure for hvordan I håndterer henvendelser fra borgere om deres data",
-                    "  • Sørg for at følsomme oplysninger er krypteret (sikret mod uautoriseret adgang)",
-                    "  • Lav en analyse af konsekvenserne ved behandling af følsomme oplysninger",
-                    "  • Dokumentér hvordan I behandler personoplysninger i jeres fortegnelse",
-                    "  • Begræns adgangen til følsomme oplysninger til kun de nødvendige medarbejdere",
-                    "  • Før log over hvem der tilgår følsomme oplysninger og hvornår",
-                    "  • Sørg for at oplysninger bliver slettet automatisk når de ikke længere er nødvendige"
-                ])
-                
-            # Hvis der mangler grundlæggende GDPR-compliance
-            if "6. Er der hjemmel til behandlingen?" not in gdpr_ja or \
-               "9. Er der udarbejdet en databehandleraftale?" not in gdpr_ja or \
-               "10. Er der etableret procedurer for sletning af personoplysninger?" not in gdpr_ja:
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].append("Få styr på de grundlæggende GDPR-krav:")
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].extend([
-                    "  • Find ud af hvilken lovhjemmel I har til at behandle oplysningerne",
-                    "  • Lav databehandleraftaler med alle leverandører der behandler data for jer",
-                    "  • Lav klare regler for hvornår og hvordan I sletter personoplysninger",
-                    "  • Opdatér jeres dokumentation over hvordan I behandler personoplysninger",
-                    "  • Sørg for at medarbejderne ved hvordan de skal håndtere personoplysninger",
-                    "  • Lav en plan for hvad I gør hvis der sker et sikkerhedsbrud"
-                ])
-
-            # Hvis der er særlige risici
-            if "5. Bliver der overført data til lande uden for EU/EØS?" in gdpr_ja or \
-               "7. Gør systemet brug af automatisk beslutningstagning eller profilering?" in gdpr_ja or \
-               "8. Foretager systemet systematisk overvågning?" in gdpr_ja or \
-               "12. Skal der udarbejdes en konsekvensanalyse?" in gdpr_ja:
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].append("Håndtér særlige GDPR-risici:")
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].extend([
-                    "  • Dokumentér hvordan I sikrer data der sendes ud af EU",
-                    "  • Indfør ekstra sikkerhed omkring automatiske beslutninger",
-                    "  • Vurdér om I skal have en databeskyttelsesrådgiver (DPO)",
-                    "  • Lav en plan for hvordan I håndterer brud på datasikkerheden",
-                    "  • Tænk databeskyttelse ind fra starten når I laver ændringer",
-                    "  • Gennemgå jeres databeskyttelse regelmæssigt"
-                ])
-
-        # Kritikalitets handlinger
-        if hasattr(self, 'kritikalitet_label'):
-            if "Kritikalitet A" in self.kritikalitet_label.cget("text"):
-                handlinger["Dette skal gøres med det samme (Høj prioritet)"].append("Sikr systemet mod nedbrud:")
-                handlinger["Dette skal gøres med det samme (Høj prioritet)"].extend([
-                    "  • Sørg for backup-systemer der kan tage over ved nedbrud",
-                    "  • Lav automatisk skift til backup-systemer hvis noget går galt",
-                    "  • Få lavet sikkerhedstest af systemet regelmæssigt",
-                    "  • Sørg for at systemet overvåges døgnet rundt",
-                    "  • Lav en plan for hvordan I kommer i gang igen efter et nedbrud"
-                ])
-            elif "Kritikalitet B" in self.kritikalitet_label.cget("text"):
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].append("Beskyt systemet mod problemer:")
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].extend([
-                    "  • Lav regelmæssig backup af alle vigtige data",
-                    "  • Lav en plan for hvordan I håndterer sikkerhedshændelser",
-                    "  • Få tjekket systemets sikkerhed mindst én gang om året",
-                    "  • Lav regler for hvordan ændringer i systemet skal godkendes"
-                ])
-
-        # Robusthed handlinger
-        if hasattr(self, 'robusthed_vars'):
-            robusthed_ja = [spørgsmål for spørgsmål, var in self.robusthed_vars.items() if var.get() == "Ja"]
-            if len(robusthed_ja) >= 3:
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].append("Gør systemet mere stabilt:")
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].extend([
-                    "  • Sørg for at systemet automatisk kan håndtere flere brugere",
-                    "  • Fordel belastningen mellem flere servere",
-                    "  • Test hvordan systemet klarer sig under høj belastning",
-                    "  • Beskyt systemet mod overbelastning",
-                    "  • Overvåg systemets ydeevne løbende"
-                ])
-
-        # Tilgængelighed handlinger
-        if hasattr(self, 'tilgaengelighed_vars'):
-            kritiske_perioder = [spørgsmål for spørgsmål, var in self.tilgaengelighed_vars.items() 
-                               if var.get() in ["Alvorlige konsekvenser", "Kritiske konsekvenser"]]
-            if kritiske_perioder:
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].append("Sørg for at systemet er tilgængeligt:")
-                handlinger["Dette bør gøres snart (Mellem prioritet)"].extend([
-                    "  • Overvåg om systemet er oppe og kører",
-                    "  • Få besked automatisk hvis der er problemer",
-                    "  • Planlæg hvor mange brugere systemet skal kunne håndtere",
-                    "  • Planlæg hvornår I bedst kan lave vedligeholdelse",
-                    "  • Skriv ned hvordan I holder systemet kørende"
-                ])
-
-        return handlinger
-
-    def beregn_risiko_niveau(self):
-        # Beregn sandsynlighed (1-4) baseret på svar
-        sandsynlighed = 1
-        
-        if hasattr(self, 'robusthed_vars'):
-            ja_count_robusthed = sum(1 for var in self.robusthed_vars.values() if var.get() == "Ja")
-            sandsynlighed += min(ja_count_robusthed, 2)  # Max +2 fra robusthed
-            
-        if hasattr(self, 'tilgaengelighed_vars'):
-            kritiske_perioder = sum(1 for var in self.tilgaengelighed_vars.values() 
-                                  if var.get() in ["Alvorlige konsekvenser", "Kritiske konsekvenser"])
-            sandsynlighed += min(kritiske_perioder // 2, 1)  # Max +1 fra tilgængelighed
-            
-        # Beregn konsekvens (1-4) baseret på svar
-        konsekvens = 1
-        
-        if hasattr(self, 'kritikalitet_label'):
-            if "Kritikalitet A" in self.kritikalitet_label.cget("text"):
-                konsekvens = 4
-            elif "Kritikalitet B" in self.kritikalitet_label.cget("text"):
-                konsekvens = 3
-            elif "Kritikalitet C" in self.kritikalitet_label.cget("text"):
-                konsekvens = 2
-                
-        if hasattr(self, 'gdpr_vars'):
-            if self.gdpr_vars["3. Behandler systemet følsomme eller særligt beskyttelsesværdige personoplysninger?"].get() == "Ja":
-                konsekvens = max(konsekvens, 3)
-                
-        if hasattr(self, 'fortrolighed_vars'):
-            ja_count_fortrolighed = sum(1 for var in self.fortrolighed_vars.values() if var.get() == "Ja")
-            if ja_count_fortrolighed >= 4:
-                konsekvens = max(konsekvens, 3)
-                
-        return sandsynlighed, konsekvens
-
-    def generer_risikomatrix(self, sandsynlighed, konsekvens):
-        # Opret en 4x4 matrix som et billede
-        width = 800
-        height = 800
-        cell_size = width // 4
-        img = PILImage.new('RGB', (width, height), 'white')
-        draw = ImageDraw.Draw(img)
-        
-        # Definer farver
-        colors_matrix = [
-            [(0,128,0), (0,128,0), (255,255,0), (255,165,0)],  # Første række
-            [(0,128,0), (255,255,0), (255,165,0), (255,0,0)],  # Anden række
-            [(255,255,0), (255,165,0), (255,0,0), (255,0,0)],  # Tredje række
-            [(255,165,0), (255,0,0), (255,0,0), (255,0,0)]     # Fjerde række
-        ]
-        
-        # Tegn celler med farver
-        for i in range(4):
-            for j in range(4):
-                x1 = j * cell_size
-                y1 = i * cell_size
-                x2 = x1 + cell_size
-                y2 = y1 + cell_size
-                cell_color = colors_matrix[i][j]
-                draw.rectangle([x1, y1, x2, y2], fill=cell_color, outline='black')
-                
-                # Tilføj tekst
-                if i == j == 0:
-                    text = "Lav"
-                elif i == 0 and j == 1:
-                    text = "Lav"
-                elif i == 0 and j == 2:
-                    text = "Middel"
-                elif i == 0 and j == 3:
-                    text = "Høj"
-                elif i == 1 and j == 0:
-                    text = "Lav"
-                elif i == 1 and j == 1:
-                    text = "Middel"
-                elif i == 1 and j == 2:
-                    text = "Høj"
-                elif i == 1 and j == 3:
-                    text = "Kritisk"
-                elif i == 2 and j == 0:
-                    text = "Middel"
-                elif i == 2 and j == 1:
-                    text = "Høj"
-                elif i == 2 and j == 2:
-                    text = "Kritisk"
-                elif i == 2 and j == 3:
-                    text = "Kritisk"
-                elif i == 3 and j == 0:
-                    text = "Høj"
-                else:
-                    text = "Kritisk"
-                
-                # Brug default font i stedet for at prøve at loade arial
-                font = ImageFont.load_default()
-                
-                # Centrér tekst i cellen
-                text_bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                
-                x = x1 + (cell_size - text_width) // 2
-                y = y1 + (cell_size - text_height) // 2
-                draw.text((x, y), text, fill='black', font=font)
-        
-        # Marker den aktuelle risiko
-        current_x = (konsekvens - 1) * cell_size
-        current_y = (sandsynlighed - 1) * cell_size
-        draw.rectangle([current_x, current_y, current_x + cell_size, current_y + cell_size], 
-                      outline='black', width=5)
-        
-        # Gem billedet midlertidigt
-        matrix_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "risikomatrix_temp.png")
-        img.save(matrix_path)
-        return matrix_path
+    def opdater_rapport_side(self):
+        """Opdaterer de sektioner af den samlede rapport der er ændret siden sidst"""
+        if self.rapport_versioner.get('system_info') != self.versioner['system_info']:
+            self.rapport_versioner['system_info'] = self.versioner['system_info']
+            system_info_text = f"""
+System: {self.system_name.get()}
+Ejer: {self.system_owner.get()}
+Leverandør: {self.system_supplier.get()}
+Ansvarlig: {self.assessment_responsible.get()}
+Dato: {self.assessment_date.get()}
+"""
+            self.rapport_system_label.config(text=system_info_text)
+        
+        # Resultaterne ligger allerede i tilstandens løbende scorer, så en ændret
+        # kategori koster ét opslag, og labelen røres kun hvis teksten skifter
+        for kategori, label in self.rapport_labels.items():
+            if self.rapport_versioner.get(kategori) == self.versioner[kategori]:
+                continue
+            self.rapport_versioner[kategori] = self.versioner[kategori]
+            resultat = self.tilstand.resultat(kategori)
+            if label.cget("text") != resultat:
+                label.config(text=resultat)
+
+        # Risiko og handlingsplan afhænger af alle svar, men beregnes kun når
+        # svartilstanden er ny (se risikomotor.resultater)
+        svar_versioner = tuple(self.versioner[kategori] for kategori in risikomotor.KATEGORIER)
+        if self.rapport_versioner.get('resultater') != svar_versioner:
+            self.rapport_versioner['resultater'] = svar_versioner
+            resultater = self.resultater()
+            linjer = [f"Samlet risikoniveau: {resultater.risikoniveau} "
+                      f"(sandsynlighed {resultater.sandsynlighed}/4, konsekvens {resultater.konsekvens}/4)"]
+            for gruppe, risici in resultater.opsummering.items():
+                if risici:
+                    linjer.append(f"\n{gruppe}:")
+                    linjer.extend(risici)
+            self.rapport_risiko_label.config(text="\n".join(linjer))
+            linjer = []
+            for prioritet, handlinger in resultater.handlingsplan.items():
+                if handlinger:
+                    linjer.append(f"{prioritet}:")
+                    linjer.extend(handlinger)
+                    linjer.append("")
+            self.rapport_handlingsplan_label.config(text="\n".join(linjer).strip() or "Ingen handlinger")
+
+    def resultater(self):
+        """Afledte resultater for de aktuelle svar, delt med PDF-eksporten"""
+        return self.tilstand.resultater()
 
     def export_to_pdf(self):
-        matrix_path = None
+        if self.pdf_eksport is not None:
+            messagebox.showinfo("PDF eksport", "Der er allerede en PDF eksport i gang.")
+            return
         try:
-            print("Starter PDF eksport")
+            logger.info("Starter PDF eksport")
             
             filename = filedialog.asksaveasfilename(
                 defaultextension=".pdf",
@@ -1648,430 +1155,373 @@ Ledelsens rolle og beslutningstagning:
             )
             
             if not filename:
-                print("Ingen fil valgt - eksport annulleret")
+                logger.info("Ingen fil valgt - eksport annulleret")
                 return
                 
-            print(f"Eksporterer til: {filename}")
+            logger.info("Eksporterer til: %s", filename)
             
-            # Beregn risiko niveau
-            try:
-                print("Beregner risikoniveau")
-                sandsynlighed, konsekvens = self.beregn_risiko_niveau()
-                print(f"Risikoniveau beregnet: Sandsynlighed={sandsynlighed}, Konsekvens={konsekvens}")
-            except Exception as e:
-                print(f"Fejl i risikoberegning: {str(e)}")
-                raise Exception(f"Kunne ikke beregne risikoniveau: {str(e)}")
-            
-            # Generer risikomatrix
-            try:
-                print("Genererer risikomatrix")
-                matrix_path = self.generer_risikomatrix(sandsynlighed, konsekvens)
-                print(f"Risikomatrix gemt til: {matrix_path}")
-                
-                # Verificer at matrix billedet eksisterer og kan åbnes
-                if not os.path.exists(matrix_path):
-                    raise Exception("Risikomatrix billedet blev ikke genereret korrekt")
-                    
-                # Test at billedet kan åbnes
-                try:
-                    with PILImage.open(matrix_path) as img:
-                        img.verify()
-                except Exception as e:
-                    raise Exception(f"Kunne ikke validere risikomatrix billedet: {str(e)}")
-                    
-            except Exception as e:
-                print(f"Fejl ved generering af risikomatrix: {str(e)}")
-                raise Exception(f"Kunne ikke generere risikomatrix: {str(e)}")
-
-            # Opret PDF dokument
-            try:
-                print("Opretter PDF dokument")
-                doc = SimpleDocTemplate(
-                    filename,
-                    pagesize=A4,
-                    rightMargin=72,
-                    leftMargin=72,
-                    topMargin=72,
-                    bottomMargin=72
-                )
-                print("PDF dokument oprettet")
-            except Exception as e:
-                print(f"Fejl ved oprettelse af PDF dokument: {str(e)}")
-                raise Exception(f"Kunne ikke oprette PDF dokument: {str(e)}")
-
-            styles = getSampleStyleSheet()
-            title_style = styles['Heading1']
-            heading_style = styles['Heading2']
-            normal_style = styles['Normal']
-            
-            elements = []
-            print("Tilføjer indhold til PDF")
-
-            try:
-                # Titel
-                elements.append(Paragraph("IT Risikovurdering", title_style))
-                elements.append(Spacer(1, 20))
-
-                # System Information
-                if hasattr(self, 'system_name'):
-                    elements.append(Paragraph("System Information", heading_style))
-                    elements.append(Spacer(1, 10))
-                    system_info = [
-                        ["System:", self.system_name.get()],
-                        ["Ejer:", self.system_owner.get()],
-                        ["Leverandør:", self.system_supplier.get()],
-                        ["Ansvarlig:", self.assessment_responsible.get()],
-                        ["Dato:", self.assessment_date.get()]
-                    ]
-                    t = Table(system_info, colWidths=[100, 400])
-                    t.setStyle(TableStyle([
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-                        ('PADDING', (0, 0), (-1, -1), 6),
-                    ]))
-                    elements.append(t)
-                    elements.append(Spacer(1, 20))
-
-                # Risikomatrix sektion
-                elements.append(Paragraph("Samlet Risikovurdering", heading_style))
-                elements.append(Spacer(1, 10))
-                
-                risk_levels = {
-                    (1,1): "Lav", (1,2): "Lav", (1,3): "Middel", (1,4): "Høj",
-                    (2,1): "Lav", (2,2): "Middel", (2,3): "Høj", (2,4): "Kritisk",
-                    (3,1): "Middel", (3,2): "Høj", (3,3): "Kritisk", (3,4): "Kritisk",
-                    (4,1): "Høj", (4,2): "Kritisk", (4,3): "Kritisk", (4,4): "Kritisk"
-                }
-                current_risk = risk_levels.get((sandsynlighed, konsekvens), "Ukendt")
-                
-                elements.append(Paragraph(
-                    f"Baseret på alle vurderinger er systemets risikoniveau: {current_risk}",
-                    normal_style
-                ))
-                elements.append(Paragraph(
-                    f"• Sandsynlighed: {sandsynlighed}/4",
-                    normal_style
-                ))
-                elements.append(Paragraph(
-                    f"• Konsekvens: {konsekvens}/4",
-                    normal_style
-                ))
-                elements.append(Spacer(1, 20))
-                
-                # Risiko-opsummering
-                elements.append(Paragraph("Opsummering af Risici", heading_style))
-                elements.append(Spacer(1, 10))
-                
-                risk_explanation_text = """Denne sektion giver en kort opsummering af de identificerede risici og deres betydning for organisationen. Formålet er at sikre, at ledelsen forstår risikobilledet og kan træffe informerede beslutninger om håndteringen.
-
-Ledelsens rolle og beslutningstagning:
-• Ledelsen skal tage stilling til hver identificeret risiko og enten acceptere, reducere eller eliminere den.
-• Beslutningen bør tage udgangspunkt i risikovurderingens prioritering og organisationens risikotolerance.
-• Det skal være tydeligt, hvad hver risiko indebærer, samt hvilke konsekvenser en accept eller afvisning kan have."""
-
-                for line in risk_explanation_text.split('\n'):
-                    if line.strip():
-                        if line.startswith('•'):
-                            # Indrykket bullet point
-                            elements.append(Paragraph('    ' + line, normal_style))
-                        else:
-                            elements.append(Paragraph(line, normal_style))
-                        elements.append(Spacer(1, 6))
-
-                elements.append(Spacer(1, 12))
-
-                # Tilføj risikomatrix billede
-                if os.path.exists(matrix_path):
-                    img = Image(matrix_path)
-                    img.drawHeight = 300
-                    img.drawWidth = 400
-                    elements.append(img)
-                    elements.append(Spacer(1, 20))
-                else:
-                    print("Risikomatrix billede ikke fundet")
-
-                # Handlingsplan
-                elements.append(Paragraph("Handlingsplan", heading_style))
-                elements.append(Spacer(1, 10))
-                
-                handlinger = self.generer_handlingsplan()
-                for prioritet, actions in handlinger.items():
-                    if actions:
-                        if "Høj" in prioritet:
-                            color = colors.red
-                        elif "Mellem" in prioritet:
-                            color = colors.orange
-                        else:
-                            color = colors.green
-                            
-                        elements.append(Paragraph(
-                            f'<font color="{color}">{prioritet}</font>',
-                            heading_style
-                        ))
-                        elements.append(Spacer(1, 10))
-                        
-                        for action in actions:
-                            if action.startswith("  •"):
-                                elements.append(Paragraph(f"    {action}", normal_style))
-                            else:
-                                elements.append(Paragraph(action, normal_style))
-                        elements.append(Spacer(1, 15))
-
-                # Tilføj dato og tid
-                elements.append(Spacer(1, 30))
-                
-                # Tilføj opfølgningstekst
-                elements.append(PageBreak())
-                elements.append(Paragraph("Opfølgning på Risikovurdering", heading_style))
-                elements.append(Spacer(1, 10))
-                
-                followup_text = """⚠ VIGTIGT: Opfølgning og Vedligeholdelse af Risikovurdering
-
-• Når de anførte foranstaltninger med høj prioritet er implementeret, skal der udføres en ny risikovurdering for at vurdere effekten og identificere eventuelle nye risici.
-
-• Risikovurderingen er en løbende proces, der skal gentages mindst én gang om året eller ved væsentlige ændringer i programmet."""
-
-                for line in followup_text.split('\n'):
-                    if line.strip():
-                        if line.startswith('•'):
-                            # Indrykket bullet point
-                            elements.append(Paragraph('    ' + line, normal_style))
-                        else:
-                            elements.append(Paragraph(line, heading_style))
-                        elements.append(Spacer(1, 8))
-                
-                elements.append(Spacer(1, 20))
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                elements.append(Paragraph(f"Rapport genereret: {current_time}", normal_style))
-
-                # Gem PDF
-                print("Bygger PDF dokument")
-                doc.build(elements)
-                print("PDF rapport gemt succesfuldt")
-                messagebox.showinfo("Success", "PDF rapport er blevet genereret!")
-                
-            except Exception as e:
-                print(f"Fejl ved generering af PDF indhold: {str(e)}")
-                raise Exception(f"Kunne ikke generere PDF indhold: {str(e)}")
+            # Rapporten bygges i baggrunden ud fra de aktuelle svar
+            self.pdf_eksport = PdfEksport(self.saml_vurdering_data(), filename)
+            self.vis_pdf_fremskridt()
+            self.master.after(PDF_POLL_MS, self.hent_pdf_meldinger)
 
         except Exception as e:
-            print(f"Fejl under PDF eksport: {str(e)}")
+            logger.exception("Fejl under PDF eksport")
             messagebox.showerror("Fejl", f"Der opstod en fejl under generering af PDF rapport:\n{str(e)}")
 
-        finally:
-            # Opryd midlertidige filer
-            if matrix_path and os.path.exists(matrix_path):
-                try:
-                    os.remove(matrix_path)
-                    print("Midlertidig matrix fil slettet")
-                except Exception as e:
-                    print(f"Kunne ikke slette midlertidig matrix fil: {str(e)}")
+    def vis_pdf_fremskridt(self):
+        """Viser et lille vindue med eksportens fremskridt og en annuller-knap"""
+        vindue = tk.Toplevel(self.master)
+        vindue.title("PDF eksport")
+        vindue.resizable(False, False)
+        vindue.protocol("WM_DELETE_WINDOW", self.annuller_pdf_eksport)
+        ramme = ttk.Frame(vindue, padding=20)
+        ramme.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(ramme, text=f"Eksporterer til {os.path.basename(self.pdf_eksport.filename)}").pack(anchor='w')
+        self.pdf_fremskridt = ttk.Progressbar(ramme, length=300, maximum=100)
+        self.pdf_fremskridt.pack(fill=tk.X, pady=10)
+        self.pdf_status = ttk.Label(ramme, text="Starter")
+        self.pdf_status.pack(anchor='w')
+        ttk.Button(ramme, text="Annuller", command=self.annuller_pdf_eksport).pack(pady=(10, 0))
+        self.pdf_vindue = vindue
+
+    def annuller_pdf_eksport(self):
+        if self.pdf_eksport is not None:
+            self.pdf_eksport.annuller()
+            self.pdf_status.config(text="Annullerer...")
+
+    def hent_pdf_meldinger(self):
+        """Henter eksportens meldinger i Tk-tråden og opdaterer fremskridtsvinduet"""
+        eksport = self.pdf_eksport
+        while True:
+            try:
+                hvad, vaerdi = eksport.meldinger.get_nowait()
+            except queue.Empty:
+                break
+            if hvad == 'fremskridt':
+                andel, tekst = vaerdi
+                self.pdf_fremskridt.config(value=andel * 100)
+                self.pdf_status.config(text=tekst)
+                continue
+
+            self.pdf_eksport = None
+            self.pdf_vindue.destroy()
+            if hvad == 'faerdig':
+                logger.info("PDF rapport gemt succesfuldt")
+                messagebox.showinfo("Success", "PDF rapport er blevet genereret!")
+            elif hvad == 'annulleret':
+                logger.info("PDF eksport annulleret af brugeren")
+            else:
+                messagebox.showerror("Fejl", f"Der opstod en fejl under generering af PDF rapport:\n{vaerdi}")
+            return
+        self.master.after(PDF_POLL_MS, self.hent_pdf_meldinger)
     
     def gem_vurdering(self):
         try:
-            print("Starter gemning af vurdering")
+            logger.info("Starter gemning af vurdering")
             # Få filnavn fra bruger
             filename = filedialog.asksaveasfilename(
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json")],
+                filetypes=[("JSON files", "*.json"), ("Kompakt arkiv", "*" + arkiv.ENDELSE)],
                 title="Gem vurdering som"
             )
             
-            print(f"Valgt filnavn: {filename}")
+            logger.debug("Valgt filnavn: %s", filename)
             
             if not filename:
-                print("Ingen fil valgt - afbryder gemning")
+                logger.info("Ingen fil valgt - afbryder gemning")
                 return
                 
-            # Initialiser data dictionary med tomme værdier
-            data = {
-                "system_info": {
-                    "navn": "",
-                    "ejer": "",
-                    "leverandør": "",
-                    "ansvarlig": "",
-                    "dato": "",
-                    "system_description": ""
-                },
-                "kritikalitet": {},
-                "gdpr": {},
-                "fortrolighed": {},
-                "integritet": {},
-                "robusthed": {},
-                "tilgaengelighed": {}
-            }
+            data = self.saml_vurdering_data()
             
-            # Gem system info
-            try:
-                print("Gemmer system information")
-                if hasattr(self, 'system_name') and self.system_name is not None:
-                    data["system_info"]["navn"] = self.system_name.get()
-                    print(f"System navn gemt: {data['system_info']['navn']}")
-                if hasattr(self, 'system_owner') and self.system_owner is not None:
-                    data["system_info"]["ejer"] = self.system_owner.get()
-                if hasattr(self, 'system_supplier') and self.system_supplier is not None:
-                    data["system_info"]["leverandør"] = self.system_supplier.get()
-                if hasattr(self, 'assessment_responsible') and self.assessment_responsible is not None:
-                    data["system_info"]["ansvarlig"] = self.assessment_responsible.get()
-                if hasattr(self, 'assessment_date') and self.assessment_date is not None:
-                    data["system_info"]["dato"] = self.assessment_date.get()
-                if hasattr(self, 'system_description'):
-                    data["system_info"]["system_description"] = self.system_description.get("1.0", tk.END).strip()
-
-            except Exception as e:
-                print(f"Fejl under gemning af system info: {str(e)}")
-            
-            # Gem vurderinger og kommentarer
-            categories = {
-                'kritikalitet': (self.kritikalitet_vars, self.kritikalitet_comments),
-                'gdpr': (self.gdpr_vars, self.gdpr_comments),
-                'fortrolighed': (self.fortrolighed_vars, self.fortrolighed_comments),
-                'integritet': (self.integritet_vars, self.integritet_comments),
-                'robusthed': (self.robusthed_vars, self.robusthed_comments),
-                'tilgaengelighed': (self.tilgaengelighed_vars, self.tilgaengelighed_comments)
-            }
+            # Log data før gemning (formateres kun hvis DEBUG er slået til)
+            logger.debug("Data der skal gemmes: %s", data)
             
-            for category, (vars_dict, comments_dict) in categories.items():
-                print(f"Gemmer {category} data")
-                data[category] = {}  # Initialiser tom dictionary for kategorien
-                
-                for key, var in vars_dict.items():
-                    try:
-                        if var is not None:
-                            value = var.get() if hasattr(var, 'get') else ""
-                            comment = ""
-                            
-                            # Håndter kommentarer korrekt baseret på deres type
-                            if key in comments_dict:
-                                if isinstance(comments_dict[key], tk.Text):
-                                    comment = comments_dict[key].get("1.0", tk.END).strip()
-                                elif isinstance(comments_dict[key], str):
-                                    comment = str(comments_dict[key])
-                            
-                            # Gem både svar og kommentar i data dictionary
-                            data[category][key] = {
-                                "svar": value,
-                                "kommentar": comment
-                            }
-                            print(f"Gemt {category} svar: {value} og kommentar for {key}")
-                    except Exception as e:
-                        print(f"Fejl under gemning af {category} variabel {key}: {str(e)}")
-                        data[category][key] = {"svar": "", "kommentar": ""}
-            
-            # Log data før gemning
-            print("Data der skal gemmes:")
-            print(str(data))
-            
-            # Gem til fil
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-                
-            print(f"Vurdering gemt succesfuldt til {filename}")
+            # Gem til fil via en midlertidig fil, så et nedbrud ikke efterlader en halv fil
+            if filename.lower().endswith(arkiv.ENDELSE):
+                arkiv.skriv_arkiv(filename, [data])
+            else:
+                autogem.skriv_atomisk(filename, data)
+
+            logger.info("Vurdering gemt succesfuldt til %s", filename)
             messagebox.showinfo("Success", "Vurderingen er blevet gemt!")
             
         except Exception as e:
-            print(f"Fejl under gemning af vurdering: {str(e)}")
+            logger.exception("Fejl under gemning af vurdering")
             messagebox.showerror("Fejl", f"Der opstod en fejl under gemning af vurderingen:\n{str(e)}")
 
+    def eksporter_arkiv(self):
+        """Eksporterer alle vurderinger i databasen til ét komprimeret arkiv"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=arkiv.ENDELSE,
+            filetypes=[("Kompakt arkiv", "*" + arkiv.ENDELSE)],
+            title="Eksportér alle vurderinger som"
+        )
+        if not filename:
+            return
+        try:
+            antal = arkiv.skriv_arkiv(filename, self.lager.alle())
+            logger.info("%d vurderinger eksporteret til %s", antal, filename)
+            messagebox.showinfo("Success", f"{antal} vurderinger er blevet eksporteret!")
+        except Exception as e:
+            logger.exception("Fejl under eksport af arkiv")
+            messagebox.showerror("Fejl", f"Der opstod en fejl under eksport af arkivet:\n{str(e)}")
+
+    def gem_i_lager(self):
+        """Gemmer den åbne vurdering i databasen i én transaktion"""
+        data = self.saml_vurdering_data()
+        self.vurdering_id = self.lager.gem(data, self.vurdering_id)
+        logger.info("Vurdering gemt i databasen med id %s", self.vurdering_id)
+        self.autogem.gemt(self.vurdering_id)
+        self.load_recent_assessments()
+        messagebox.showinfo("Success", "Vurderingen er blevet gemt!")
+
+    def saml_vurdering_data(self):
+        """Samler alle svar og kommentarer i det format der gemmes som JSON"""
+        # Initialiser data dictionary med tomme værdier
+        data = {
+            "system_info": {
+                "navn": "",
+                "ejer": "",
+                "leverandør": "",
+                "ansvarlig": "",
+                "dato": "",
+                "system_description": ""
+            },
+            "kritikalitet": {},
+            "gdpr": {},
+            "fortrolighed": {},
+            "integritet": {},
+            "robusthed": {},
+            "tilgaengelighed": {}
+        }
+        
+        # Gem system info
+        try:
+            if hasattr(self, 'system_name') and self.system_name is not None:
+                data["system_info"]["navn"] = self.system_name.get()
+            if hasattr(self, 'system_owner') and self.system_owner is not None:
+                data["system_info"]["ejer"] = self.system_owner.get()
+            if hasattr(self, 'system_supplier') and self.system_supplier is not None:
+                data["system_info"]["leverandør"] = self.system_supplier.get()
+            if hasattr(self, 'assessment_responsible') and self.assessment_responsible is not None:
+                data["system_info"]["ansvarlig"] = self.assessment_responsible.get()
+            if hasattr(self, 'assessment_date') and self.assessment_date is not None:
+                data["system_info"]["dato"] = self.assessment_date.get()
+            data["system_info"]["system_description"] = self.hent_system_beskrivelse()
+
+        except Exception as e:
+            logger.warning("Fejl under gemning af system info: %s", e)
+        
+        # Gem vurderinger og kommentarer
+        categories = {
+            'kritikalitet': (self.kritikalitet_vars, self.kritikalitet_comments),
+            'gdpr': (self.gdpr_vars, self.gdpr_comments),
+            'fortrolighed': (self.fortrolighed_vars, self.fortrolighed_comments),
+            'integritet': (self.integritet_vars, self.integritet_comments),
+            'robusthed': (self.robusthed_vars, self.robusthed_comments),
+            'tilgaengelighed': (self.tilgaengelighed_vars, self.tilgaengelighed_comments)
+        }
+        
+        for category, (vars_dict, comments_dict) in categories.items():
+            data[category] = {}  # Initialiser tom dictionary for kategorien
+            spoergsmaal = risikomotor.KATALOG[category].spoergsmaal
+            
+            for sp, (key, var) in zip(spoergsmaal, vars_dict.items()):
+                try:
+                    if var is not None:
+                        value = var.get() if hasattr(var, 'get') else ""
+                        comment = ""
+                        
+                        # Håndter kommentarer korrekt baseret på deres type
+                        if key in comments_dict:
+                            if isinstance(comments_dict[key], tk.Text):
+                                comment = comments_dict[key].get("1.0", tk.END).strip()
+                            elif isinstance(comments_dict[key], str):
+                                comment = str(comments_dict[key])
+                            else:
+                                comment = comments_dict[key].get()
+                        
+                        # Gem både svar og kommentar i data dictionary
+                        data[category][key] = {
+                            "id": sp.id,
+                            "svar": value,
+                            "kommentar": comment
+                        }
+                        if sp.id in self.gdpr_text_vars:
+                            uddybende = self.gdpr_text_vars[sp.id].get().strip()
+                            if uddybende:
+                                data[category][key]["uddybende"] = uddybende
+                except Exception as e:
+                    logger.warning("Fejl under gemning af %s variabel %s: %s", category, key, e)
+                    data[category][key] = {"id": sp.id, "svar": "", "kommentar": ""}
+        
+        return data
+
     def aabn_vurdering(self):
         try:
             # Få filnavn fra bruger
             filename = filedialog.askopenfilename(
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json")],
+                filetypes=[("JSON files", "*.json"), ("Kompakt arkiv", "*" + arkiv.ENDELSE)],
                 title="Åbn vurdering"
             )
             
             if not filename:
                 return
                 
-            print(f"Åbner fil: {filename}")
-            
-            # Læs data fra fil
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Indlæs system info
-            if "system_info" in data:
-                if hasattr(self, 'system_name'):
-                    self.system_name.set(data["system_info"].get("navn", ""))
-                if hasattr(self, 'system_owner'):
-                    self.system_owner.set(data["system_info"].get("ejer", ""))
-                if hasattr(self, 'system_supplier'):
-                    self.system_supplier.set(data["system_info"].get("leverandør", ""))
-                if hasattr(self, 'assessment_responsible'):
-                    self.assessment_responsible.set(data["system_info"].get("ansvarlig", ""))
-                if hasattr(self, 'assessment_date'):
-                    self.assessment_date.set(data["system_info"].get("dato", ""))
-                if hasattr(self, 'system_description'):
-                    self.system_description.delete("1.0", tk.END)
-                    self.system_description.insert("1.0", data["system_info"].get("system_description", ""))
+            logger.info("Åbner fil: %s", filename)
             
-            # Indlæs vurderinger
-            categories = {
-                'kritikalitet': self.kritikalitet_vars,
-                'gdpr': self.gdpr_vars,
-                'fortrolighed': self.fortrolighed_vars,
-                'integritet': self.integritet_vars,
-                'robusthed': self.robusthed_vars,
-                'tilgaengelighed': self.tilgaengelighed_vars
-            }
-            
-            for category, vars_dict in categories.items():
-                if category in data:
-                    print(f"Indlæser {category} data")
-                    for key, value_data in data[category].items():
-                        try:
-                            # Håndter både nyt og gammelt format
-                            if isinstance(value_data, dict):
-                                if key in vars_dict:
-                                    vars_dict[key].set(value_data.get("svar", ""))
-                                # Indlæs kommentar hvis den findes
-                                comment_dict_name = f'{category}_comments'
-                                if "kommentar" in value_data and hasattr(self, comment_dict_name):
-                                    comment_dict = getattr(self, comment_dict_name)
-                                    if isinstance(comment_dict, dict) and key in comment_dict:
-                                        if isinstance(comment_dict[key], tk.Text):
-                                            comment_dict[key].delete("1.0", tk.END)
-                                            comment_dict[key].insert("1.0", value_data["kommentar"])
-                            else:
-                                # Gammelt format hvor value_data er selve svaret
-                                if key in vars_dict:
-                                    vars_dict[key].set(value_data)
-                        except Exception as e:
-                            print(f"Fejl under indlæsning af {category} svar {key}: {str(e)}")
-                            continue
-
-            # Opdater resultater
-            if hasattr(self, 'update_kritikalitet'):
-                self.update_kritikalitet()
-            if hasattr(self, 'update_fortrolighed_result'):
-                self.update_fortrolighed_result()
-            if hasattr(self, 'update_integritet_result'):
-                self.update_integritet_result()
-            if hasattr(self, 'update_robusthed_result'):
-                self.update_robusthed_result()
-            if hasattr(self, 'update_tilgaengelighed_result'):
-                self.update_tilgaengelighed_result()
-
-            messagebox.showinfo("Success", "Vurdering er blevet indlæst!")
+            # Læs data fra fil; fra et arkiv åbnes den første vurdering
+            try:
+                if arkiv.er_arkiv(filename):
+                    with open(filename, 'rb') as f:
+                        data = next(iter(arkiv.Arkivlaeser(f)), None)
+                    if data is None:
+                        raise ValueError("Arkivet indeholder ingen vurderinger")
+                else:
+                    with open(filename, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                advarsler = risikomotor.valider(data)
+            except (ValueError, UnicodeDecodeError) as e:
+                logger.warning("Ugyldig vurderingsfil %s: %s", filename, e)
+                messagebox.showerror("Ugyldig fil", f"Filen kan ikke åbnes som en vurdering:\n{str(e)}")
+                return
+
+            start = time.perf_counter()
+            self.indlaes_vurdering(data)
+            logger.info("Vurdering indlæst på %.1f ms", (time.perf_counter() - start) * 1000)
+            # En importeret fil bliver en ny vurdering, når den gemmes i databasen,
+            # og indtil da er hele filen ugemt arbejde
+            self.vurdering_id = None
+            self.autogem.skift(autogem.ny_noegle())
+            self.autogem.kompakter()
+
+            if advarsler:
+                for advarsel in advarsler:
+                    logger.warning("%s: %s", filename, advarsel)
+                vist = "\n".join(advarsler[:10])
+                if len(advarsler) > 10:
+                    vist += f"\n... og {len(advarsler) - 10} mere"
+                messagebox.showwarning(
+                    "Vurdering indlæst med advarsler",
+                    f"Vurderingen er indlæst, men følgende blev sprunget over:\n\n{vist}")
+            else:
+                messagebox.showinfo("Success", "Vurdering er blevet indlæst!")
                 
         except Exception as e:
-            print(f"Fejl under åbning af vurdering: {str(e)}")
+            logger.exception("Fejl under åbning af vurdering")
             messagebox.showerror("Fejl", f"Der opstod en fejl under åbning af vurderingen:\n{str(e)}")
 
+    def indlaes_vurdering(self, data):
+        """Sætter systeminformation, svar og kommentarer ud fra en vurdering i gem-format.
+
+        Alle variabler sættes i ét gennemløb mens journal og ændringshåndtering
+        er slået fra, og resultaterne beregnes og vises én gang til sidst.
+        Spørgsmål der ikke står i data, eller har et ugyldigt svar, får
+        standardsvaret og ingen kommentar.
+        """
+        besvarelse = risikomotor.laes_svar(data)
+        svar = risikomotor.Besvarelse(
+            (k.noegle, [s if s in k.svarmuligheder else k.standardsvar for s in besvarelse[k.noegle]])
+            for k in risikomotor.KATALOG)
+        tekster = {sp_id: (kommentar, uddybende)
+                   for _, sp_id, _, _, kommentar, uddybende in lager.svar_raekker(None, data)}
+        system_info = data.get("system_info", {})
+
+        def saet(var, vaerdi):
+            # Uændrede variabler røres ikke, så de ikke udløser traces og omtegning
+            if var.get() != vaerdi:
+                var.set(vaerdi)
+
+        with self.autogem.pauset():
+            self._indlaeser = True
+            try:
+                for felt, var in self.system_felter.items():
+                    saet(var, system_info.get(felt) or "")
+                self.saet_system_beskrivelse(system_info.get("system_description") or "")
+
+                for k in risikomotor.KATALOG:
+                    vars_dict = getattr(self, f"{k.noegle}_vars")
+                    comments = getattr(self, f"{k.noegle}_comments")
+                    for sp, s in zip(k.spoergsmaal, svar[k.noegle]):
+                        kommentar, uddybende = tekster.get(sp.id, ("", ""))
+                        saet(vars_dict[sp.tekst], s)
+                        saet(comments[sp.tekst], kommentar)
+                        if sp.id in self.gdpr_text_vars:
+                            saet(self.gdpr_text_vars[sp.id], uddybende)
+                    self.marker_aendret(k.noegle)
+                self.tilstand.nulstil(svar)
+            finally:
+                self._indlaeser = False
+
+        self.marker_aendret('system_info')
+
+        # Vis resultaterne én gang
+        self.vis_kritikalitet()
+        self.vis_fortrolighed_result()
+        self.vis_integritet_result()
+        self.vis_robusthed_result()
+        self.vis_tilgaengelighed_result()
+
     def load_recent_assessments(self):
-        # Her skal vi tilføje koden til at indlæse seneste vurderinger
-        # Dette er bare eksempel data
+        """Viser de senest gemte vurderinger fra databasen"""
+        self.vis_vurderingsliste(
+            self.lager.seneste(),
+            lambda raekke: f"Kritikalitet {raekke['kritikalitet']}, risiko {raekke['risikoniveau']}")
+
+    def soeg_vurderinger(self, event=None):
+        """Viser søgeresultater i listen, eller de seneste vurderinger hvis feltet er tomt"""
+        tekst = self.soege_tekst.get().strip()
+        if not tekst:
+            self.load_recent_assessments()
+            return
+        try:
+            start = time.perf_counter()
+            raekker = self.lager.soeg(tekst)
+            logger.debug("Søgning efter %r gav %d træf på %.1f ms",
+                         tekst, len(raekker), (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            logger.exception("Fejl under søgning")
+            messagebox.showerror("Fejl", f"Søgningen kunne ikke gennemføres:\n{str(e)}")
+            return
+        if not raekker:
+            self.vis_vurderingsliste([], None)
+            self.recent_listbox.insert(tk.END, "Ingen vurderinger matcher søgningen")
+            return
+        self.vis_vurderingsliste(raekker, lambda raekke: raekke["uddrag"])
+
+    def vis_vurderingsliste(self, raekker, detaljer):
+        """Fylder listen på velkomstsiden med vurderinger fra databasen"""
         self.recent_listbox.delete(0, tk.END)
-        example_assessments = [
-            "Risikovurdering - Server infrastruktur (21-01-2025)",
-            "Risikovurdering - Netværkssikkerhed (20-01-2025)",
-            "Risikovurdering - Cloud services (19-01-2025)"
-        ]
-        for assessment in example_assessments:
-            self.recent_listbox.insert(tk.END, assessment)
+        self.recent_ids = [raekke["id"] for raekke in raekker]
+        for raekke in raekker:
+            navn = raekke["navn"] or "Unavngivet system"
+            self.recent_listbox.insert(tk.END, f"{navn} ({raekke['dato']}) - {detaljer(raekke)}")
+
+    def on_recent_select(self, event=None):
+        valgt = self.recent_listbox.curselection()
+        if valgt and valgt[0] < len(self.recent_ids):
+            self.aabn_fra_lager(self.recent_ids[valgt[0]])
+
+    def aabn_fra_lager(self, vurdering_id):
+        """Indlæser en vurdering fra databasen"""
+        try:
+            data = self.lager.hent(vurdering_id)
+            if data is None:
+                messagebox.showerror("Fejl", "Vurderingen findes ikke længere i databasen")
+                self.load_recent_assessments()
+                return
+            self.indlaes_vurdering(data)
+            self.vurdering_id = vurdering_id
+            logger.info("Vurdering %s indlæst fra databasen", vurdering_id)
+            # Ugemte ændringer fra en tidligere session ligger i vurderingens journal
+            noegle = autogem.vurdering_noegle(vurdering_id)
+            if not self.gendan_ugemt(noegle, data):
+                self.autogem.skift(noegle)
+        except Exception as e:
+            logger.exception("Fejl under indlæsning af vurdering %s", vurdering_id)
+            messagebox.showerror("Fejl", f"Der opstod en fejl under åbning af vurderingen:\n{str(e)}")
 
     def create_comment_section(self, parent, category, question_key):
         """Opret et kommentarikon der åbner en popup med kommentarfelt"""
@@ -2179,135 +1629,6 @@ Ledelsens rolle og beslutningstagning:
         # Sæt fokus på tekstfeltet
         comment_text.focus_set()
         
-    def generer_risiko_opsummering(self):
-        """Genererer en opsummering af de identificerede risici og deres alvorlighed."""
-        opsummering = {
-            "Kritiske risici (Kræver ledelsens accept)": [],
-            "Væsentlige risici (Skal håndteres)": [],
-            "Moderate risici (Bør vurderes)": []
-        }
-        
-        # Beregn den samlede risikovurdering
-        sandsynlighed, konsekvens = self.beregn_risiko_niveau()
-        
-        # GDPR risici
-        if hasattr(self, 'gdpr_vars'):
-            gdpr_ja = [spørgsmål for spørgsmål, var in self.gdpr_vars.items() if var.get() == "Ja"]
-            
-            # Følsomme personoplysninger
-            if any(x in gdpr_ja for x in [
-                "3. Behandler systemet følsomme eller særligt beskyttelsesværdige personoplysninger?",
-                "2. Behandler systemet CPR-numre eller oplysninger om strafbare forhold?"
-            ]):
-                risiko = "Behandling af følsomme personoplysninger:\n" + \
-                        "• Brud kan medføre alvorlige konsekvenser for personer\n" + \
-                        "• Risiko for store bøder ved manglende beskyttelse\n" + \
-                        "• Kræver særlige sikkerhedsforanstaltninger"
-                opsummering["Kritiske risici (Kræver ledelsens accept)"].append(risiko)
-            
-            # Overførsel til tredjelande
-            if "5. Bliver der overført data til lande uden for EU/EØS?" in gdpr_ja:
-                risiko = "Overførsel af data til lande uden for EU:\n" + \
-                        "• Risiko for utilstrækkelig databeskyttelse\n" + \
-                        "• Kræver særligt overførselsgrundlag\n" + \
-                        "• Skal dokumenteres i fortegnelsen"
-                opsummering["Væsentlige risici (Skal håndteres)"].append(risiko)
-            
-            # Manglende compliance
-            compliance_mangler = []
-            if "6. Er der hjemmel til behandlingen?" not in gdpr_ja:
-                compliance_mangler.append("• Mangler lovgrundlag for behandling")
-            if "9. Er der udarbejdet en databehandleraftale?" not in gdpr_ja:
-                compliance_mangler.append("• Mangler databehandleraftaler")
-            if "10. Er der etableret procedurer for sletning af personoplysninger?" not in gdpr_ja:
-                compliance_mangler.append("• Mangler sletterutiner")
-                
-            if compliance_mangler:
-                risiko = "Mangler i GDPR-compliance:\n" + "\n".join(compliance_mangler)
-                opsummering["Væsentlige risici (Skal håndteres)"].append(risiko)
-
-        # Kritikalitets risici
-        if hasattr(self, 'kritikalitet_label'):
-            try:
-                if "Kritikalitet A" in self.kritikalitet_label.cget("text"):
-                    risiko = "Kritisk system for forretningen:\n" + \
-                            "• Nedetid har store konsekvenser\n" + \
-                            "• Kræver omfattende beredskab\n" + \
-                            "• Høje krav til oppetid"
-                    opsummering["Kritiske risici (Kræver ledelsens accept)"].append(risiko)
-            except:
-                pass
-                
-        # Tilgængeligheds risici
-        if hasattr(self, 'tilgaengelighed_vars'):
-            kritiske_perioder = [spørgsmål for spørgsmål, var in self.tilgaengelighed_vars.items() 
-                               if var.get() in ["Alvorlige konsekvenser", "Kritiske konsekvenser"]]
-            if kritiske_perioder:
-                risiko = "Kritiske perioder for tilgængelighed:\n" + \
-                        "• Systemet har perioder uden tolerance for nedetid\n" + \
-                        "• Påvirker forretningens drift direkte\n" + \
-                        "• Kræver backup og overvågning"
-                opsummering["Væsentlige risici (Skal håndteres)"].append(risiko)
-
-        # Robusthed risici
-        if hasattr(self, 'robusthed_vars'):
-            robusthed_ja = []
-            for spørgsmål, var in self.robusthed_vars.items():
-                try:
-                    if var.get() == "Ja":
-                        robusthed_ja.append(spørgsmål)
-                except:
-                    continue
-                    
-            if len(robusthed_ja) >= 3:
-                risiko = "Problemer med systemets stabilitet:\n" + \
-                        "• Tidligere hændelser eller nedbrud\n" + \
-                        "• Test hvordan systemet klarer sig under høj belastning\n" + \
-                        "• Beskyt systemet mod overbelastning\n" + \
-                        "• Overvåg systemets ydeevne løbende"
-                opsummering["Moderate risici (Bør vurderes)"].append(risiko)
-
-        # Tilgængelighed handlinger
-        if hasattr(self, 'tilgaengelighed_vars'):
-            kritiske_perioder = [spørgsmål for spørgsmål, var in self.tilgaengelighed_vars.items() 
-                               if var.get() in ["Alvorlige konsekvenser", "Kritiske konsekvenser"]]
-            if kritiske_perioder:
-                risiko = "Sørg for at systemet er tilgængeligt:\n" + \
-                        "• Overvåg om systemet er oppe og kører\n" + \
-                        "• Få besked automatisk hvis der er problemer\n" + \
-                        "• Planlæg hvor mange brugere systemet skal kunne håndtere\n" + \
-                        "• Planlæg hvornår I bedst kan lave vedligeholdelse\n" + \
-                        "• Skriv ned hvordan I holder systemet kørende"
-                opsummering["Væsentlige risici (Skal håndteres)"].append(risiko)
-
-        # Risiko-opsummering
-        if hasattr(self, 'kritikalitet_label'):
-            try:
-                if "Kritikalitet A" in self.kritikalitet_label.cget("text"):
-                    risiko = "Kritisk system for forretningen:\n" + \
-                            "• Nedetid har store konsekvenser\n" + \
-                            "• Kræver omfattende beredskab\n" + \
-                            "• Høje krav til oppetid"
-                    opsummering["Kritiske risici (Kræver ledelsens accept)"].append(risiko)
-            except:
-                pass
-
-        # Tilføj risikoniveau fra matrixen
-        if sandsynlighed >= 3 and konsekvens >= 3:
-            matrix_risiko = f"Høj samlet risiko (Sandsynlighed: {sandsynlighed}, Konsekvens: {konsekvens}):\n" + \
-                          "• Kræver omgående handling\n" + \
-                          "• Skal vurderes af ledelsen\n" + \
-                          "• Risiko for store tab eller omkostninger"
-            opsummering["Kritiske risici (Kræver ledelsens accept)"].append(matrix_risiko)
-        elif sandsynlighed >= 2 and konsekvens >= 2:
-            matrix_risiko = f"Medium samlet risiko (Sandsynlighed: {sandsynlighed}, Konsekvens: {konsekvens}):\n" + \
-                          "• Kræver handling inden for rimelig tid\n" + \
-                          "• Del af løbende forbedringer\n" + \
-                          "• Bør vurderes af ledelsen"
-            opsummering["Væsentlige risici (Skal håndteres)"].append(matrix_risiko)
-            
-        return opsummering
-
     def get_risk_explanation(self, risk_level):
         """Returnerer forklaringen for et givet risikoniveau"""
         if risk_level == "Højt":
@@ -2317,6 +1638,107 @@ Ledelsens rolle og beslutningstagning:
         else:
             return "Acceptabel som den er. Risikoen kan accepteres uden yderligere handling."
 
+    def vis_portefoelje_fra_arkiv(self):
+        filename = filedialog.askopenfilename(
+            filetypes=[("Kompakt arkiv", "*" + arkiv.ENDELSE)],
+            title="Vælg arkiv"
+        )
+        if filename:
+            self.vis_portefoelje(filename)
+
+    def vis_portefoelje(self, arkiv_sti=None):
+        """Viser fordelinger, risikomatrix og de mest risikable systemer.
+
+        Uden arkiv_sti vises alle vurderinger i databasen.
+        """
+        try:
+            portefoelje = importlib.import_module(PORTEFOELJE_MODUL)
+        except ImportError:
+            logger.exception("Porteføljeoverblikket kunne ikke indlæses")
+            messagebox.showerror("Fejl", "Porteføljeoverblikket kræver NumPy (pip install numpy)")
+            return
+        try:
+            start = time.perf_counter()
+            if arkiv_sti:
+                samling = portefoelje.fra_arkiv(arkiv_sti)
+            else:
+                samling = portefoelje.fra_lager(self.lager)
+            logger.info("Portefølje med %d systemer beregnet på %.0f ms",
+                        len(samling), (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            logger.exception("Fejl under beregning af porteføljen")
+            messagebox.showerror("Fejl", f"Porteføljen kunne ikke beregnes:\n{str(e)}")
+            return
+
+        vindue = tk.Toplevel(self.master)
+        vindue.title(f"Porteføljeoverblik - {os.path.basename(arkiv_sti)}" if arkiv_sti else "Porteføljeoverblik")
+        vindue.geometry("900x650")
+        ramme = ttk.Frame(vindue, padding=20)
+        ramme.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(ramme, text=f"{len(samling)} vurderede systemer", style='Header.TLabel').pack(anchor='w')
+
+        oversigt = ttk.Frame(ramme)
+        oversigt.pack(fill=tk.X, pady=10)
+
+        klasser = ttk.LabelFrame(oversigt, text="Kritikalitetsklasser", padding=10)
+        klasser.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
+        for klasse, antal in samling.klassefordeling().items():
+            ttk.Label(klasser, text=f"{klasse}: {antal}").pack(anchor='w')
+
+        niveauer = ttk.LabelFrame(oversigt, text="Risikoniveauer", padding=10)
+        niveauer.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
+        for niveau, antal in samling.risikofordeling().items():
+            ttk.Label(niveauer, text=f"{niveau}: {antal}").pack(anchor='w')
+
+        # Antal systemer i hver celle; højeste sandsynlighed øverst som i rapporten
+        matrix = ttk.LabelFrame(oversigt, text="Risikomatrix (antal systemer)", padding=10)
+        matrix.pack(side=tk.LEFT, fill=tk.Y)
+        antal_celler = samling.risikomatrix()
+        ttk.Label(matrix, text="Konsekvens →").grid(row=0, column=1, columnspan=4)
+        for konsekvens in range(1, 5):
+            ttk.Label(matrix, text=str(konsekvens)).grid(row=5, column=konsekvens)
+        for sandsynlighed in range(4, 0, -1):
+            raekke = 5 - sandsynlighed
+            ttk.Label(matrix, text=str(sandsynlighed)).grid(row=raekke, column=0, padx=(0, 5))
+            for konsekvens in range(1, 5):
+                farve = RISIKO_FARVER[risikomotor.risiko_niveau(sandsynlighed, konsekvens)]
+                tk.Label(matrix, text=str(antal_celler[sandsynlighed - 1, konsekvens - 1]),
+                         bg=farve, width=7, height=2, relief='solid', borderwidth=1
+                         ).grid(row=raekke, column=konsekvens)
+
+        # Top-listen; for databasen åbner et dobbeltklik vurderingen i hovedvinduet
+        top = ttk.LabelFrame(ramme, text="Højeste risiko", padding=10)
+        top.pack(fill=tk.BOTH, expand=True)
+        kolonner = ("navn", "klasse", "score", "sandsynlighed", "konsekvens", "risikoniveau")
+        tabel = ttk.Treeview(top, columns=kolonner, show='headings')
+        for kolonne in kolonner:
+            tabel.heading(kolonne, text=kolonne.capitalize())
+            tabel.column(kolonne, width=300 if kolonne == "navn" else 90, anchor='w')
+        for system in samling.top(50):
+            system["navn"] = system["navn"] or "Unavngivet system"
+            tabel.insert('', tk.END, iid=str(system["id"]), values=[system[kolonne] for kolonne in kolonner])
+        scrollbar = ttk.Scrollbar(top, orient="vertical", command=tabel.yview)
+        tabel.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tabel.pack(fill=tk.BOTH, expand=True)
+
+        def aabn_valgt(event=None):
+            valgt = tabel.focus()
+            if valgt:
+                self.aabn_fra_lager(int(valgt))
+        if not arkiv_sti:
+            tabel.bind('<Double-1>', aabn_valgt)
+
+    def afslut(self):
+        """Gemmer ventende ændringer og lukker programmet"""
+        if self._beskrivelse_after is not None:
+            self.master.after_cancel(self._beskrivelse_after)
+            self.registrer_beskrivelse()
+        if self.pdf_eksport is not None:
+            self.pdf_eksport.annuller()
+        self.autogem.luk()
+        self.master.destroy()
+
     def show_about(self):
         """Viser information om programmet"""
         about_text = f"""IT Risikovurdering v{self.VERSION}
@@ -2331,7 +1753,46 @@ Dette program er udviklet til at hjælpe med at udføre IT-risikovurderinger på
 """
         messagebox.showinfo("Om programmet", about_text)
 
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IT Risikovurdering")
+    parser.add_argument("--batch", metavar="KILDE",
+                        help="Eksportér PDF for alle gemte vurderinger i en mappe eller et glob-mønster")
+    parser.add_argument("--output", metavar="MAPPE",
+                        help="Mappe til de genererede PDF-filer (standard: ved siden af JSON-filen)")
+    parser.add_argument("--server", action="store_true",
+                        help="Start den lokale HTTP-tjeneste til scoring og PDF-rapporter i stedet for vinduet")
+    parser.add_argument("--vaert", default=None,
+                        help="Adresse HTTP-tjenesten lytter på (standard: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=None,
+                        help="Port HTTP-tjenesten lytter på (standard: 8765)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Antal processer i batch-eksporten og HTTP-tjenestens PDF-pulje "
+                             "(standard: antal kerner)")
+    parser.add_argument("--database", metavar="FIL", default=lager.STANDARD_DB,
+                        help=f"SQLite-database med gemte vurderinger (standard: {lager.STANDARD_DB})")
+    parser.add_argument("--log-niveau", metavar="NIVEAU", default=None,
+                        help="Logniveau, fx DEBUG, INFO eller WARNING (standard: "
+                             f"${logopsaetning.NIVEAU_MILJOEVARIABEL} eller {logopsaetning.STANDARD_NIVEAU})")
+    args = parser.parse_args(argv)
+
+    logopsaetning.konfigurer_logning(args.log_niveau)
+
+    if args.batch:
+        import batch_eksport
+        return batch_eksport.koer_batch(args.batch, args.output, args.workers)
+
+    if args.server:
+        import http_tjeneste
+        return http_tjeneste.koer_server(args.vaert or http_tjeneste.STANDARD_VAERT,
+                                         args.port or http_tjeneste.STANDARD_PORT, args.workers)
+
     root = tk.Tk()
-    app = ITRisikovurderingsApp(root)
-    root.mainloop()
\ No newline at end of file
+    app = ITRisikovurderingsApp(root, args.database)
+    # Forvarm PDF-stakken når hovedloopet er i gang og vinduet er tegnet
+    root.after_idle(forvarm_rapport_modul)
+    root.after_idle(app.gendan_autogemt)
+    root.mainloop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""Kompakt binært filformat for vurderinger.
+
+Et arkiv indeholder en eller flere vurderinger. Spørgsmålenes id og
+svarmuligheder står én gang i arkivets skema, og hvert svar er derefter én
+byte: svarmulighedens position plus én (0 = ubesvaret). Systeminformation,
+kommentarer og uddybende tekster ligger i en strengtabel pr. vurdering, som
+posten henviser til med heltal. Alt efter de første seks byte kan
+komprimeres med zlib.
+
+Filens opbygning::
+
+    ITRV <version> <flag>       6 byte, aldrig komprimeret
+    skema                       kategorier, svarmuligheder og spørgsmåls-id
+    post*                       længde (varint) efterfulgt af postens indhold
+
+Posterne læses én ad gangen, så et stort arkiv kan gennemløbes uden at
+blive indlæst i hukommelsen.
+"""
+
+import zlib
+from collections import namedtuple
+
+import autogem
+import lager
+import risikomotor
+
+MAGI = b"ITRV"
+VERSION = 1
+KOMPRIMERET = 0x01
+UKENDT_SVAR = 0xFF  # Svar der ikke er en af kategoriens svarmuligheder; teksten står i strengtabellen
+ENDELSE = ".itrv"
+BLOK = 64 * 1024
+
+SYSTEM_FELTER = ("navn", "ejer", "leverandør", "ansvarlig", "dato", "system_description")
+
+Kolonne = namedtuple('Kolonne', 'kategori id svarmuligheder')
+
+# En post som den står i arkivet: svar er én byte pr. kolonne i skemaet, og
+# ekstra, kommentarer og uddybende er {kolonne: tekst}
+Post = namedtuple('Post', 'system_info svar ekstra kommentarer uddybende')
+
+
+def _skriv_varint(ud, n):
+    while n >= 0x80:
+        ud.append((n & 0x7F) | 0x80)
+        n >>= 7
+    ud.append(n)
+
+
+def _skriv_streng(ud, tekst):
+    data = tekst.encode('utf-8')
+    _skriv_varint(ud, len(data))
+    ud += data
+
+
+def _laes_varint(buf, pos):
+    n = skift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << skift
+        if b < 0x80:
+            return n, pos
+        skift += 7
+
+
+def _laes_streng(buf, pos):
+    laengde, pos = _laes_varint(buf, pos)
+    if pos + laengde > len(buf):
+        # Som når en varint læses forbi postens slutning
+        raise IndexError("streng uden for posten")
+    return bytes(buf[pos:pos + laengde]).decode('utf-8'), pos + laengde
+
+
+class Arkivskriver:
+    """Skriver vurderinger i gem-format til en åben binær fil"""
+
+    def __init__(self, f, komprimer=True):
+        self._f = f
+        self._zlib = zlib.compressobj(6) if komprimer else None
+        f.write(MAGI + bytes([VERSION, KOMPRIMERET if komprimer else 0]))
+
+        self.kolonner = [Kolonne(k.noegle, sp.id, k.svarmuligheder) for k in risikomotor.KATALOG
+                         for sp in k.spoergsmaal]
+        self._kolonne = {kolonne.id: i for i, kolonne in enumerate(self.kolonner)}
+        self._koder = {k.noegle: {svar: i + 1 for i, svar in enumerate(k.svarmuligheder)}
+                       for k in risikomotor.KATALOG}
+
+        skema = bytearray()
+        _skriv_varint(skema, len(risikomotor.KATEGORIER))
+        for k in risikomotor.KATALOG:
+            _skriv_streng(skema, k.noegle)
+            _skriv_varint(skema, len(k.svarmuligheder))
+            for svar in k.svarmuligheder:
+                _skriv_streng(skema, svar)
+            _skriv_varint(skema, len(k.spoergsmaal))
+            for sp in k.spoergsmaal:
+                _skriv_streng(skema, sp.id)
+        self._skriv(skema)
+
+    def _skriv(self, data):
+        self._f.write(self._zlib.compress(bytes(data)) if self._zlib else data)
+
+    def tilfoej(self, data):
+        """Tilføjer én vurdering i gem-format"""
+        strenge = {}
+
+        def ref(tekst):
+            return strenge.setdefault(tekst, len(strenge))
+
+        system_info = data.get("system_info", {})
+        system = [ref(system_info.get(felt) or "") for felt in SYSTEM_FELTER]
+        svar = bytearray(len(self.kolonner))
+        ekstra, kommentarer, uddybende = [], [], []
+        for _, spoergsmaal_id, kategori, tekst, kommentar, uddyb in lager.svar_raekker(None, data):
+            kolonne = self._kolonne[spoergsmaal_id]
+            kode = self._koder[kategori].get(tekst, UKENDT_SVAR if tekst else 0)
+            svar[kolonne] = kode
+            if kode == UKENDT_SVAR:
+                ekstra.append((kolonne, ref(tekst)))
+            if kommentar:
+                kommentarer.append((kolonne, ref(kommentar)))
+            if uddyb:
+                uddybende.append((kolonne, ref(uddyb)))
+
+        indhold = bytearray()
+        _skriv_varint(indhold, len(strenge))
+        for tekst in strenge:
+            _skriv_streng(indhold, tekst)
+        for indeks in system:
+            _skriv_varint(indhold, indeks)
+        indhold += svar
+        for par in (ekstra, kommentarer, uddybende):
+            _skriv_varint(indhold, len(par))
+            for kolonne, indeks in par:
+                _skriv_varint(indhold, kolonne)
+                _skriv_varint(indhold, indeks)
+
+        post = bytearray()
+        _skriv_varint(post, len(indhold))
+        self._skriv(post + indhold)
+
+    def luk(self):
+        if self._zlib:
+            self._f.write(self._zlib.flush())
+
+
+class Arkivlaeser:
+    """Læser et arkiv fra en åben binær fil, én post ad gangen"""
+
+    def __init__(self, f):
+        self._f = f
+        hoved = f.read(6)
+        if len(hoved) < 6 or hoved[:4] != MAGI:
+            raise ValueError("Filen er ikke et vurderingsarkiv")
+        if hoved[4] != VERSION:
+            raise ValueError(f"Arkivversion {hoved[4]} understøttes ikke")
+        self._zlib = zlib.decompressobj() if hoved[5] & KOMPRIMERET else None
+        self._buffer = bytearray()
+        self._pos = 0
+
+        self.kolonner = []
+        for _ in range(self._varint()):
+            kategori = self._streng()
+            svarmuligheder = tuple(self._streng() for _ in range(self._varint()))
+            for _ in range(self._varint()):
+                self.kolonner.append(Kolonne(kategori, self._streng(), svarmuligheder))
+
+    def _fyld(self, antal):
+        """Sørger for at bufferen har antal ulæste byte; False hvis filen slutter før.
+
+        Der dekomprimeres højst BLOK byte ad gangen, så en blok der pakker
+        meget godt ikke udvides til mere end bufferen skal bruge.
+        """
+        while len(self._buffer) - self._pos < antal:
+            if self._pos > BLOK:
+                del self._buffer[:self._pos]
+                self._pos = 0
+            try:
+                if self._zlib and self._zlib.unconsumed_tail:
+                    self._buffer += self._zlib.decompress(self._zlib.unconsumed_tail, BLOK)
+                    continue
+                blok = self._f.read(BLOK)
+                if not blok:
+                    if self._zlib:
+                        self._buffer += self._zlib.flush()
+                        self._zlib = None
+                        continue
+                    return False
+                self._buffer += self._zlib.decompress(blok, BLOK) if self._zlib else blok
+            except zlib.error as e:
+                raise ValueError(f"Beskadiget arkiv: {e}")
+        return True
+
+    def _laes(self, antal):
+        if not self._fyld(antal):
+            raise ValueError("Arkivet er afkortet")
+        data = self._buffer[self._pos:self._pos + antal]
+        self._pos += antal
+        return data
+
+    def _varint(self):
+        n = skift = 0
+        while True:
+            b = self._laes(1)[0]
+            n |= (b & 0x7F) << skift
+            if b < 0x80:
+                return n
+            skift += 7
+
+    def _streng(self):
+        try:
+            return self._laes(self._varint()).decode('utf-8')
+        except UnicodeDecodeError:
+            raise ValueError("Beskadiget arkiv: ugyldig tekst i arkivets hoved")
+
+    def poster(self):
+        """Gennemløber arkivets poster uden at omsætte dem til gem-format.
+
+        En afkortet eller beskadiget post giver ValueError.
+        """
+        nr = 0
+        while self._fyld(1):
+            nr += 1
+            buf = self._laes(self._varint())
+            try:
+                post = self._afkod_post(buf)
+            except (IndexError, UnicodeDecodeError):
+                raise ValueError(f"Beskadiget arkiv: post {nr} kan ikke læses")
+            yield post
+
+    def _afkod_post(self, buf):
+        antal_kolonner = len(self.kolonner)
+        antal, pos = _laes_varint(buf, 0)
+        strenge = []
+        for _ in range(antal):
+            tekst, pos = _laes_streng(buf, pos)
+            strenge.append(tekst)
+        system_info = {}
+        for felt in SYSTEM_FELTER:
+            indeks, pos = _laes_varint(buf, pos)
+            system_info[felt] = strenge[indeks]
+        svar = bytes(buf[pos:pos + antal_kolonner])
+        if len(svar) != antal_kolonner:
+            raise IndexError("svar uden for posten")
+        pos += antal_kolonner
+        tekster = []
+        for _ in range(3):
+            antal, pos = _laes_varint(buf, pos)
+            par = {}
+            for _ in range(antal):
+                kolonne, pos = _laes_varint(buf, pos)
+                indeks, pos = _laes_varint(buf, pos)
+                par[kolonne] = strenge[indeks]
+            tekster.append(par)
+        return Post(system_info, svar, *tekster)
+
+    def __iter__(self):
+        for post in self.poster():
+            yield self.som_vurdering(post)
+
+    def som_vurdering(self, post):
+        """Omsætter en post til gem-format nøglet på det aktuelle katalogs tekster"""
+        data = {"system_info": post.system_info}
+        for kategori in risikomotor.KATEGORIER:
+            data[kategori] = {}
+        for kolonne, (kategori, spoergsmaal_id, svarmuligheder) in enumerate(self.kolonner):
+            sp = risikomotor.KATALOG.find(kategori, spoergsmaal_id)
+            if sp is None:
+                continue
+            kode = post.svar[kolonne]
+            if kode > len(svarmuligheder) and kode != UKENDT_SVAR:
+                raise ValueError(f"Beskadiget arkiv: ukendt svarkode {kode} til {spoergsmaal_id}")
+            if kode == UKENDT_SVAR:
+                svar = post.ekstra.get(kolonne, "")
+            else:
+                svar = svarmuligheder[kode - 1] if kode else ""
+            vaerdi = {"id": sp.id, "svar": svar, "kommentar": post.kommentarer.get(kolonne, "")}
+            if kolonne in post.uddybende:
+                vaerdi["uddybende"] = post.uddybende[kolonne]
+            data[kategori][sp.tekst] = vaerdi
+        return data
+
+
+def er_arkiv(sti):
+    """True hvis filen starter som et vurderingsarkiv"""
+    with open(sti, 'rb') as f:
+        return f.read(len(MAGI)) == MAGI
+
+
+def skriv_arkiv(sti, vurderinger, komprimer=True):
+    """Skriver vurderinger (et vilkårligt iterable) atomisk til sti og returnerer antallet"""
+    antal = 0
+    with autogem.atomisk_fil(sti, binaer=True) as f:
+        skriver = Arkivskriver(f, komprimer)
+        for data in vurderinger:
+            skriver.tilfoej(data)
+            antal += 1
+        skriver.luk()
+    return antal
+
+
+def laes_arkiv(sti):
+    """Gennemløber vurderingerne i et arkiv i gem-format, én ad gangen"""
+    with open(sti, 'rb') as f:
+        yield from Arkivlaeser(f)
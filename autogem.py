@@ -0,0 +1,288 @@
+"""Løbende gemning af den åbne vurdering i en ændringsjournal.
+
+Hver ændring af et svar, en kommentar eller systeminformation bliver en
+lille post, som Tk-tråden lægger i en kø. En baggrundstråd tilføjer
+posterne til vurderingens journal (``<nøgle>.jsonl``), så en gemning koster
+det samme som ændringen og ikke hele dokumentet. Med jævne mellemrum
+kompakteres journalen: hele vurderingen skrives atomisk som snapshot
+(``<nøgle>.json``), og de poster snapshottet dækker flyttes til
+historikken (``<nøgle>.historik.jsonl``), som kun tilføjes til og derfor
+kan bruges som ændringslog.
+
+Nøglen er ``vurdering-<id>`` for vurderinger i databasen og ``ny-<tid>``
+for vurderinger der endnu ikke er gemt. Ugemt arbejde er det der ligger i
+snapshot og journal; når vurderingen gemmes i databasen, ryddes de.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+from datetime import datetime
+
+import risikomotor
+
+KOMPAKTER_EFTER = 200
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def atomisk_fil(sti, binaer=False):
+    """Åbner en midlertidig fil der først flyttes på plads som sti når blokken lykkes"""
+    mappe = os.path.dirname(os.path.abspath(sti))
+    fd, midlertidig = tempfile.mkstemp(prefix=f".{os.path.basename(sti)}.", suffix=".tmp", dir=mappe)
+    try:
+        with (os.fdopen(fd, 'wb') if binaer else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(midlertidig, sti)
+    except BaseException:
+        try:
+            os.remove(midlertidig)
+        except OSError:
+            pass
+        raise
+
+
+def skriv_atomisk(sti, data):
+    """Skriver data som JSON til sti uden at en halv fil nogensinde kan ses"""
+    with atomisk_fil(sti) as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def journal_mappe(database):
+    """Journalerne hører til databasen; en database i hukommelsen har ingen"""
+    if database == ':memory:':
+        return None
+    return os.path.splitext(database)[0] + '_journal'
+
+
+def vurdering_noegle(vurdering_id):
+    return f"vurdering-{vurdering_id}"
+
+
+def ny_noegle():
+    return "ny-" + datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def vurdering_id_fra_noegle(noegle):
+    """Returnerer vurderingens id for en vurdering-nøgle, ellers None"""
+    if noegle.startswith("vurdering-"):
+        return int(noegle[len("vurdering-"):])
+    return None
+
+
+def laes_poster(sti):
+    """Læser en journal; en halvt skrevet linje efter et nedbrud springes over"""
+    poster = []
+    try:
+        with open(sti, 'r', encoding='utf-8') as f:
+            for linje in f:
+                try:
+                    poster.append(json.loads(linje))
+                except ValueError:
+                    logger.warning("Ulæselig linje i %s sprunget over", sti)
+    except FileNotFoundError:
+        pass
+    return poster
+
+
+def anvend(data, poster):
+    """Afspiller journalposter oven på en vurdering i gem-format"""
+    for post in poster:
+        kategori = post["kategori"]
+        if kategori == 'system_info':
+            data.setdefault("system_info", {})[post["felt"]] = post["vaerdi"]
+            continue
+        sp = risikomotor.KATALOG.efter_id.get(post["id"])
+        if sp is None or sp.kategori != kategori:
+            continue
+        svar = data.setdefault(kategori, {})
+        # Svaret kan ligge under en ældre spørgsmålstekst; id'et er det stabile
+        noegle = next((k for k, v in svar.items() if isinstance(v, dict) and v.get("id") == sp.id), sp.tekst)
+        vaerdi = svar.get(noegle)
+        if not isinstance(vaerdi, dict):
+            vaerdi = {"id": sp.id, "svar": vaerdi or risikomotor.KATALOG[kategori].standardsvar, "kommentar": ""}
+            svar[noegle] = vaerdi
+        vaerdi[post["felt"]] = post["vaerdi"]
+    return data
+
+
+class Autogemmer:
+    """Journal for den åbne vurdering.
+
+    snapshot kaldes i Tk-tråden og skal returnere hele vurderingen i
+    gem-format som en ny struktur. Er mappe None, gemmes der ikke.
+    """
+
+    def __init__(self, snapshot, mappe, kompakter_efter=KOMPAKTER_EFTER):
+        self.snapshot = snapshot
+        self.mappe = mappe
+        self.kompakter_efter = kompakter_efter
+        self.noegle = ny_noegle()
+        self.nr = 0
+        self._siden_kompaktering = 0
+        self._pause = 0
+        self._koe = queue.Queue()
+        self._traad = None
+        if mappe is not None:
+            self._traad = threading.Thread(target=self._koer, name="autogem", daemon=True)
+            self._traad.start()
+
+    def sti(self, noegle, endelse):
+        return os.path.join(self.mappe, noegle + endelse)
+
+    @contextlib.contextmanager
+    def pauset(self):
+        """Ændringer i blokken journaliseres ikke, fx når en vurdering indlæses"""
+        self._pause += 1
+        try:
+            yield
+        finally:
+            self._pause -= 1
+
+    def registrer(self, kategori, spoergsmaal_id, felt, vaerdi):
+        """Journaliserer én ændring; kaldes i Tk-tråden og venter aldrig på disken"""
+        if self._traad is None or self._pause:
+            return
+        self.nr += 1
+        post = {"nr": self.nr, "tid": datetime.now().isoformat(timespec='seconds'),
+                "kategori": kategori, "id": spoergsmaal_id, "felt": felt, "vaerdi": vaerdi}
+        self._koe.put(('post', self.noegle, post))
+        self._siden_kompaktering += 1
+        if self._siden_kompaktering >= self.kompakter_efter:
+            self.kompakter()
+
+    def kompakter(self):
+        """Skriver hele vurderingen som snapshot og tømmer journalen"""
+        if self._traad is None:
+            return
+        self._siden_kompaktering = 0
+        self._koe.put(('kompakter', self.noegle, dict(self.snapshot(), nr=self.nr)))
+
+    def skift(self, noegle, nr=0):
+        """Lader de følgende ændringer gå til en anden vurderings journal"""
+        self.noegle = noegle
+        self.nr = nr
+        self._siden_kompaktering = 0
+
+    def gemt(self, vurdering_id):
+        """Vurderingen er gemt i databasen: det ugemte ryddes og journalen går til historikken"""
+        if self._traad is None:
+            return
+        ny = vurdering_noegle(vurdering_id)
+        self._koe.put(('afslut', self.noegle, ny))
+        self.skift(ny)
+
+    def kasser(self, noegle):
+        """Dropper ugemt arbejde; en ny vurdering der aldrig blev gemt fjernes helt"""
+        if self._traad is None:
+            return
+        self._koe.put(('afslut', noegle, None if noegle.startswith("ny-") else noegle))
+
+    def ugemte(self):
+        """Nøgler med ugemt arbejde, nyeste først"""
+        if self.mappe is None or not os.path.isdir(self.mappe):
+            return []
+        fundet = {}
+        for navn in os.listdir(self.mappe):
+            if navn.endswith('.historik.jsonl'):
+                continue
+            noegle, endelse = os.path.splitext(navn)
+            sti = os.path.join(self.mappe, navn)
+            if endelse in ('.json', '.jsonl') and os.path.getsize(sti):
+                fundet[noegle] = max(fundet.get(noegle, 0), os.path.getmtime(sti))
+        return sorted(fundet, key=fundet.get, reverse=True)
+
+    def hent(self, noegle):
+        """Returnerer (snapshot eller None, poster efter snapshottet) for en nøgle"""
+        if self.mappe is None:
+            return None, []
+        snapshot = None
+        try:
+            with open(self.sti(noegle, '.json'), 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Snapshot for %s kunne ikke læses: %s", noegle, e)
+        nr = snapshot.get("nr", 0) if snapshot else 0
+        poster = [post for post in laes_poster(self.sti(noegle, '.jsonl')) if post.get("nr", 0) > nr]
+        return snapshot, poster
+
+    def historik(self, vurdering_id):
+        """Alle journaliserede ændringer af en vurdering, ældste først"""
+        if self.mappe is None:
+            return []
+        noegle = vurdering_noegle(vurdering_id)
+        return laes_poster(self.sti(noegle, '.historik.jsonl')) + laes_poster(self.sti(noegle, '.jsonl'))
+
+    def luk(self, timeout=5):
+        """Venter på at alle poster er skrevet og stopper baggrundstråden"""
+        if self._traad is None:
+            return
+        self._koe.put(None)
+        self._traad.join(timeout)
+
+    def _koer(self):
+        os.makedirs(self.mappe, exist_ok=True)
+        while True:
+            # Det der ligger klar i køen behandles samlet, så en byge af
+            # poster bliver til én skrivning
+            opgaver = [self._koe.get()]
+            with contextlib.suppress(queue.Empty):
+                while True:
+                    opgaver.append(self._koe.get_nowait())
+            slut = None in opgaver
+            if slut:
+                opgaver = opgaver[:opgaver.index(None)]
+            try:
+                self._udfoer(opgaver)
+            except Exception:
+                logger.exception("Autogemning til %s mislykkedes", self.mappe)
+            if slut:
+                return
+
+    def _udfoer(self, opgaver):
+        poster = {}
+        for handling, noegle, data in opgaver:
+            if handling == 'post':
+                poster.setdefault(noegle, []).append(data)
+                continue
+            self._skriv_poster(poster)
+            poster = {}
+            if handling == 'kompakter':
+                # Snapshottet skrives først; dør processen inden journalen er
+                # tømt, springer genindlæsningen de poster over det dækker
+                skriv_atomisk(self.sti(noegle, '.json'), data)
+                self._flyt(self.sti(noegle, '.jsonl'), noegle)
+                logger.debug("Journal for %s kompakteret ved post %s", noegle, data["nr"])
+            elif handling == 'afslut':
+                if data != noegle:
+                    self._flyt(self.sti(noegle, '.historik.jsonl'), data)
+                self._flyt(self.sti(noegle, '.jsonl'), data)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.sti(noegle, '.json'))
+        self._skriv_poster(poster)
+
+    def _skriv_poster(self, poster):
+        for noegle, linjer in poster.items():
+            with open(self.sti(noegle, '.jsonl'), 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(post, ensure_ascii=False) + "\n" for post in linjer))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _flyt(self, kilde, til):
+        """Tilføjer en journalfil til historikken for nøglen til (eller kasserer den) og sletter den"""
+        if not os.path.exists(kilde):
+            return
+        if til is not None:
+            with open(kilde, 'r', encoding='utf-8') as f, \
+                    open(self.sti(til, '.historik.jsonl'), 'a', encoding='utf-8') as historik:
+                historik.write(f.read())
+        os.remove(kilde)
@@ -0,0 +1,124 @@
+"""Batch-eksport af PDF-rapporter for mange gemte vurderinger.
+
+Kan køres direkte eller via ``Ittrisikovurderingsrogram.py --batch``::
+
+    python batch_eksport.py vurderinger/ --output rapporter/
+    python batch_eksport.py "vurderinger/2025-*.json" --workers 8
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import logopsaetning
+import rapport
+
+logger = logging.getLogger(__name__)
+
+
+def find_vurderinger(kilde):
+    """Finder JSON-filer i en mappe eller ud fra et glob-mønster"""
+    if os.path.isdir(kilde):
+        kilde = os.path.join(kilde, "*.json")
+    return sorted(glob.glob(kilde))
+
+
+def pdf_sti(json_sti, output_mappe=None):
+    """Returnerer stien til PDF-filen for en gemt vurdering"""
+    navn = os.path.splitext(os.path.basename(json_sti))[0] + ".pdf"
+    return os.path.join(output_mappe or os.path.dirname(json_sti), navn)
+
+
+def pdf_stier(filer, output_mappe=None):
+    """Returnerer {json-sti: pdf-sti} hvor to vurderinger aldrig skriver til samme PDF.
+
+    Samles filer fra flere mapper i én output-mappe, får filer med samme
+    navn mappens navn foran, fx a/system.json -> a-system.pdf. ValueError
+    hvis navnene stadig ikke er entydige.
+    """
+    stier = {sti: pdf_sti(sti, output_mappe) for sti in filer}
+    antal = {}
+    for pdf in stier.values():
+        antal[os.path.normcase(pdf)] = antal.get(os.path.normcase(pdf), 0) + 1
+    for sti, pdf in stier.items():
+        if antal[os.path.normcase(pdf)] > 1:
+            mappe = os.path.basename(os.path.dirname(os.path.abspath(sti)))
+            stier[sti] = os.path.join(os.path.dirname(pdf), f"{mappe}-{os.path.basename(pdf)}")
+
+    brugt = {}
+    for sti, pdf in stier.items():
+        tidligere = brugt.setdefault(os.path.normcase(os.path.abspath(pdf)), sti)
+        if tidligere != sti:
+            raise ValueError(f"{tidligere} og {sti} ville begge blive eksporteret til {pdf}")
+    return stier
+
+
+def eksporter_fil(json_sti, pdf):
+    """Genererer PDF for én vurdering og returnerer (sti, pdf, sekunder, fejl)"""
+    start = time.perf_counter()
+    try:
+        with open(json_sti, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        rapport.byg_pdf(data, pdf)
+        fejl = None
+    except Exception as e:
+        logger.exception("PDF for %s kunne ikke genereres", json_sti)
+        fejl = str(e)
+    return json_sti, pdf, time.perf_counter() - start, fejl
+
+
+def koer_batch(kilde, output_mappe=None, workers=None):
+    """Eksporterer alle vurderinger parallelt og returnerer en exit-kode"""
+    filer = find_vurderinger(kilde)
+    if not filer:
+        print(f"Ingen vurderinger fundet i {kilde}", file=sys.stderr)
+        return 2
+
+    try:
+        stier = pdf_stier(filer, output_mappe)
+    except ValueError as e:
+        print(f"Navnekonflikt: {e}", file=sys.stderr)
+        return 2
+
+    if output_mappe:
+        os.makedirs(output_mappe, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Eksporterer {len(filer)} vurderinger med {workers} processer")
+
+    start = time.perf_counter()
+    fejlede = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=logopsaetning.konfigurer_arbejder,
+                             initargs=logopsaetning.arbejder_initargs()) as pool:
+        futures = [pool.submit(eksporter_fil, sti, pdf) for sti, pdf in stier.items()]
+        for future in as_completed(futures):
+            json_sti, pdf, sekunder, fejl = future.result()
+            if fejl:
+                fejlede.append(json_sti)
+                print(f"FEJL {json_sti} ({sekunder:.2f} s): {fejl}", file=sys.stderr)
+            else:
+                print(f"OK   {json_sti} -> {pdf} ({sekunder:.2f} s)")
+
+    print(f"{len(filer) - len(fejlede)} af {len(filer)} rapporter genereret "
+          f"på {time.perf_counter() - start:.1f} s")
+    return 1 if fejlede else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-eksport af PDF-rapporter")
+    parser.add_argument("kilde", help="Mappe eller glob-mønster med gemte vurderinger (JSON)")
+    parser.add_argument("--output", metavar="MAPPE",
+                        help="Mappe til de genererede PDF-filer (standard: ved siden af JSON-filen)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Antal processer (standard: antal kerner)")
+    args = parser.parse_args(argv)
+    return koer_batch(args.kilde, args.output, args.workers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
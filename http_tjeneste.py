@@ -0,0 +1,270 @@
+"""Lokal HTTP-tjeneste til scoring og rapporter.
+
+Andre interne værktøjer kan sende en vurdering i gem-format som JSON og få
+resultaterne, handlingsplanen eller PDF-rapporten tilbage, uden Tk. Kan
+køres direkte eller via ``Ittrisikovurderingsrogram.py --server``::
+
+    python http_tjeneste.py --port 8765
+    curl -X POST --data @vurdering.json http://127.0.0.1:8765/score
+
+Endepunkter:
+
+    GET  /sundhed        {"status": "ok"}
+    POST /score          resultaterne som i risikomotor.scor_vurdering
+    POST /handlingsplan  handlingsplanen opdelt efter prioritet
+    POST /rapport        PDF-rapporten (application/pdf)
+
+Svarene til /score og /handlingsplan har også "advarsler" fra
+``risikomotor.valider``; en ugyldig vurdering giver 400 med "fejl".
+
+Serveren kører i én asyncio-løkke. Scoring er billig og sker direkte i
+løkken, mens PDF-rapporterne bygges i en procespulje, så løkken kan svare
+på andre forespørgsler imens. Er for mange rapporter i kø, svares der 503.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import logopsaetning
+import risikomotor
+
+STANDARD_VAERT = '127.0.0.1'
+STANDARD_PORT = 8765
+
+# Største forespørgsel der tages imod, og hvor længe en inaktiv forbindelse holdes åben
+MAKS_KROP = 10 * 1024 * 1024
+INAKTIV_TIMEOUT = 30
+
+# Antal rapporter pr. proces der må vente i puljen før der svares 503
+KOE_PR_PROCES = 4
+
+logger = logging.getLogger(__name__)
+
+
+class HttpFejl(Exception):
+    """En forespørgsel der besvares med en fejlstatus og en JSON-besked"""
+
+    def __init__(self, status, besked, hoveder=None):
+        super().__init__(besked)
+        self.status = status
+        self.besked = besked
+        self.hoveder = hoveder or {}
+
+
+def forbered_arbejder(log_koe, log_niveau):
+    """Initializer for puljens processer.
+
+    De ignorerer Ctrl+C, da serveren selv lukker dem ned, og logger via
+    hovedprocessen (se logopsaetning.konfigurer_arbejder).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logopsaetning.konfigurer_arbejder(log_koe, log_niveau)
+
+
+def byg_rapport(data):
+    """Bygger PDF-rapporten i en proces i puljen og returnerer dens bytes"""
+    # PDF-stakken indlæses kun i puljens processer, så serveren starter hurtigt
+    import rapport
+    return rapport.byg_pdf_indhold(data)
+
+
+def laes_vurdering(krop):
+    """Afkoder og validerer en vurdering; returnerer (data, advarsler)"""
+    try:
+        data = json.loads(krop)
+    except ValueError as e:
+        raise HttpFejl(400, f"Ugyldig JSON: {e}")
+    try:
+        advarsler = risikomotor.valider(data)
+    except ValueError as e:
+        raise HttpFejl(400, str(e))
+    return data, advarsler
+
+
+def json_svar(status, indhold):
+    return status, json.dumps(indhold, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+
+
+class Tjeneste:
+    """Endepunkterne og procespuljen til PDF-rapporter"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pulje = None
+        self.maks_ventende = self.workers * KOE_PR_PROCES
+        self.ventende = 0
+        self.ruter = {
+            '/sundhed': ('GET', self.sundhed),
+            '/score': ('POST', self.score),
+            '/handlingsplan': ('POST', self.handlingsplan),
+            '/rapport': ('POST', self.rapport),
+        }
+
+    async def sundhed(self, krop):
+        return json_svar(200, {"status": "ok"})
+
+    async def score(self, krop):
+        data, advarsler = laes_vurdering(krop)
+        return json_svar(200, dict(risikomotor.scor_vurdering(data), advarsler=advarsler))
+
+    async def handlingsplan(self, krop):
+        data, advarsler = laes_vurdering(krop)
+        return json_svar(200, {"handlingsplan": risikomotor.generer_handlingsplan(data),
+                               "advarsler": advarsler})
+
+    async def rapport(self, krop):
+        data, _ = laes_vurdering(krop)
+        if self.ventende >= self.maks_ventende:
+            raise HttpFejl(503, "For mange rapporter i kø, prøv igen om lidt", {"Retry-After": "1"})
+        self.ventende += 1
+        try:
+            pdf = await asyncio.get_running_loop().run_in_executor(self.pulje, byg_rapport, data)
+        except Exception as e:
+            logger.exception("Fejl under PDF-rapport")
+            raise HttpFejl(500, str(e))
+        finally:
+            self.ventende -= 1
+        return 200, pdf, 'application/pdf'
+
+    async def behandl(self, metode, sti, krop):
+        """Finder endepunktet for en forespørgsel og returnerer (status, krop, indholdstype, hoveder)"""
+        try:
+            rute = self.ruter.get(sti.split('?', 1)[0])
+            if rute is None:
+                raise HttpFejl(404, f"Ukendt sti: {sti}")
+            tilladt, endepunkt = rute
+            if metode != tilladt:
+                raise HttpFejl(405, f"{sti} kræver {tilladt}", {"Allow": tilladt})
+            return (*await endepunkt(krop), {})
+        except HttpFejl as e:
+            return (*json_svar(e.status, {"fejl": e.besked}), e.hoveder)
+        except Exception:
+            logger.exception("Uventet fejl under %s %s", metode, sti)
+            return (*json_svar(500, {"fejl": "Intern fejl"}), {})
+
+    async def forbindelse(self, reader, writer):
+        """Besvarer forespørgsler på én forbindelse, som holdes åben mellem dem"""
+        try:
+            while True:
+                try:
+                    forespoergsel = await asyncio.wait_for(laes_forespoergsel(reader, writer), INAKTIV_TIMEOUT)
+                except HttpFejl as e:
+                    status, krop, indholdstype = json_svar(e.status, {"fejl": e.besked})
+                    await skriv_svar(writer, status, krop, indholdstype, e.hoveder, luk=True)
+                    return
+                if forespoergsel is None:
+                    return
+                metode, sti, hold_aaben, krop = forespoergsel
+                status, krop, indholdstype, hoveder = await self.behandl(metode, sti, krop)
+                logger.debug("%s %s -> %d", metode, sti, status)
+                # Efter en intern fejl lukkes forbindelsen, da dens tilstand ikke kendes
+                luk = not hold_aaben or status == 500
+                await skriv_svar(writer, status, krop, indholdstype, hoveder, luk=luk)
+                if luk:
+                    return
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def koer(self, vaert, port):
+        self.pulje = ProcessPoolExecutor(max_workers=self.workers, initializer=forbered_arbejder,
+                                         initargs=logopsaetning.arbejder_initargs())
+        try:
+            server = await asyncio.start_server(self.forbindelse, vaert, port)
+            adresser = ", ".join(f"{a[0]}:{a[1]}" for a in (s.getsockname() for s in server.sockets))
+            logger.info("HTTP-tjeneste lytter på %s med %d PDF-processer", adresser, self.workers)
+            async with server:
+                await server.serve_forever()
+        finally:
+            # Rapporter der endnu ikke er startet, venter ingen længere på
+            self.pulje.shutdown(cancel_futures=True)
+
+
+async def laes_forespoergsel(reader, writer):
+    """Læser én HTTP/1.x forespørgsel; returnerer (metode, sti, hold_aaben, krop) eller None ved lukning"""
+    try:
+        linje = await reader.readline()
+        if not linje.strip():
+            return None
+        try:
+            metode, sti, version = linje.decode('latin-1').split()
+        except ValueError:
+            raise HttpFejl(400, "Ugyldig forespørgselslinje")
+        hoveder = {}
+        while True:
+            linje = await reader.readline()
+            if not linje.strip():
+                break
+            navn, _, vaerdi = linje.decode('latin-1').partition(':')
+            hoveder[navn.strip().lower()] = vaerdi.strip()
+    except ValueError:
+        # StreamReader giver ValueError når en linje er længere end dens grænse
+        raise HttpFejl(431, "Forespørgslens hoveder er for store")
+
+    try:
+        laengde = int(hoveder.get('content-length', 0))
+    except ValueError:
+        raise HttpFejl(400, "Ugyldig Content-Length")
+    if laengde < 0:
+        raise HttpFejl(400, "Ugyldig Content-Length")
+    if laengde > MAKS_KROP:
+        raise HttpFejl(413, f"Forespørgslen er større end {MAKS_KROP} bytes")
+    if laengde and hoveder.get('expect', '').lower() == '100-continue':
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        await writer.drain()
+    krop = await reader.readexactly(laengde) if laengde else b""
+
+    forbindelse = hoveder.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        hold_aaben = forbindelse == 'keep-alive'
+    else:
+        hold_aaben = forbindelse != 'close'
+    return metode.upper(), sti, hold_aaben, krop
+
+
+async def skriv_svar(writer, status, krop, indholdstype, hoveder=None, luk=False):
+    linjer = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+              f"Content-Type: {indholdstype}",
+              f"Content-Length: {len(krop)}"]
+    linjer.extend(f"{navn}: {vaerdi}" for navn, vaerdi in (hoveder or {}).items())
+    if luk:
+        linjer.append("Connection: close")
+    writer.write(("\r\n".join(linjer) + "\r\n\r\n").encode('latin-1') + krop)
+    await writer.drain()
+
+
+def koer_server(vaert=STANDARD_VAERT, port=STANDARD_PORT, workers=None):
+    """Kører HTTP-tjenesten til den afbrydes og returnerer en exit-kode"""
+    try:
+        asyncio.run(Tjeneste(workers).koer(vaert, port))
+    except KeyboardInterrupt:
+        logger.info("HTTP-tjeneste stoppet")
+    except OSError as e:
+        logger.error("HTTP-tjenesten kunne ikke starte på %s:%s: %s", vaert, port, e)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokal HTTP-tjeneste til scoring og PDF-rapporter")
+    parser.add_argument("--vaert", default=STANDARD_VAERT,
+                        help=f"Adresse der lyttes på (standard: {STANDARD_VAERT})")
+    parser.add_argument("--port", type=int, default=STANDARD_PORT,
+                        help=f"Port der lyttes på (standard: {STANDARD_PORT})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Antal processer til PDF-rapporter (standard: antal kerner)")
+    args = parser.parse_args(argv)
+    logopsaetning.konfigurer_logning()
+    return koer_server(args.vaert, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
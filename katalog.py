@@ -0,0 +1,77 @@
+"""Spørgsmålskataloget for IT-risikovurderingen.
+
+Spørgsmålene ligger i ``spoergsmaal.json`` og indlæses én gang pr. proces.
+Kataloget kompileres til et uforanderligt indeks, hvor hvert spørgsmål har
+et stabilt id (fx ``"K3"`` eller ``"G12"``) og en fast position i sin
+kategori, så scoring og opslag kan ske med heltalsindeks.
+"""
+
+import json
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+KATALOG_FIL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spoergsmaal.json')
+
+Spoergsmaal = namedtuple('Spoergsmaal', 'id kategori indeks tekst vaegt tekstfelt')
+
+Kategori = namedtuple('Kategori', 'noegle titel standardsvar svarmuligheder spoergsmaal tekster vaegte')
+
+_katalog = None
+
+
+class Katalog:
+    """Kompileret, skrivebeskyttet indeks over alle kategorier og spørgsmål"""
+
+    def __init__(self, kategorier):
+        self.kategorier = MappingProxyType({k.noegle: k for k in kategorier})
+        self.efter_id = MappingProxyType({sp.id: sp for k in kategorier for sp in k.spoergsmaal})
+        # Gemte filer bruger spørgsmålsteksten som nøgle, så den kan også slås op
+        self._efter_tekst = {k.noegle: {sp.tekst: sp for sp in k.spoergsmaal} for k in kategorier}
+
+    def __getitem__(self, kategori):
+        return self.kategorier[kategori]
+
+    def __iter__(self):
+        return iter(self.kategorier.values())
+
+    def find(self, kategori, noegle):
+        """Finder et spørgsmål ud fra id eller tekst, eller None"""
+        sp = self.efter_id.get(noegle)
+        if sp is not None and sp.kategori == kategori:
+            return sp
+        return self._efter_tekst.get(kategori, {}).get(noegle)
+
+
+def kompiler(raa):
+    """Kompilerer katalogdata (som i spoergsmaal.json) til et Katalog"""
+    kategorier = []
+    brugte_ids = set()
+    for k in raa["kategorier"]:
+        spoergsmaal = []
+        for indeks, s in enumerate(k["spoergsmaal"]):
+            if s["id"] in brugte_ids:
+                raise ValueError(f"Spørgsmåls-id {s['id']} findes flere gange i kataloget")
+            brugte_ids.add(s["id"])
+            spoergsmaal.append(Spoergsmaal(s["id"], k["noegle"], indeks, s["tekst"],
+                                           s.get("vaegt", 1), s.get("tekstfelt", False)))
+        kategorier.append(Kategori(
+            k["noegle"], k["titel"], k["standardsvar"], tuple(k["svarmuligheder"]),
+            tuple(spoergsmaal),
+            tuple(sp.tekst for sp in spoergsmaal),
+            tuple(sp.vaegt for sp in spoergsmaal)))
+    return Katalog(kategorier)
+
+
+def indlaes_katalog(sti=KATALOG_FIL):
+    """Indlæser og kompilerer et katalog fra en JSON-fil"""
+    with open(sti, 'r', encoding='utf-8') as f:
+        return kompiler(json.load(f))
+
+
+def hent_katalog():
+    """Returnerer standardkataloget, som kun indlæses første gang"""
+    global _katalog
+    if _katalog is None:
+        _katalog = indlaes_katalog()
+    return _katalog
@@ -0,0 +1,304 @@
+"""SQLite-lager for gemte IT-risikovurderinger.
+
+Hver vurdering gemmes som én række i ``vurdering`` med systeminformation og
+de beregnede resultater, og svarene ligger i ``svar`` nøglet på
+spørgsmålenes stabile id fra kataloget. Databasen kører i WAL-tilstand, så
+læsning (fx listen over seneste vurderinger) ikke venter på en skrivning.
+"""
+
+import logging
+import re
+import sqlite3
+from datetime import datetime
+
+import risikomotor
+
+STANDARD_DB = 'it_risikovurdering.db'
+
+logger = logging.getLogger(__name__)
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS vurdering (
+    id INTEGER PRIMARY KEY,
+    navn TEXT NOT NULL DEFAULT '',
+    ejer TEXT NOT NULL DEFAULT '',
+    leverandoer TEXT NOT NULL DEFAULT '',
+    ansvarlig TEXT NOT NULL DEFAULT '',
+    dato TEXT NOT NULL DEFAULT '',
+    system_beskrivelse TEXT NOT NULL DEFAULT '',
+    score INTEGER NOT NULL DEFAULT 0,
+    kritikalitet TEXT NOT NULL DEFAULT 'D',
+    sandsynlighed INTEGER NOT NULL DEFAULT 1,
+    konsekvens INTEGER NOT NULL DEFAULT 1,
+    risikoniveau TEXT NOT NULL DEFAULT '',
+    oprettet TEXT NOT NULL,
+    opdateret TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS svar (
+    vurdering_id INTEGER NOT NULL REFERENCES vurdering(id) ON DELETE CASCADE,
+    spoergsmaal_id TEXT NOT NULL,
+    kategori TEXT NOT NULL,
+    svar TEXT NOT NULL DEFAULT '',
+    kommentar TEXT NOT NULL DEFAULT '',
+    uddybende TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (vurdering_id, spoergsmaal_id)
+) WITHOUT ROWID;
+
+-- Svarene pakket som én byte pr. spørgsmål (risikomotor.svar_koder), så
+-- porteføljeoverblikket kan læse alle vurderinger uden at samle svar-rækker
+CREATE TABLE IF NOT EXISTS svarkoder (
+    vurdering_id INTEGER PRIMARY KEY REFERENCES vurdering(id) ON DELETE CASCADE,
+    signatur TEXT NOT NULL,
+    koder BLOB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS vurdering_navn ON vurdering(navn);
+CREATE INDEX IF NOT EXISTS vurdering_ejer ON vurdering(ejer);
+CREATE INDEX IF NOT EXISTS vurdering_leverandoer ON vurdering(leverandoer);
+CREATE INDEX IF NOT EXISTS vurdering_dato ON vurdering(dato);
+CREATE INDEX IF NOT EXISTS vurdering_kritikalitet ON vurdering(kritikalitet, risikoniveau);
+CREATE INDEX IF NOT EXISTS vurdering_risikoniveau ON vurdering(risikoniveau);
+CREATE INDEX IF NOT EXISTS vurdering_opdateret ON vurdering(opdateret);
+"""
+
+# Fuldtekstindeks med én række pr. vurdering (rowid = vurdering.id).
+# unicode61 uden fjernelse af diakritiske tegn holder æ, ø og å adskilt fra
+# a og o, og søgeord matches som præfiks, så "aftale" også finder
+# "aftalen" og "aftaler".
+SOEGE_SKEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS soegning USING fts5(
+    navn, system_beskrivelse, kommentarer,
+    tokenize = "unicode61 remove_diacritics 0"
+);
+"""
+
+# Vægte for bm25 i kolonnerækkefølgen ovenfor; et træf i systemnavnet tæller mest
+SOEGE_VAEGTE = (10.0, 3.0, 1.0)
+
+# Felter i system_info og de kolonner de gemmes i
+SYSTEM_KOLONNER = {
+    "navn": "navn",
+    "ejer": "ejer",
+    "leverandør": "leverandoer",
+    "ansvarlig": "ansvarlig",
+    "dato": "dato",
+    "system_description": "system_beskrivelse"
+}
+
+# Kolonner der kan filtreres på i find(); alle har et indeks
+FILTRE = ("navn", "ejer", "leverandoer", "dato", "kritikalitet", "risikoniveau")
+
+OVERSIGT_KOLONNER = "id, navn, ejer, leverandoer, dato, kritikalitet, risikoniveau, opdateret"
+
+
+class Lager:
+    """Forbindelse til vurderingsdatabasen"""
+
+    def __init__(self, sti=STANDARD_DB):
+        self.sti = sti
+        self.forbindelse = sqlite3.connect(sti)
+        self.forbindelse.row_factory = sqlite3.Row
+        self.forbindelse.execute("PRAGMA journal_mode=WAL")
+        self.forbindelse.execute("PRAGMA synchronous=NORMAL")
+        self.forbindelse.execute("PRAGMA foreign_keys=ON")
+        with self.forbindelse:
+            self.forbindelse.executescript(SKEMA)
+        self.fuldtekst = self._opret_soegeindeks()
+
+    def _opret_soegeindeks(self):
+        """Opretter fuldtekstindekset og udfylder det for ældre databaser"""
+        try:
+            with self.forbindelse:
+                self.forbindelse.executescript(SOEGE_SKEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning("Fuldtekstsøgning er ikke tilgængelig (SQLite uden FTS5): %s", e)
+            return False
+        antal_indekseret = self.forbindelse.execute("SELECT COUNT(*) FROM soegning").fetchone()[0]
+        if antal_indekseret != self.antal():
+            self.genopbyg_soegeindeks()
+        return True
+
+    def genopbyg_soegeindeks(self):
+        """Bygger fuldtekstindekset forfra ud fra alle gemte vurderinger"""
+        with self.forbindelse:
+            self.forbindelse.execute("DELETE FROM soegning")
+            self.forbindelse.execute(
+                "INSERT INTO soegning (rowid, navn, system_beskrivelse, kommentarer) "
+                "SELECT v.id, v.navn, v.system_beskrivelse, "
+                "coalesce((SELECT group_concat(s.kommentar || ' ' || s.uddybende, ' ') "
+                "          FROM svar s WHERE s.vurdering_id = v.id), '') "
+                "FROM vurdering v")
+
+    def luk(self):
+        self.forbindelse.close()
+
+    def gem(self, data, vurdering_id=None):
+        """Gemmer en vurdering (i gem_vurdering-format) i én transaktion og returnerer dens id"""
+        system_info = data.get("system_info", {})
+        besvarelse = risikomotor.laes_svar(data)
+        resultater = risikomotor.scor_vurdering(besvarelse)
+        raekke = {kolonne: system_info.get(felt) or "" for felt, kolonne in SYSTEM_KOLONNER.items()}
+        raekke.update(
+            score=resultater["kritikalitet"]["score"],
+            kritikalitet=resultater["kritikalitet"]["klasse"],
+            sandsynlighed=resultater["sandsynlighed"],
+            konsekvens=resultater["konsekvens"],
+            risikoniveau=resultater["risikoniveau"],
+            opdateret=datetime.now().isoformat(timespec='seconds')
+        )
+
+        with self.forbindelse:
+            cur = self.forbindelse.cursor()
+            if vurdering_id is not None:
+                tildelinger = ", ".join(f"{kolonne} = :{kolonne}" for kolonne in raekke)
+                cur.execute(f"UPDATE vurdering SET {tildelinger} WHERE id = :id",
+                            dict(raekke, id=vurdering_id))
+                if cur.rowcount == 0:
+                    vurdering_id = None
+                else:
+                    cur.execute("DELETE FROM svar WHERE vurdering_id = ?", (vurdering_id,))
+            if vurdering_id is None:
+                raekke["oprettet"] = raekke["opdateret"]
+                kolonner = ", ".join(raekke)
+                cur.execute(f"INSERT INTO vurdering ({kolonner}) VALUES "
+                            f"({', '.join(':' + k for k in raekke)})", raekke)
+                vurdering_id = cur.lastrowid
+            svar = list(svar_raekker(vurdering_id, data))
+            cur.executemany(
+                "INSERT OR REPLACE INTO svar (vurdering_id, spoergsmaal_id, kategori, svar, kommentar, uddybende) "
+                "VALUES (?, ?, ?, ?, ?, ?)", svar)
+            cur.execute("INSERT OR REPLACE INTO svarkoder (vurdering_id, signatur, koder) VALUES (?, ?, ?)",
+                        (vurdering_id, risikomotor.KODE_SIGNATUR, risikomotor.svar_koder(besvarelse)))
+
+            # Søgeindekset opdateres kun for denne vurdering, i samme transaktion
+            if self.fuldtekst:
+                kommentarer = " ".join(tekst for post in svar for tekst in post[4:] if tekst)
+                cur.execute("DELETE FROM soegning WHERE rowid = ?", (vurdering_id,))
+                cur.execute("INSERT INTO soegning (rowid, navn, system_beskrivelse, kommentarer) "
+                            "VALUES (?, ?, ?, ?)",
+                            (vurdering_id, raekke["navn"], raekke["system_beskrivelse"], kommentarer))
+        return vurdering_id
+
+    def hent(self, vurdering_id):
+        """Henter en vurdering i samme format som gem_vurdering skriver, eller None"""
+        # Én forespørgsel, så vurdering og svar læses fra samme snapshot
+        raekker = self.forbindelse.execute(
+            "SELECT v.*, s.spoergsmaal_id, s.kategori, s.svar, s.kommentar, s.uddybende "
+            "FROM vurdering v LEFT JOIN svar s ON s.vurdering_id = v.id WHERE v.id = ?",
+            (vurdering_id,)).fetchall()
+        if not raekker:
+            return None
+
+        data = {"system_info": {felt: raekker[0][kolonne] for felt, kolonne in SYSTEM_KOLONNER.items()}}
+        for kategori in risikomotor.KATEGORIER:
+            data[kategori] = {}
+        for raekke in raekker:
+            sp = risikomotor.KATALOG.efter_id.get(raekke["spoergsmaal_id"])
+            if sp is None:
+                continue
+            post = {"id": sp.id, "svar": raekke["svar"], "kommentar": raekke["kommentar"]}
+            if raekke["uddybende"]:
+                post["uddybende"] = raekke["uddybende"]
+            data[sp.kategori][sp.tekst] = post
+        return data
+
+    def alle(self):
+        """Henter alle vurderinger én ad gangen, fx til eksport"""
+        ids = [raekke[0] for raekke in self.forbindelse.execute("SELECT id FROM vurdering ORDER BY id")]
+        for vurdering_id in ids:
+            data = self.hent(vurdering_id)
+            if data is not None:
+                yield data
+
+    def slet(self, vurdering_id):
+        with self.forbindelse:
+            self.forbindelse.execute("DELETE FROM vurdering WHERE id = ?", (vurdering_id,))
+            if self.fuldtekst:
+                self.forbindelse.execute("DELETE FROM soegning WHERE rowid = ?", (vurdering_id,))
+
+    def seneste(self, antal=20):
+        """Returnerer de senest gemte vurderinger, nyeste først"""
+        return self.forbindelse.execute(
+            f"SELECT {OVERSIGT_KOLONNER} FROM vurdering ORDER BY opdateret DESC, id DESC LIMIT ?",
+            (antal,)).fetchall()
+
+    def find(self, graense=500, **filtre):
+        """Finder vurderinger hvor kolonnerne har de angivne værdier, fx find(ejer="IT")"""
+        ukendte = set(filtre) - set(FILTRE)
+        if ukendte:
+            raise ValueError(f"Kan ikke filtrere på {', '.join(sorted(ukendte))}")
+        betingelser = " AND ".join(f"{kolonne} = :{kolonne}" for kolonne in filtre) or "1"
+        return self.forbindelse.execute(
+            f"SELECT {OVERSIGT_KOLONNER} FROM vurdering WHERE {betingelser} "
+            f"ORDER BY opdateret DESC, id DESC LIMIT :graense",
+            dict(filtre, graense=graense)).fetchall()
+
+    def soeg(self, tekst, graense=50):
+        """Fuldtekstsøgning i systemnavne, systembeskrivelser og kommentarer.
+
+        Alle ord skal forekomme (som præfiks). Resultaterne er rangeret med
+        bm25 og har et uddrag hvor søgeordene er markeret med [ ].
+        """
+        if not self.fuldtekst:
+            raise RuntimeError("Fuldtekstsøgning kræver SQLite med FTS5")
+        forespoergsel = soege_udtryk(tekst)
+        if not forespoergsel:
+            return []
+        return self.forbindelse.execute(
+            f"SELECT {', '.join('v.' + k for k in OVERSIGT_KOLONNER.split(', '))}, "
+            "snippet(soegning, -1, '[', ']', '…', 12) AS uddrag "
+            "FROM soegning JOIN vurdering v ON v.id = soegning.rowid "
+            "WHERE soegning MATCH ? ORDER BY bm25(soegning, ?, ?, ?) LIMIT ?",
+            (forespoergsel, *SOEGE_VAEGTE, graense)).fetchall()
+
+    def svarkoder(self):
+        """Returnerer (id, navn, koder) for alle vurderinger sorteret efter id.
+
+        Vurderinger uden koder, eller med koder fra et andet katalog, kodes
+        først forfra ud fra svar-tabellen.
+        """
+        foraeldede = {raekke[0]: {} for raekke in self.forbindelse.execute(
+            "SELECT v.id FROM vurdering v LEFT JOIN svarkoder k ON k.vurdering_id = v.id "
+            "WHERE k.signatur IS NOT ?", (risikomotor.KODE_SIGNATUR,))}
+        if foraeldede:
+            logger.info("Koder svar for %d vurderinger til porteføljeoverblikket", len(foraeldede))
+            for vurdering_id, spoergsmaal_id, kategori, svar in self.forbindelse.execute(
+                    "SELECT s.vurdering_id, s.spoergsmaal_id, s.kategori, s.svar FROM svar s "
+                    "LEFT JOIN svarkoder k ON k.vurdering_id = s.vurdering_id "
+                    "WHERE k.signatur IS NOT ?", (risikomotor.KODE_SIGNATUR,)):
+                foraeldede[vurdering_id].setdefault(kategori, {})[spoergsmaal_id] = svar
+            koder = [(vurdering_id, risikomotor.KODE_SIGNATUR, risikomotor.svar_koder(data))
+                     for vurdering_id, data in foraeldede.items()]
+            with self.forbindelse:
+                self.forbindelse.executemany(
+                    "INSERT OR REPLACE INTO svarkoder (vurdering_id, signatur, koder) VALUES (?, ?, ?)", koder)
+        return self.forbindelse.execute(
+            "SELECT v.id, v.navn, k.koder FROM vurdering v JOIN svarkoder k ON k.vurdering_id = v.id "
+            "ORDER BY v.id").fetchall()
+
+    def antal(self):
+        return self.forbindelse.execute("SELECT COUNT(*) FROM vurdering").fetchone()[0]
+
+
+def soege_udtryk(tekst):
+    """Omsætter fri tekst til et FTS5-udtryk hvor hvert ord søges som præfiks"""
+    ord_ = re.findall(r"\w+", tekst.lower())
+    return " ".join(f'"{o}"*' for o in ord_)
+
+
+def svar_raekker(vurdering_id, data):
+    """Omsætter kategorierne i en vurdering til rækker til svar-tabellen"""
+    for kategori in risikomotor.KATEGORIER:
+        for noegle, vaerdi in data.get(kategori, {}).items():
+            if isinstance(vaerdi, dict):
+                sp = risikomotor.KATALOG.find(kategori, vaerdi.get("id") or noegle)
+                svar = vaerdi.get("svar") or ""
+                kommentar = vaerdi.get("kommentar") or ""
+                uddybende = vaerdi.get("uddybende") or ""
+            else:
+                # Gammelt format hvor værdien er selve svaret
+                sp = risikomotor.KATALOG.find(kategori, noegle)
+                svar, kommentar, uddybende = vaerdi or "", "", ""
+            if sp is not None:
+                yield vurdering_id, sp.id, kategori, svar, kommentar, uddybende
@@ -0,0 +1,111 @@
+"""Opsætning af logning for IT-risikovurderingen.
+
+Alle moduler logger via ``logging.getLogger(__name__)``. Rodloggeren får
+kun en ``QueueHandler``, og en ``QueueListener`` i en baggrundstråd skriver
+til den roterende logfil og konsollen, så Tk-tråden aldrig venter på disken.
+
+Processer i en ``ProcessPoolExecutor`` arver rodloggerens ``QueueHandler``,
+men ingen tømmer deres kopi af køen. Puljerne startes derfor med
+``konfigurer_arbejder`` og ``arbejder_initargs()``, så processerne logger
+til en multiprocessing-kø, som hovedprocessen skriver til de samme handlers.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import sys
+
+LOG_FIL = 'it_risikovurdering.log'
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+STANDARD_NIVEAU = 'INFO'
+MAKS_BYTES = 5 * 1024 * 1024
+ANTAL_BACKUPS = 3
+
+# Miljøvariabel der kan sætte logniveauet uden kommandolinjeflag
+NIVEAU_MILJOEVARIABEL = 'IT_RISIKO_LOGNIVEAU'
+
+_listener = None
+_arbejder_koe = None
+_arbejder_listener = None
+
+
+def konfigurer_logning(niveau=None, log_fil=LOG_FIL, maks_bytes=MAKS_BYTES,
+                       antal_backups=ANTAL_BACKUPS, konsol=True):
+    """Sætter asynkron logning op med roterende logfil.
+
+    niveau kan være et navn som "DEBUG" eller et tal; uden angivelse bruges
+    miljøvariablen IT_RISIKO_LOGNIVEAU og ellers INFO.
+    """
+    global _listener
+    stop_logning()
+
+    niveau = niveau or os.environ.get(NIVEAU_MILJOEVARIABEL, STANDARD_NIVEAU)
+    if isinstance(niveau, str):
+        niveau = logging.getLevelName(niveau.upper())
+        if not isinstance(niveau, int):
+            niveau = logging.getLevelName(STANDARD_NIVEAU)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.handlers.RotatingFileHandler(
+        log_fil, maxBytes=maks_bytes, backupCount=antal_backups,
+        encoding='utf-8', delay=True)]
+    if konsol:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_koe = queue.SimpleQueue()
+    rod = logging.getLogger()
+    for handler in list(rod.handlers):
+        rod.removeHandler(handler)
+    rod.addHandler(logging.handlers.QueueHandler(log_koe))
+    rod.setLevel(niveau)
+
+    _listener = logging.handlers.QueueListener(log_koe, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logning)
+
+
+def arbejder_initargs():
+    """Argumenter til konfigurer_arbejder som initializer for en procespulje.
+
+    Køen oprettes første gang og tømmes af hovedprocessens handlers. Er
+    logningen ikke sat op, er køen None, og processerne logger som Pythons
+    standard.
+    """
+    global _arbejder_koe, _arbejder_listener
+    if _listener is None:
+        return None, logging.getLogger().level
+    if _arbejder_listener is None:
+        _arbejder_koe = multiprocessing.Queue()
+        _arbejder_listener = logging.handlers.QueueListener(
+            _arbejder_koe, *_listener.handlers, respect_handler_level=True)
+        _arbejder_listener.start()
+    return _arbejder_koe, logging.getLogger().level
+
+
+def konfigurer_arbejder(koe, niveau):
+    """Kaldes i hver proces i en pulje: rodloggeren logger til koe i stedet for den arvede kø"""
+    rod = logging.getLogger()
+    for handler in list(rod.handlers):
+        rod.removeHandler(handler)
+    if koe is not None:
+        rod.addHandler(logging.handlers.QueueHandler(koe))
+    rod.setLevel(niveau)
+
+
+def stop_logning():
+    """Tømmer logkøerne og stopper baggrundstrådene"""
+    global _listener, _arbejder_koe, _arbejder_listener
+    if _arbejder_listener is not None:
+        _arbejder_listener.stop()
+        _arbejder_koe.close()
+        _arbejder_listener = _arbejder_koe = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,194 @@
+"""Porteføljeoverblik over alle gemte vurderinger.
+
+Svarene for alle vurderinger i databasen indlæses i én NumPy-matrix med en
+række pr. vurdering og en kolonne pr. spørgsmål i kataloget. Matrixen
+bygges direkte af de pakkede svarkoder i lageret (se
+``risikomotor.svar_koder``), så indlæsningen ikke afhænger af antallet af
+svar-rækker. Score, kritikalitetsklasse, sandsynlighed, konsekvens og
+risikoniveau beregnes derefter for alle systemer på én gang med de samme
+regler som ``risikomotor`` bruger for en enkelt vurdering. Reglerne for
+handlingsplanen (se ``regler.py``) evalueres som én matrixmultiplikation
+over alle systemers fakta.
+"""
+
+import numpy as np
+
+import arkiv
+import risikomotor
+
+# Kolonneinterval i svarmatrixen for hver kategori, i katalogets rækkefølge
+KOLONNER = {}
+_start = 0
+for _kategori in risikomotor.KATALOG:
+    KOLONNER[_kategori.noegle] = slice(_start, _start + len(_kategori.spoergsmaal))
+    _start += len(_kategori.spoergsmaal)
+ANTAL_KOLONNER = _start
+
+# Koderne for en ubesvaret vurdering, dvs. standardsvaret i hver kolonne
+STANDARD_KODER = np.frombuffer(risikomotor.svar_koder({}), dtype=np.int8)
+KRITISK_KODE = min(risikomotor.POINT_SKALA[svar] for svar in risikomotor.KRITISKE_SVAR)
+
+KLASSER = np.array(risikomotor.KRITIKALITET_TAERSKLER[1])
+RISIKO_NIVEAUER = ("Lav", "Middel", "Høj", "Kritisk")
+# Risikoniveau (som indeks i RISIKO_NIVEAUER) for sandsynlighed x konsekvens
+RISIKO_TABEL = np.array([[RISIKO_NIVEAUER.index(risikomotor.risiko_niveau(s, k)) for k in range(1, 5)]
+                         for s in range(1, 5)])
+
+
+class Portefoelje:
+    """Svarmatrix og beregnede resultater for en samling vurderinger"""
+
+    def __init__(self, ids, navne, svar):
+        self.ids = np.asarray(ids)
+        self.navne = list(navne)
+        self.svar = svar
+        self.beregn()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def beregn(self):
+        """Beregner alle systemers resultater i ét vektoriseret gennemløb"""
+        svar = self.svar
+        kritikalitet = svar[:, KOLONNER['kritikalitet']]
+        vaegte = np.array(risikomotor.POINT_VAEGTE, dtype=np.int32)
+        self.score = kritikalitet.astype(np.int32) @ vaegte
+
+        graenser = risikomotor.KRITIKALITET_TAERSKLER[0]
+        klasse_indeks = np.searchsorted(graenser, self.score, side='right')
+        self.klasse = KLASSER[klasse_indeks]
+
+        # Sandsynlighed: 1 + op til 2 fra robusthed + op til 1 fra tilgængelighed
+        robusthed_ja = svar[:, KOLONNER['robusthed']].sum(axis=1)
+        kritiske_perioder = (svar[:, KOLONNER['tilgaengelighed']] >= KRITISK_KODE).sum(axis=1)
+        self.sandsynlighed = 1 + np.minimum(robusthed_ja, 2) + np.minimum(kritiske_perioder // 2, 1)
+
+        # Konsekvens ud fra klassen (D=1 ... A=4), hævet til 3 ved følsomme
+        # personoplysninger eller mindst fire fortrolighedsproblemer
+        konsekvens = klasse_indeks + 1
+        gdpr = svar[:, KOLONNER['gdpr']]
+        skaerpet = (gdpr[:, risikomotor.FOELSOMME_OPLYSNINGER] == 1) | \
+                   (svar[:, KOLONNER['fortrolighed']].sum(axis=1) >= 4)
+        self.konsekvens = np.where(skaerpet, np.maximum(konsekvens, 3), konsekvens)
+
+        self.risiko = RISIKO_TABEL[self.sandsynlighed - 1, self.konsekvens - 1]
+
+    def klassefordeling(self):
+        """Antal systemer i hver kritikalitetsklasse, A først"""
+        return {klasse: int(np.count_nonzero(self.klasse == klasse)) for klasse in "ABCD"}
+
+    def risikofordeling(self):
+        """Antal systemer på hvert risikoniveau"""
+        antal = np.bincount(self.risiko, minlength=len(RISIKO_NIVEAUER))
+        return dict(zip(RISIKO_NIVEAUER, antal.tolist()))
+
+    def risikomatrix(self):
+        """4x4 matrix med antal systemer pr. (sandsynlighed, konsekvens)"""
+        celler = (self.sandsynlighed - 1) * 4 + (self.konsekvens - 1)
+        return np.bincount(celler, minlength=16).reshape(4, 4)
+
+    def fakta(self, regelsaet=None):
+        """Fakta for alle systemer som en bool-matrix med reglernes bitpositioner som kolonner"""
+        regelsaet = regelsaet or risikomotor.REGLER
+        fakta = np.zeros((len(self), regelsaet.antal_bits), dtype=bool)
+        # Spørgsmålenes bits følger katalogets rækkefølge ligesom svarmatrixens kolonner
+        for kategori, kolonner in KOLONNER.items():
+            sande = [kode for svar, kode in risikomotor.SVAR_KODER[kategori].items()
+                     if svar in regelsaet.sande_svar]
+            fakta[:, kolonner] = np.isin(self.svar[:, kolonner], sande)
+        for klasse in "ABCD":
+            fakta[:, regelsaet.positioner[f"kritikalitet:{klasse}"]] = self.klasse == klasse
+        for niveau in range(2, 5):
+            fakta[:, regelsaet.positioner[f"sandsynlighed>={niveau}"]] = self.sandsynlighed >= niveau
+            fakta[:, regelsaet.positioner[f"konsekvens>={niveau}"]] = self.konsekvens >= niveau
+        return fakta
+
+    def udloeste_regler(self, regelsaet=None):
+        """Bool-matrix (systemer x regler) med de regler der er udløst for hvert system"""
+        regelsaet = regelsaet or risikomotor.REGLER
+        led = [l for regel in regelsaet.regler for l in regel.betingelse]
+        # Én kolonne pr. led med et 1-tal for hvert fakta i ledets maske
+        masker = np.array([[(l.maske >> bit) & 1 for l in led] for bit in range(regelsaet.antal_bits)],
+                          dtype=np.int32)
+        antal = self.fakta(regelsaet).astype(np.int32) @ masker
+        opfyldt = (antal >= [l.mindst for l in led]) & (antal <= [l.hoejst for l in led])
+
+        udloest = np.ones((len(self), len(regelsaet.regler)), dtype=bool)
+        start = 0
+        for i, regel in enumerate(regelsaet.regler):
+            slut = start + len(regel.betingelse)
+            udloest[:, i] = opfyldt[:, start:slut].all(axis=1)
+            start = slut
+        return udloest
+
+    def regelfordeling(self, regelsaet=None):
+        """Antal systemer hvor hver regel er udløst, nøglet på reglens id"""
+        regelsaet = regelsaet or risikomotor.REGLER
+        antal = self.udloeste_regler(regelsaet).sum(axis=0)
+        return {regel.id: int(n) for regel, n in zip(regelsaet.regler, antal)}
+
+    def top(self, antal=10):
+        """De systemer med højest risiko og derefter højest kritikalitetsscore"""
+        antal = min(antal, len(self))
+        if antal == 0:
+            return []
+        noegle = self.risiko.astype(np.int64) * 1000 + self.score
+        kandidater = np.argpartition(-noegle, antal - 1)[:antal]
+        raekkefoelge = kandidater[np.argsort(-noegle[kandidater], kind='stable')]
+        return [{
+            "id": int(self.ids[i]),
+            "navn": self.navne[i],
+            "score": int(self.score[i]),
+            "klasse": str(self.klasse[i]),
+            "sandsynlighed": int(self.sandsynlighed[i]),
+            "konsekvens": int(self.konsekvens[i]),
+            "risikoniveau": RISIKO_NIVEAUER[self.risiko[i]]
+        } for i in raekkefoelge]
+
+
+def fra_lager(lager):
+    """Indlæser alle vurderinger i databasen som en Portefoelje"""
+    raekker = lager.svarkoder()
+    ids = np.fromiter((raekke[0] for raekke in raekker), dtype=np.int64, count=len(raekker))
+    navne = [raekke[1] for raekke in raekker]
+    koder = b"".join(raekke[2] for raekke in raekker)
+    svar = np.frombuffer(koder, dtype=np.int8).reshape(len(raekker), ANTAL_KOLONNER)
+    return Portefoelje(ids, navne, svar)
+
+
+def fra_vurderinger(vurderinger):
+    """Bygger en Portefoelje ud fra vurderinger i gem-format, fx indlæste JSON-filer"""
+    koder = b"".join(risikomotor.svar_koder(data) for data in vurderinger)
+    svar = np.frombuffer(koder, dtype=np.int8).reshape(len(vurderinger), ANTAL_KOLONNER)
+    navne = [data.get("system_info", {}).get("navn", "") for data in vurderinger]
+    return Portefoelje(np.arange(len(vurderinger)), navne, svar)
+
+
+def fra_arkiv(sti):
+    """Indlæser alle vurderinger i et arkiv (se arkiv.py) som en Portefoelje.
+
+    Arkivets svarbytes omsættes kolonne for kolonne med en opslagstabel, så
+    kun systemnavnet læses pr. vurdering.
+    """
+    navne = []
+    raa = bytearray()
+    with open(sti, 'rb') as f:
+        laeser = arkiv.Arkivlaeser(f)
+        for post in laeser.poster():
+            navne.append(post.system_info["navn"])
+            raa += post.svar
+    raa = np.frombuffer(raa, dtype=np.uint8).reshape(len(navne), len(laeser.kolonner))
+
+    svar = np.tile(STANDARD_KODER, (len(navne), 1))
+    for i, kolonne in enumerate(laeser.kolonner):
+        sp = risikomotor.KATALOG.find(kolonne.kategori, kolonne.id)
+        if sp is None:
+            continue
+        # Arkivkode -> portefølje-kode; 0 er ubesvaret og ukendte svar tæller som 0
+        koder = risikomotor.SVAR_KODER[sp.kategori]
+        tabel = np.zeros(256, dtype=np.int8)
+        tabel[0] = STANDARD_KODER[KOLONNER[sp.kategori].start + sp.indeks]
+        for kode, tekst in enumerate(kolonne.svarmuligheder, start=1):
+            tabel[kode] = koder.get(tekst, 0)
+        svar[:, KOLONNER[sp.kategori].start + sp.indeks] = tabel[raa[:, i]]
+    return Portefoelje(np.arange(len(navne)), navne, svar)
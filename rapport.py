@@ -0,0 +1,352 @@
+"""PDF-rapport for en IT-risikovurdering.
+
+Rapporten bygges ud fra et svar-dictionary i samme format som
+``gem_vurdering`` skriver, så den kan genereres både fra GUI'en og fra
+batch-eksporten uden Tk.
+
+Det der er ens for alle rapporter (typografier, faste tekstafsnit og
+tabelstile) bygges én gang pr. proces i ``Rapportskabelon``, så en
+eksport kun opbygger de dele der afhænger af vurderingen.
+
+``byg_pdf`` kan melde fremskridt og afbrydes undervejs, så GUI'en kan
+bygge rapporten i en baggrundstråd mens brugeren arbejder videre.
+"""
+
+import copy
+import io
+import threading
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.graphics.shapes import Drawing, Rect, String
+
+import autogem
+import risikomotor
+
+class Annulleret(Exception):
+    """Eksporten blev afbrudt før rapporten var skrevet"""
+
+
+# Farver i risikomatrixen (række = sandsynlighed, kolonne = konsekvens)
+colors_matrix = [
+    [(0, 128, 0), (0, 128, 0), (255, 255, 0), (255, 165, 0)],  # Første række
+    [(0, 128, 0), (255, 255, 0), (255, 165, 0), (255, 0, 0)],  # Anden række
+    [(255, 255, 0), (255, 165, 0), (255, 0, 0), (255, 0, 0)],  # Tredje række
+    [(255, 165, 0), (255, 0, 0), (255, 0, 0), (255, 0, 0)]     # Fjerde række
+]
+
+risk_explanation_text = """Denne sektion giver en kort opsummering af de identificerede risici og deres betydning for organisationen. Formålet er at sikre, at ledelsen forstår risikobilledet og kan træffe informerede beslutninger om håndteringen.
+
+Ledelsens rolle og beslutningstagning:
+• Ledelsen skal tage stilling til hver identificeret risiko og enten acceptere, reducere eller eliminere den.
+• Beslutningen bør tage udgangspunkt i risikovurderingens prioritering og organisationens risikotolerance.
+• Det skal være tydeligt, hvad hver risiko indebærer, samt hvilke konsekvenser en accept eller afvisning kan have."""
+
+followup_text = """⚠ VIGTIGT: Opfølgning og Vedligeholdelse af Risikovurdering
+
+• Når de anførte foranstaltninger med høj prioritet er implementeret, skal der udføres en ny risikovurdering for at vurdere effekten og identificere eventuelle nye risici.
+
+• Risikovurderingen er en løbende proces, der skal gentages mindst én gang om året eller ved væsentlige ændringer i programmet."""
+
+
+# Vektortegninger af risikomatrixen til PDF, én pr. markeret celle. Når
+# tegningen tegnes, sætter reportlab midlertidigt en forælder på figurerne,
+# så hver tråd har sine egne
+_tegning_cache = threading.local()
+
+
+def _tegn_matrix_vektor(sandsynlighed, konsekvens, width=400, height=300):
+    """Tegner risikomatrixen med reportlabs egne figurer"""
+    cell_width = width / 4
+    cell_height = height / 4
+    tegning = Drawing(width, height)
+
+    for i in range(4):
+        for j in range(4):
+            # Række 0 (sandsynlighed 1) øverst
+            x = j * cell_width
+            y = height - (i + 1) * cell_height
+            r, g, b = colors_matrix[i][j]
+            tegning.add(Rect(x, y, cell_width, cell_height,
+                             fillColor=colors.Color(r / 255, g / 255, b / 255),
+                             strokeColor=colors.black, strokeWidth=0.5))
+            tegning.add(String(x + cell_width / 2, y + cell_height / 2 - 4,
+                               risikomotor.risiko_niveau(i + 1, j + 1),
+                               fontName='Helvetica', fontSize=10,
+                               fillColor=colors.black, textAnchor='middle'))
+
+    # Marker den aktuelle risiko
+    tegning.add(Rect((konsekvens - 1) * cell_width,
+                     height - sandsynlighed * cell_height,
+                     cell_width, cell_height,
+                     fillColor=None, strokeColor=colors.black, strokeWidth=3))
+    return tegning
+
+
+def hent_matrix_tegning(sandsynlighed, konsekvens):
+    """Returnerer den cachede vektortegning af risikomatrixen for en celle"""
+    if not hasattr(_tegning_cache, 'tegninger'):
+        _tegning_cache.tegninger = {}
+    tegning = _tegning_cache.tegninger.get((sandsynlighed, konsekvens))
+    if tegning is None:
+        tegning = _tegn_matrix_vektor(sandsynlighed, konsekvens)
+        _tegning_cache.tegninger[(sandsynlighed, konsekvens)] = tegning
+    # Platypus sætter layout-flag på selve flowablen, så hver rapport får
+    # en overfladisk kopi der deler figurerne med den cachede tegning
+    return copy.copy(tegning)
+
+
+def _tekstblok(tekst, stil, punkt_stil, afstand):
+    """Omsætter en fast tekst til afsnit; linjer med • indrykkes"""
+    afsnit = []
+    for line in tekst.split('\n'):
+        if line.strip():
+            if line.startswith('•'):
+                # Indrykket bullet point
+                afsnit.append(Paragraph('    ' + line, punkt_stil))
+            else:
+                afsnit.append(Paragraph(line, stil))
+            afsnit.append(Spacer(1, afstand))
+    return afsnit
+
+
+class Rapportskabelon:
+    """Typografier og faste afsnit der er ens for alle rapporter.
+
+    Afsnittene er prototyper: platypus gemmer layoutet på selve flowablen,
+    så hver rapport får overfladiske kopier der deler den parsede tekst.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.title_style = styles['Heading1']
+        self.heading_style = styles['Heading2']
+        self.normal_style = styles['Normal']
+
+        self.system_tabel_stil = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+            ('PADDING', (0, 0), (-1, -1), 6),
+        ])
+
+        self.indledning = [
+            Paragraph("IT Risikovurdering", self.title_style),
+            Spacer(1, 20),
+            Paragraph("System Information", self.heading_style),
+            Spacer(1, 10),
+        ]
+        self.samlet_overskrift = [
+            Spacer(1, 20),
+            Paragraph("Samlet Risikovurdering", self.heading_style),
+            Spacer(1, 10),
+        ]
+        self.opsummering = [
+            Spacer(1, 20),
+            Paragraph("Opsummering af Risici", self.heading_style),
+            Spacer(1, 10),
+            *_tekstblok(risk_explanation_text, self.normal_style, self.normal_style, 6),
+            Spacer(1, 12),
+        ]
+        self.handlingsplan_overskrift = [
+            Spacer(1, 20),
+            Paragraph("Handlingsplan", self.heading_style),
+            Spacer(1, 10),
+        ]
+        self.opfoelgning = [
+            Spacer(1, 30),
+            PageBreak(),
+            Paragraph("Opfølgning på Risikovurdering", self.heading_style),
+            Spacer(1, 10),
+            *_tekstblok(followup_text, self.heading_style, self.normal_style, 8),
+            Spacer(1, 20),
+        ]
+
+        # Handlingsplanens overskrifter og handlinger er faste tekster, så
+        # afsnittene gemmes første gang de bruges
+        self._afsnit = {}
+
+    @staticmethod
+    def kopi(afsnit):
+        return [copy.copy(flowable) for flowable in afsnit]
+
+    def prioritet(self, prioritet):
+        """Overskrift og afstand for en prioritet i handlingsplanen"""
+        afsnit = self._afsnit.get(prioritet)
+        if afsnit is None:
+            if "Høj" in prioritet:
+                color = colors.red
+            elif "Mellem" in prioritet:
+                color = colors.orange
+            else:
+                color = colors.green
+            afsnit = self._afsnit[prioritet] = [
+                Paragraph(f'<font color="{color}">{prioritet}</font>', self.heading_style),
+                Spacer(1, 10),
+            ]
+        return self.kopi(afsnit)
+
+    def handling(self, action):
+        afsnit = self._afsnit.get(action)
+        if afsnit is None:
+            if action.startswith("  •"):
+                afsnit = Paragraph(f"    {action}", self.normal_style)
+            else:
+                afsnit = Paragraph(action, self.normal_style)
+            self._afsnit[action] = afsnit
+        return copy.copy(afsnit)
+
+
+_skabelon = None
+_skabelon_lock = threading.Lock()
+
+
+def hent_skabelon():
+    """Returnerer processens rapportskabelon og bygger den ved første kald"""
+    global _skabelon
+    if _skabelon is None:
+        with _skabelon_lock:
+            if _skabelon is None:
+                _skabelon = Rapportskabelon()
+    return _skabelon
+
+
+def _melder(fremskridt, annulleret):
+    """Returnerer meld(andel, tekst), der melder fremskridt eller afbryder med Annulleret"""
+    def meld(andel, tekst):
+        if annulleret is not None and annulleret.is_set():
+            raise Annulleret()
+        if fremskridt is not None:
+            fremskridt(andel, tekst)
+    return meld
+
+
+def byg_pdf(data, filename, fremskridt=None, annulleret=None):
+    """Bygger PDF-rapporten for en vurdering og skriver den til filename.
+
+    fremskridt kaldes med (andel 0-1, tekst) undervejs. annulleret er et
+    threading.Event; når det sættes, afbrydes byggeriet med Annulleret, og
+    filename røres ikke, da filen først flyttes på plads når den er færdig.
+    """
+    indhold = byg_pdf_indhold(data, fremskridt, annulleret)
+
+    # Gem PDF
+    _melder(fremskridt, annulleret)(0.95, "Skriver fil")
+    with autogem.atomisk_fil(filename, binaer=True) as f:
+        f.write(indhold)
+
+
+def byg_pdf_indhold(data, fremskridt=None, annulleret=None):
+    """Bygger PDF-rapporten for en vurdering i hukommelsen og returnerer dens bytes"""
+    meld = _melder(fremskridt, annulleret)
+    system_info = data.get("system_info", {})
+    meld(0.0, "Beregner risikoniveau")
+
+    # Beregn risiko niveau; resultaterne deles med rapportfanen for samme svar
+    try:
+        resultater = risikomotor.resultater(data)
+        sandsynlighed, konsekvens = resultater.sandsynlighed, resultater.konsekvens
+    except Exception as e:
+        raise Exception(f"Kunne ikke beregne risikoniveau: {str(e)}")
+
+    # Hent risikomatrix
+    meld(0.05, "Tegner risikomatrix")
+    try:
+        matrix = hent_matrix_tegning(sandsynlighed, konsekvens)
+    except Exception as e:
+        raise Exception(f"Kunne ikke generere risikomatrix: {str(e)}")
+
+    # Opret PDF dokument i hukommelsen; filen skrives samlet til sidst
+    buffer = io.BytesIO()
+    try:
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72
+        )
+    except Exception as e:
+        raise Exception(f"Kunne ikke oprette PDF dokument: {str(e)}")
+
+    # Layoutet melder for hver flowable det har placeret
+    antal_flowables = [1]
+
+    def ved_layout(hvad, vaerdi):
+        if hvad == 'SIZE_EST':
+            antal_flowables[0] = max(vaerdi, 1)
+        elif hvad == 'PROGRESS':
+            meld(0.15 + 0.8 * vaerdi / antal_flowables[0], "Opsætter sider")
+
+    doc.setProgressCallBack(ved_layout)
+
+    meld(0.1, "Opbygger indhold")
+    skabelon = hent_skabelon()
+    normal_style = skabelon.normal_style
+
+    try:
+        # Titel og System Information
+        elements = skabelon.kopi(skabelon.indledning)
+        system_rows = [
+            ["System:", system_info.get("navn", "")],
+            ["Ejer:", system_info.get("ejer", "")],
+            ["Leverandør:", system_info.get("leverandør", "")],
+            ["Ansvarlig:", system_info.get("ansvarlig", "")],
+            ["Dato:", system_info.get("dato", "")]
+        ]
+        t = Table(system_rows, colWidths=[100, 400])
+        t.setStyle(skabelon.system_tabel_stil)
+        elements.append(t)
+
+        # Risikomatrix sektion
+        elements.extend(skabelon.kopi(skabelon.samlet_overskrift))
+
+        current_risk = resultater.risikoniveau
+
+        elements.append(Paragraph(
+            f"Baseret på alle vurderinger er systemets risikoniveau: {current_risk}",
+            normal_style
+        ))
+        elements.append(Paragraph(
+            f"• Sandsynlighed: {sandsynlighed}/4",
+            normal_style
+        ))
+        elements.append(Paragraph(
+            f"• Konsekvens: {konsekvens}/4",
+            normal_style
+        ))
+
+        # Risiko-opsummering
+        elements.extend(skabelon.kopi(skabelon.opsummering))
+
+        # Tilføj risikomatrix
+        elements.append(matrix)
+
+        # Handlingsplan
+        elements.extend(skabelon.kopi(skabelon.handlingsplan_overskrift))
+
+        handlinger = resultater.handlingsplan
+        for prioritet, actions in handlinger.items():
+            if actions:
+                elements.extend(skabelon.prioritet(prioritet))
+                for action in actions:
+                    elements.append(skabelon.handling(action))
+                elements.append(Spacer(1, 15))
+
+        # Opfølgningstekst og dato og tid
+        elements.extend(skabelon.kopi(skabelon.opfoelgning))
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        elements.append(Paragraph(f"Rapport genereret: {current_time}", normal_style))
+
+        doc.build(elements)
+
+    except Annulleret:
+        raise
+    except Exception as e:
+        raise Exception(f"Kunne ikke generere PDF indhold: {str(e)}")
+
+    return buffer.getvalue()
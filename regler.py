@@ -0,0 +1,195 @@
+"""Regler for handlingsplanen og risiko-opsummeringen.
+
+Reglerne ligger som data i ``handlingsregler.json``. Hver regel har en
+betingelse og giver et afsnit i handlingsplanen, i risiko-opsummeringen
+eller begge steder, så samme handling kun står ét sted.
+
+En vurdering beskrives som fakta i ét heltal: én bit pr. spørgsmål i
+katalogets rækkefølge, sat når svaret er et af ``sande_svar`` (fx "Ja"),
+efterfulgt af de afledte fakta i ``AFLEDTE_FAKTA``. Betingelserne
+kompileres én gang til bitmasker, så en regel afgøres med en AND og en
+bittælling pr. led, og en hel portefølje kan evalueres som matrixregning.
+
+En betingelse er en liste af led, som alle skal være opfyldt. Et led
+nævner spørgsmåls-id, kategorier (alle kategoriens spørgsmål) eller
+afledte fakta::
+
+    {"nogen": [...]}      mindst én er sand
+    {"alle": [...]}       alle er sande
+    {"ingen": [...]}      ingen er sande
+    {"ikke_alle": [...]}  mindst én er falsk
+    {"mindst": 3, "af": [...]}
+"""
+
+import json
+import os
+from collections import namedtuple
+
+import katalog
+
+REGEL_FIL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'handlingsregler.json')
+
+AFLEDTE_FAKTA = (
+    "kritikalitet:A", "kritikalitet:B", "kritikalitet:C", "kritikalitet:D",
+    "sandsynlighed>=2", "sandsynlighed>=3", "sandsynlighed>=4",
+    "konsekvens>=2", "konsekvens>=3", "konsekvens>=4",
+)
+
+# Et led er opfyldt når antallet af sande fakta i masken ligger i [mindst, hoejst]
+Led = namedtuple('Led', 'maske mindst hoejst')
+
+Regel = namedtuple('Regel', 'id betingelse handling risiko')
+
+# prioritet er teksten i handlingsplanen; linjer er overskrift og punkter
+Handling = namedtuple('Handling', 'prioritet linjer')
+
+# punkter er (betingelse, tekst); tomme betingelser er altid opfyldt
+Risiko = namedtuple('Risiko', 'gruppe overskrift punkter')
+
+_regler = None
+
+
+def opfyldt(betingelse, fakta):
+    """True hvis alle led i betingelsen er opfyldt af fakta"""
+    for led in betingelse:
+        antal = (fakta & led.maske).bit_count()
+        if antal < led.mindst or antal > led.hoejst:
+            return False
+    return True
+
+
+class Regelsaet:
+    """Kompilerede regler bundet til et katalogs bitpositioner"""
+
+    def __init__(self, kat, sande_svar, prioriteter, risikogrupper, regler, positioner):
+        self.katalog = kat
+        self.sande_svar = frozenset(sande_svar)
+        self.prioriteter = tuple(prioriteter)
+        self.risikogrupper = tuple(risikogrupper)
+        self.regler = tuple(regler)
+        self.positioner = positioner
+        self.antal_bits = len(positioner)
+        self._afledt = {navn: 1 << positioner[navn] for navn in AFLEDTE_FAKTA}
+
+    def fakta(self, svar, kritikalitet, sandsynlighed, konsekvens):
+        """Samler en vurderings fakta i ét heltal.
+
+        svar er svarlister pr. kategori (se risikomotor.laes_svar).
+        """
+        fakta = 0
+        bit = 1
+        sande = self.sande_svar
+        for k in self.katalog:
+            for s in svar[k.noegle]:
+                if s in sande:
+                    fakta |= bit
+                bit <<= 1
+        fakta |= self._afledt.get(f"kritikalitet:{kritikalitet}", 0)
+        for niveau in range(2, sandsynlighed + 1):
+            fakta |= self._afledt.get(f"sandsynlighed>={niveau}", 0)
+        for niveau in range(2, konsekvens + 1):
+            fakta |= self._afledt.get(f"konsekvens>={niveau}", 0)
+        return fakta
+
+    def udloeste(self, fakta):
+        """De regler hvis betingelse er opfyldt, i regelfilens rækkefølge"""
+        return [regel for regel in self.regler if opfyldt(regel.betingelse, fakta)]
+
+    def handlingsplan(self, fakta):
+        """Handlingsplanen som {prioritet: [linjer]} med alle prioriteter"""
+        handlinger = {prioritet: [] for prioritet in self.prioriteter}
+        for regel in self.udloeste(fakta):
+            if regel.handling is not None:
+                handlinger[regel.handling.prioritet].extend(regel.handling.linjer)
+        return handlinger
+
+    def opsummering(self, fakta, **vaerdier):
+        """Risiko-opsummeringen som {gruppe: [tekster]}.
+
+        vaerdier indsættes i overskrifter med {navn}, fx sandsynlighed.
+        """
+        opsummering = {gruppe: [] for gruppe in self.risikogrupper}
+        for regel in self.udloeste(fakta):
+            risiko = regel.risiko
+            if risiko is None:
+                continue
+            punkter = [f"• {tekst}" for betingelse, tekst in risiko.punkter if opfyldt(betingelse, fakta)]
+            if punkter:
+                opsummering[risiko.gruppe].append(
+                    "\n".join([risiko.overskrift.format(**vaerdier)] + punkter))
+        return opsummering
+
+
+def _kompiler_betingelse(raa, masker):
+    betingelse = []
+    for led in raa:
+        if "mindst" in led:
+            navne, mindst = led["af"], led["mindst"]
+        else:
+            (slags, navne), = led.items()
+        maske = 0
+        for navn in navne:
+            if navn not in masker:
+                raise ValueError(f"Ukendt spørgsmål eller fakta i regel: {navn}")
+            maske |= masker[navn]
+        antal = maske.bit_count()
+        if "mindst" in led:
+            betingelse.append(Led(maske, mindst, antal))
+        elif slags == "nogen":
+            betingelse.append(Led(maske, 1, antal))
+        elif slags == "alle":
+            betingelse.append(Led(maske, antal, antal))
+        elif slags == "ingen":
+            betingelse.append(Led(maske, 0, 0))
+        elif slags == "ikke_alle":
+            betingelse.append(Led(maske, 0, antal - 1))
+        else:
+            raise ValueError(f"Ukendt betingelse i regel: {slags}")
+    return tuple(betingelse)
+
+
+def kompiler(raa, kat):
+    """Kompilerer regeldata (som i handlingsregler.json) mod et katalog"""
+    # Bitposition for hvert spørgsmål og afledt fakta; navne til masker
+    positioner = {}
+    for k in kat:
+        for sp in k.spoergsmaal:
+            positioner[sp.id] = len(positioner)
+    for navn in AFLEDTE_FAKTA:
+        positioner[navn] = len(positioner)
+    masker = {navn: 1 << bit for navn, bit in positioner.items()}
+    for k in kat:
+        masker[k.noegle] = sum(masker[sp.id] for sp in k.spoergsmaal)
+
+    prioriteter = raa["prioriteter"]
+    risikogrupper = raa["risikogrupper"]
+    regler = []
+    for r in raa["regler"]:
+        handling = risiko = None
+        if "handling" in r:
+            h = r["handling"]
+            handling = Handling(prioriteter[h["prioritet"]],
+                                (h["overskrift"],) + tuple(f"  • {punkt}" for punkt in h["punkter"]))
+        if "risiko" in r:
+            ri = r["risiko"]
+            punkter = tuple(((), punkt) if isinstance(punkt, str)
+                            else (_kompiler_betingelse(punkt["naar"], masker), punkt["tekst"])
+                            for punkt in ri["punkter"])
+            risiko = Risiko(risikogrupper[ri["gruppe"]], ri["overskrift"], punkter)
+        regler.append(Regel(r["id"], _kompiler_betingelse(r["naar"], masker), handling, risiko))
+    return Regelsaet(kat, raa["sande_svar"], prioriteter.values(), risikogrupper.values(),
+                     regler, positioner)
+
+
+def indlaes_regler(sti=REGEL_FIL, kat=None):
+    """Indlæser og kompilerer regler fra en JSON-fil"""
+    with open(sti, 'r', encoding='utf-8') as f:
+        return kompiler(json.load(f), kat or katalog.hent_katalog())
+
+
+def hent_regler():
+    """Returnerer standardreglerne, som kun indlæses første gang"""
+    global _regler
+    if _regler is None:
+        _regler = indlaes_regler()
+    return _regler
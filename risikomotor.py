@@ -0,0 +1,437 @@
+"""Beregningsmotor for IT-risikovurderingen.
+
+Modulet indeholder al scoring uden afhængighed af Tk, så en vurdering kan
+beregnes ud fra et almindeligt svar-dictionary i samme format som
+``gem_vurdering`` skriver til JSON. Spørgsmålene kommer fra kataloget i
+``katalog.py``, og svarene omsættes til lister i katalogets rækkefølge, så
+scoringen arbejder med heltalsindeks frem for spørgsmålstekster.
+"""
+
+import bisect
+import functools
+import zlib
+from collections import namedtuple
+
+import katalog
+import regler
+
+KATALOG = katalog.hent_katalog()
+
+# Handlingsplanen og risiko-opsummeringen kommer fra reglerne i handlingsregler.json
+REGLER = regler.hent_regler()
+
+KATEGORIER = tuple(KATALOG.kategorier)
+
+# Spørgsmålsteksterne for hver kategori i fast rækkefølge
+KATEGORI_SPOERGSMAAL = {k.noegle: k.tekster for k in KATALOG}
+
+# Point for hvert kritikalitetsspørgsmål, indekseret som spørgsmålene
+POINT_VAEGTE = KATALOG['kritikalitet'].vaegte
+
+# Tidsperioder og svarmuligheder for tilgængelighed
+TIDSPERIODER = KATALOG['tilgaengelighed'].tekster
+SVAR_MULIGHEDER = KATALOG['tilgaengelighed'].svarmuligheder
+POINT_SKALA = {svar: point for point, svar in enumerate(SVAR_MULIGHEDER)}
+KRITISKE_SVAR = ("Alvorlige konsekvenser", "Kritiske konsekvenser")
+
+# Positionen af GDPR-spørgsmålet om følsomme oplysninger, som hæver konsekvensen
+FOELSOMME_OPLYSNINGER = KATALOG.efter_id["G3"].indeks
+
+KRITIKALITET_FORKLARINGER = {
+    "A": "Korte systemafbrud (timer) vil medføre katastrofale følgevirkninger for forretningen som følge af væsentlige og uoprettelige svigt i målopfyldelse eller brud på love og aftaler",
+    "B": "Langvarige system-afbrud (dage) vil medføre alvorlige følgevirkninger for forretningen som følge af væsentlige og uoprettelige svigt i målopnåelse eller brud på love og aftaler.",
+    "C": "Systemafbrud vil medføre væsentlig ulempe, men ikke i væsentlig grad hindre målopfyldelse eller føre til brud på love eller aftaler.",
+    "D": "Systemafbrud medfører mindre ulemper og begrænsede tab eller omkostninger."
+}
+
+# Konsekvens (1-4) som følge af kritikalitetsklassen
+KRITIKALITET_KONSEKVENS = {"A": 4, "B": 3, "C": 2, "D": 1}
+
+# Risikoniveau for hver (sandsynlighed, konsekvens)
+RISIKO_NIVEAUER = {
+    (1, 1): "Lav", (1, 2): "Lav", (1, 3): "Middel", (1, 4): "Høj",
+    (2, 1): "Lav", (2, 2): "Middel", (2, 3): "Høj", (2, 4): "Kritisk",
+    (3, 1): "Middel", (3, 2): "Høj", (3, 3): "Kritisk", (3, 4): "Kritisk",
+    (4, 1): "Høj", (4, 2): "Kritisk", (4, 3): "Kritisk", (4, 4): "Kritisk"
+}
+
+# Tærskeltabeller: (grænser, resultater). Resultatet for en score er
+# resultater[bisect_right(grænser, score)], dvs. ét opslag pr. klassificering.
+KRITIKALITET_TAERSKLER = ([12, 21, 51], ["D", "C", "B", "A"])
+FORTROLIGHED_TAERSKLER = ([1, 3], [
+    "Ingen kritiske fortrolighedsproblemer identificeret",
+    "Der er identificeret nogle fortrolighedsproblemer som bør adresseres",
+    "Der er identificeret kritiske fortrolighedsproblemer som kræver øjeblikkelig handling"
+])
+INTEGRITET_TAERSKLER = ([2, 4], [
+    "Systemet har normal integritetsbehov",
+    "Systemet har forhøjet integritetsbehov - implementer passende kontroller",
+    "Systemet har kritisk integritetsbehov - strenge kontroller er påkrævet"
+])
+ROBUSTHED_TAERSKLER = ([1, 3], [
+    "Systemet har tilstrækkelig robusthed",
+    "Der er identificeret robusthedsudfordringer som bør adresseres",
+    "Der er alvorlige robusthedsudfordringer som kræver øjeblikkelig handling"
+])
+TILGAENGELIGHED_TAERSKLER = ([4, 9], [
+    "Systemet har normal tilgængelighedsbehov",
+    "Systemet har forhøjet tilgængelighedsbehov - implementer nødvendige kontroller",
+    "Systemet har kritisk tilgængelighedsbehov - strenge tilgængelighedskrav skal implementeres"
+])
+
+# Svarene kodet som ét lille heltal pr. spørgsmål i katalogets rækkefølge:
+# Ja/Nej som 1/0 og tilgængelighed som point på skalaen. Signaturen skifter
+# hvis kataloget får andre spørgsmål eller en anden rækkefølge.
+SVAR_KODER = {k.noegle: {svar: (POINT_SKALA[svar] if k.noegle == 'tilgaengelighed' else int(svar == "Ja"))
+                         for svar in k.svarmuligheder}
+              for k in KATALOG}
+KODE_SIGNATUR = format(zlib.crc32(",".join(KATALOG.efter_id).encode()), '08x')
+
+# Fra kode tilbage til et svar der scorer ens; ugyldige svar koder som 0 og
+# scorer også som svaret med kode 0
+SVAR_AFKODNING = {kategori: {kode: svar for svar, kode in reversed(koder.items())}
+                  for kategori, koder in SVAR_KODER.items()}
+
+# Antal svartilstande hvis afledte resultater huskes (se resultater)
+RESULTAT_CACHE = 1024
+
+Resultater = namedtuple('Resultater', 'score kritikalitet forklaring fortrolighed integritet robusthed '
+                                      'tilgaengelighed sandsynlighed konsekvens risikoniveau '
+                                      'handlingsplan opsummering')
+
+SCORE_TAERSKLER = {
+    'kritikalitet': KRITIKALITET_TAERSKLER,
+    'fortrolighed': FORTROLIGHED_TAERSKLER,
+    'integritet': INTEGRITET_TAERSKLER,
+    'robusthed': ROBUSTHED_TAERSKLER,
+    'tilgaengelighed': TILGAENGELIGHED_TAERSKLER
+}
+
+
+def klassificer(taerskler, score):
+    """Slår resultatet for en score op i en tærskeltabel"""
+    graenser, resultater = taerskler
+    return resultater[bisect.bisect_right(graenser, score)]
+
+
+def svar_point(kategori, indeks, svar):
+    """Returnerer de point et enkelt svar bidrager med til kategoriens score"""
+    if kategori == 'tilgaengelighed':
+        return POINT_SKALA.get(svar, 0)
+    if svar != "Ja":
+        return 0
+    return KATALOG[kategori].vaegte[indeks]
+
+
+class LoebendeScore:
+    """Løbende score for én kategori.
+
+    Hvert spørgsmål bidrager med et antal point. Når et svar ændres,
+    justeres totalen kun med forskellen, og resultatet slås op i
+    tærskeltabellen, så en opdatering koster det samme uanset hvor mange
+    spørgsmål kategorien har.
+    """
+
+    def __init__(self, taerskler, antal):
+        self.taerskler = taerskler
+        self.point = [0] * antal
+        self.total = 0
+        self.resultat = klassificer(taerskler, 0)
+
+    def saet(self, indeks, point):
+        """Sætter point for ét spørgsmål og returnerer True hvis resultatet skiftede"""
+        self.total += point - self.point[indeks]
+        self.point[indeks] = point
+        resultat = klassificer(self.taerskler, self.total)
+        skiftet = resultat != self.resultat
+        self.resultat = resultat
+        return skiftet
+
+    def nulstil(self, point):
+        """Sætter alle spørgsmåls point på én gang, fx når en vurdering indlæses"""
+        self.point = list(point)
+        self.total = sum(self.point)
+        self.resultat = klassificer(self.taerskler, self.total)
+
+
+def opret_scorer():
+    """Opretter en løbende score for hver kategori der har et samlet resultat"""
+    return {kategori: LoebendeScore(taerskler, len(KATEGORI_SPOERGSMAAL[kategori]))
+            for kategori, taerskler in SCORE_TAERSKLER.items()}
+
+
+class Besvarelse(dict):
+    """Svarene for alle kategorier som lister i katalogets rækkefølge"""
+
+
+def svar_liste(data, kategori):
+    """Returnerer svarene i en kategori som en liste indekseret som kataloget.
+
+    Filer gemt med spørgsmåls-id bruges direkte; ældre filer uden id slås
+    op på spørgsmålsteksten. Ubesvarede spørgsmål får standardsvaret.
+    """
+    k = KATALOG[kategori]
+    svar = [k.standardsvar] * len(k.spoergsmaal)
+    for noegle, vaerdi in data.get(kategori, {}).items():
+        if isinstance(vaerdi, dict):
+            noegle = vaerdi.get("id") or noegle
+            vaerdi = vaerdi.get("svar")
+        sp = KATALOG.find(kategori, noegle)
+        if sp is not None and vaerdi:
+            svar[sp.indeks] = vaerdi
+    return svar
+
+
+def laes_svar(data):
+    """Omsætter en gemt vurdering til svarlister for alle kategorier"""
+    if isinstance(data, Besvarelse):
+        return data
+    return Besvarelse((kategori, svar_liste(data, kategori)) for kategori in KATEGORIER)
+
+
+def svar_koder(data):
+    """Koder alle svar i en vurdering som bytes, én pr. spørgsmål (se SVAR_KODER)"""
+    svar = laes_svar(data)
+    return bytes(SVAR_KODER[kategori].get(s, 0) for kategori in KATEGORIER for s in svar[kategori])
+
+
+def valider(data):
+    """Kontrollerer at data er en vurdering i gem-format.
+
+    Fejl i strukturen giver ValueError. Ukendte spørgsmål og svar der ikke
+    er en af kategoriens svarmuligheder er ikke fejl; de returneres som en
+    liste med advarsler.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Filen indeholder ikke en vurdering")
+    if not any(noegle in data for noegle in ("system_info",) + KATEGORIER):
+        raise ValueError("Filen indeholder hverken systeminformation eller svar")
+    system_info = data.get("system_info", {})
+    if not isinstance(system_info, dict):
+        raise ValueError("system_info skal være et objekt")
+    for felt, vaerdi in system_info.items():
+        if vaerdi is not None and not isinstance(vaerdi, str):
+            raise ValueError(f"system_info: {felt} skal være tekst")
+
+    advarsler = []
+    for k in KATALOG:
+        svar = data.get(k.noegle, {})
+        if not isinstance(svar, dict):
+            raise ValueError(f"{k.noegle} skal være et objekt")
+        for noegle, vaerdi in svar.items():
+            if isinstance(vaerdi, dict):
+                for felt in ("id", "svar", "kommentar", "uddybende"):
+                    if vaerdi.get(felt) is not None and not isinstance(vaerdi[felt], str):
+                        raise ValueError(f"{k.titel}: {felt} til \"{noegle}\" skal være tekst")
+                sp = KATALOG.find(k.noegle, vaerdi.get("id") or noegle)
+                tekst = vaerdi.get("svar")
+            elif vaerdi is None or isinstance(vaerdi, str):
+                # Gammelt format hvor værdien er selve svaret
+                sp = KATALOG.find(k.noegle, noegle)
+                tekst = vaerdi
+            else:
+                raise ValueError(f"{k.titel}: svaret til \"{noegle}\" har et ukendt format")
+            if sp is None:
+                advarsler.append(f"{k.titel}: ukendt spørgsmål \"{noegle}\"")
+            elif tekst and tekst not in k.svarmuligheder:
+                advarsler.append(f"{k.titel}: ugyldigt svar \"{tekst}\" til {sp.id}")
+    return advarsler
+
+
+def ja_antal(svar, kategori):
+    """Tæller antal "Ja" svar i en kategori"""
+    return svar[kategori].count("Ja")
+
+
+def kritikalitet_klasse(total_score):
+    """Bestemmer kritikalitet og forklaring ud fra en score"""
+    # A: Over 50 point, B: 21-50 point, C: 12-20 point, D: Under 12 point
+    kritikalitet = klassificer(KRITIKALITET_TAERSKLER, total_score)
+    return kritikalitet, KRITIKALITET_FORKLARINGER[kritikalitet]
+
+
+def beregn_kritikalitet(data):
+    """Beregner kritikalitetsscore, klasse og forklaring"""
+    svar = laes_svar(data)['kritikalitet']
+    total_score = sum(vaegt for vaegt, s in zip(POINT_VAEGTE, svar) if s == "Ja")
+    kritikalitet, forklaring = kritikalitet_klasse(total_score)
+    return total_score, kritikalitet, forklaring
+
+
+def fortrolighed_resultat(ja_count):
+    return klassificer(FORTROLIGHED_TAERSKLER, ja_count)
+
+
+def integritet_resultat(ja_count):
+    return klassificer(INTEGRITET_TAERSKLER, ja_count)
+
+
+def robusthed_resultat(ja_count):
+    return klassificer(ROBUSTHED_TAERSKLER, ja_count)
+
+
+def tilgaengelighed_resultat(total_score):
+    return klassificer(TILGAENGELIGHED_TAERSKLER, total_score)
+
+
+def tilgaengelighed_score(data):
+    """Summerer point for alle tidsperioder"""
+    return sum(POINT_SKALA.get(s, 0) for s in laes_svar(data)['tilgaengelighed'])
+
+
+def kritiske_perioder(data):
+    """Returnerer de tidsperioder hvor utilgængelighed har alvorlige eller kritiske konsekvenser"""
+    return [p for p, s in zip(TIDSPERIODER, laes_svar(data)['tilgaengelighed'])
+            if s in KRITISKE_SVAR]
+
+
+def sandsynlighed_og_konsekvens(robusthed_ja, antal_kritiske, kritikalitet, foelsomme, fortrolighed_ja):
+    """Sandsynlighed og konsekvens (begge 1-4) ud fra de tal de afhænger af"""
+    # Sandsynlighed: max +2 fra robusthed og max +1 fra tilgængelighed
+    sandsynlighed = 1 + min(robusthed_ja, 2) + min(antal_kritiske // 2, 1)
+
+    # Konsekvens ud fra klassen, hævet til 3 ved følsomme personoplysninger
+    # eller mindst fire fortrolighedsproblemer
+    konsekvens = KRITIKALITET_KONSEKVENS[kritikalitet]
+    if foelsomme or fortrolighed_ja >= 4:
+        konsekvens = max(konsekvens, 3)
+    return sandsynlighed, konsekvens
+
+
+def beregn_risiko_niveau(data):
+    """Beregner sandsynlighed og konsekvens (begge 1-4) for en vurdering"""
+    r = resultater(data)
+    return r.sandsynlighed, r.konsekvens
+
+
+def risiko_niveau(sandsynlighed, konsekvens):
+    """Slår risikoniveauet op i risikomatrixen"""
+    return RISIKO_NIVEAUER.get((sandsynlighed, konsekvens), "Ukendt")
+
+
+def generer_handlingsplan(data):
+    """Sammensætter handlingsplanen opdelt efter prioritet"""
+    return {prioritet: list(linjer) for prioritet, linjer in resultater(data).handlingsplan.items()}
+
+
+def generer_risiko_opsummering(data):
+    """Sammensætter opsummeringen af de identificerede risici opdelt efter alvorlighed"""
+    return {gruppe: list(risici) for gruppe, risici in resultater(data).opsummering.items()}
+
+
+def resultater(data):
+    """Alle afledte resultater for en vurdering som Resultater.
+
+    Svarkoderne er et billigt fingeraftryk af alt der påvirker resultaterne,
+    så hver svartilstand kun beregnes én gang, uanset om det er rapportfanen,
+    PDF-eksporten eller lageret der spørger. Resultatet deles mellem alle
+    kaldere og må ikke ændres.
+    """
+    return _beregn_resultater(svar_koder(data))
+
+
+@functools.lru_cache(maxsize=RESULTAT_CACHE)
+def _beregn_resultater(koder):
+    svar = Besvarelse()
+    start = 0
+    for k in KATALOG:
+        afkodning = SVAR_AFKODNING[k.noegle]
+        svar[k.noegle] = [afkodning[kode] for kode in koder[start:start + len(k.spoergsmaal)]]
+        start += len(k.spoergsmaal)
+
+    score, kritikalitet, forklaring = beregn_kritikalitet(svar)
+    sandsynlighed, konsekvens = sandsynlighed_og_konsekvens(
+        ja_antal(svar, 'robusthed'), len(kritiske_perioder(svar)), kritikalitet,
+        svar['gdpr'][FOELSOMME_OPLYSNINGER] == "Ja", ja_antal(svar, 'fortrolighed'))
+    fakta = REGLER.fakta(svar, kritikalitet, sandsynlighed, konsekvens)
+    handlingsplan = REGLER.handlingsplan(fakta)
+    opsummering = REGLER.opsummering(fakta, sandsynlighed=sandsynlighed, konsekvens=konsekvens)
+    return Resultater(
+        score, kritikalitet, forklaring,
+        fortrolighed_resultat(ja_antal(svar, 'fortrolighed')),
+        integritet_resultat(ja_antal(svar, 'integritet')),
+        robusthed_resultat(ja_antal(svar, 'robusthed')),
+        tilgaengelighed_resultat(tilgaengelighed_score(svar)),
+        sandsynlighed, konsekvens, risiko_niveau(sandsynlighed, konsekvens),
+        {prioritet: tuple(linjer) for prioritet, linjer in handlingsplan.items()},
+        {gruppe: tuple(risici) for gruppe, risici in opsummering.items()})
+
+
+class Vurderingstilstand:
+    """Den åbne vurderings svar og de tal der afledes af dem.
+
+    Tilstanden holder svarlisterne, en løbende score for hver kategori med
+    et samlet resultat og de tællere som sandsynlighed og konsekvens
+    afhænger af. Et ændret svar justerer kun tællerne, og alt kan læses
+    uden at røre en widget, så beregningerne ikke er bundet til Tk-tråden.
+    """
+
+    def __init__(self, data=None):
+        self.scorer = opret_scorer()
+        self.nulstil(data or {})
+
+    def nulstil(self, data):
+        """Sætter alle svar på én gang, fx når en vurdering indlæses"""
+        svar = laes_svar(data)
+        self.svar = Besvarelse((kategori, list(svar[kategori])) for kategori in KATEGORIER)
+        for kategori, scorer in self.scorer.items():
+            scorer.nulstil(svar_point(kategori, indeks, s) for indeks, s in enumerate(self.svar[kategori]))
+        self.ja = {kategori: ja_antal(self.svar, kategori) for kategori in KATEGORIER}
+        self.kritiske_perioder = len(kritiske_perioder(self.svar))
+
+    def saet(self, kategori, indeks, svar):
+        """Sætter ét svar og returnerer True hvis kategoriens resultat skiftede"""
+        gammelt = self.svar[kategori][indeks]
+        self.svar[kategori][indeks] = svar
+        self.ja[kategori] += (svar == "Ja") - (gammelt == "Ja")
+        if kategori == 'tilgaengelighed':
+            self.kritiske_perioder += (svar in KRITISKE_SVAR) - (gammelt in KRITISKE_SVAR)
+        scorer = self.scorer.get(kategori)
+        if scorer is None:
+            return False
+        return scorer.saet(indeks, svar_point(kategori, indeks, svar))
+
+    def resultat(self, kategori):
+        """Kategoriens samlede resultat, fx kritikalitetsklassen"""
+        return self.scorer[kategori].resultat
+
+    @property
+    def score(self):
+        return self.scorer['kritikalitet'].total
+
+    @property
+    def kritikalitet(self):
+        return self.scorer['kritikalitet'].resultat
+
+    def beregn_risiko_niveau(self):
+        """Sandsynlighed og konsekvens (begge 1-4) ud fra tællerne"""
+        return sandsynlighed_og_konsekvens(
+            self.ja['robusthed'], self.kritiske_perioder, self.kritikalitet,
+            self.svar['gdpr'][FOELSOMME_OPLYSNINGER] == "Ja", self.ja['fortrolighed'])
+
+    def besvarelse(self):
+        """En kopi af svarene, som andre tråde kan bruge mens tilstanden ændres"""
+        return Besvarelse((kategori, list(svar)) for kategori, svar in self.svar.items())
+
+    def resultater(self):
+        """Alle afledte resultater for de aktuelle svar (se resultater)"""
+        return resultater(self.svar)
+
+
+def scor_vurdering(data):
+    """Beregner alle resultater for en gemt vurdering"""
+    r = resultater(data)
+    return {
+        "kritikalitet": {
+            "score": r.score,
+            "klasse": r.kritikalitet,
+            "forklaring": r.forklaring
+        },
+        "fortrolighed": r.fortrolighed,
+        "integritet": r.integritet,
+        "robusthed": r.robusthed,
+        "tilgaengelighed": r.tilgaengelighed,
+        "sandsynlighed": r.sandsynlighed,
+        "konsekvens": r.konsekvens,
+        "risikoniveau": r.risikoniveau
+    }
@@ -0,0 +1,224 @@
+"""Virtualiseret spørgsmålsliste til store kataloger.
+
+Listen opretter kun widgets til de rækker der kan ses, og genbruger dem
+når brugeren scroller. En række bindes til svarvariablen for det spørgsmål
+den aktuelt viser, så svarene ligger i modellen og ikke i widgets.
+
+Rækkernes højde afhænger af hvor mange linjer spørgsmålet ombrydes til og
+af skrifttype og skalering. Hver række måles derfor første gang den vises,
+og højden huskes pr. spørgsmåls-id; rækker der endnu ikke er vist, regnes
+med et skøn.
+"""
+
+import bisect
+import itertools
+import tkinter as tk
+from tkinter import ttk
+
+# Skønnet højde for rækker der endnu ikke er målt
+RAEKKE_HOEJDE = 56
+TEKSTFELT_HOEJDE = 32
+EKSTRA_RAEKKER = 2  # Rækker ud over det synlige område, så scroll ikke blinker
+
+
+class _Raekke:
+    """Widgets for én synlig række, som genbruges til skiftende spørgsmål"""
+
+    def __init__(self, liste):
+        self.liste = liste
+        self.sp = None
+        self.frame = ttk.Frame(liste.canvas)
+
+        top = ttk.Frame(self.frame)
+        top.pack(fill=tk.X)
+        self.label = ttk.Label(top, wraplength=liste.tekst_bredde)
+        self.label.pack(side=tk.LEFT, pady=5)
+
+        radio_frame = ttk.Frame(top)
+        radio_frame.pack(side=tk.RIGHT, padx=30)
+        self.radioer = []
+        for svar in liste.svarmuligheder:
+            radio = liste.radio_klasse(radio_frame, text=svar, value=svar, **liste.radio_stil)
+            radio.pack(side=tk.LEFT, padx=15)
+            self.radioer.append(radio)
+
+        self.kommentar = ttk.Label(top, text="💭", cursor="hand2")
+        self.kommentar.pack(side=tk.RIGHT, padx=(10, 5))
+        self.kommentar.bind('<Button-1>', lambda e: self.liste.ved_kommentar(self.sp))
+
+        self.tekstfelt = ttk.Entry(self.frame, width=80)
+
+        for widget in [self.frame, top, self.label, radio_frame, self.kommentar, self.tekstfelt] + self.radioer:
+            liste.bind_scrollhjul(widget)
+
+        self.vindue = liste.canvas.create_window(0, 0, window=self.frame, anchor="nw", state="hidden")
+
+    def vis(self, sp):
+        """Binder rækken til et nyt spørgsmål"""
+        self.sp = sp
+        var = self.liste.svar_vars[sp.tekst]
+        self.label.config(text=sp.tekst)
+        for radio in self.radioer:
+            radio.config(variable=var, command=lambda sp=sp: self.liste.ved_aendring(sp))
+
+        tekst_var = self.liste.tekstfelt_vars.get(sp.id)
+        if tekst_var is not None:
+            self.tekstfelt.config(textvariable=tekst_var)
+            self.tekstfelt.pack(fill=tk.X, padx=45, pady=(0, 5))
+        else:
+            self.tekstfelt.pack_forget()
+
+
+class VirtuelSpoergsmaalsliste(ttk.Frame):
+    """Scrollbar liste over en kategoris spørgsmål med genbrugte rækker.
+
+    spoergsmaal er katalogets spørgsmål, svar_vars svarvariablerne nøglet
+    på spørgsmålsteksten, og ved_aendring kaldes med spørgsmålet når et
+    svar vælges. tekstfelt_vars kan give et uddybende tekstfelt pr.
+    spørgsmåls-id.
+    """
+
+    def __init__(self, parent, spoergsmaal, svar_vars, svarmuligheder, ved_aendring,
+                 ved_kommentar=None, tekstfelt_vars=None, radio_klasse=tk.Radiobutton,
+                 radio_stil=None, tekst_bredde=750):
+        ttk.Frame.__init__(self, parent)
+        self.spoergsmaal = spoergsmaal
+        self.svar_vars = svar_vars
+        self.svarmuligheder = svarmuligheder
+        self.ved_aendring = ved_aendring
+        self.ved_kommentar = ved_kommentar or (lambda sp: None)
+        self.tekstfelt_vars = tekstfelt_vars or {}
+        self.radio_klasse = radio_klasse
+        self.radio_stil = radio_stil or {}
+        self.tekst_bredde = tekst_bredde
+
+        # Målte rækkehøjder nøglet på spørgsmåls-id og rækkernes y-position
+        self.hoejder = {}
+        self._beregn_positioner()
+
+        self.canvas = tk.Canvas(self, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._scroll)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self._raekker = []
+        self._bredde = 0
+        self._hoejde = 0
+        self.canvas.bind("<Configure>", self._ved_stoerrelse)
+        self.bind_scrollhjul(self.canvas)
+        self._saet_scrollomraade()
+
+    def bind_scrollhjul(self, widget):
+        """Lader musehjulet scrolle listen når markøren er over widget"""
+        widget.bind("<MouseWheel>", lambda e: self._scroll("scroll", -1 if e.delta > 0 else 1, "units"))
+        widget.bind("<Button-4>", lambda e: self._scroll("scroll", -1, "units"))
+        widget.bind("<Button-5>", lambda e: self._scroll("scroll", 1, "units"))
+
+    def _skoen(self, sp):
+        """Højden for et spørgsmål der endnu ikke er målt"""
+        return RAEKKE_HOEJDE + (TEKSTFELT_HOEJDE if sp.id in self.tekstfelt_vars else 0)
+
+    def _beregn_positioner(self):
+        hoejder = (self.hoejder.get(sp.id) or self._skoen(sp) for sp in self.spoergsmaal)
+        self.positioner = [0] + list(itertools.accumulate(hoejder))
+
+    def mindste_hoejde(self):
+        """Den laveste målte række; før der er målt noget bruges skønnet"""
+        return min(self.hoejder.values(), default=RAEKKE_HOEJDE)
+
+    def _saet_scrollomraade(self):
+        self.canvas.configure(scrollregion=(0, 0, self._bredde, self.positioner[-1]),
+                              yscrollincrement=max(self.mindste_hoejde() // 2, 1))
+
+    def _scroll(self, *args):
+        self.canvas.yview(*args)
+        self.opdater()
+
+    def _ved_stoerrelse(self, event):
+        """Tilpasser rækkernes bredde og antal når listen skifter størrelse"""
+        if (event.width, event.height) == (self._bredde, self._hoejde):
+            return
+        if event.width != self._bredde:
+            self._bredde = event.width
+            self._saet_scrollomraade()
+            for raekke in self._raekker:
+                self.canvas.itemconfigure(raekke.vindue, width=self._bredde)
+        if event.height != self._hoejde:
+            self._hoejde = event.height
+            self._tilpas_pulje()
+        self.opdater()
+
+    def _tilpas_pulje(self):
+        """Opretter rækker nok til at fylde det synlige område"""
+        antal = min(len(self.spoergsmaal), self._hoejde // self.mindste_hoejde() + EKSTRA_RAEKKER)
+        while len(self._raekker) < antal:
+            raekke = _Raekke(self)
+            if self._bredde:
+                self.canvas.itemconfigure(raekke.vindue, width=self._bredde)
+            self._raekker.append(raekke)
+        # Rækkernes plads i puljen afhænger af puljens størrelse, så alle bindes på ny
+        for raekke in self._raekker:
+            raekke.sp = None
+
+    def synlige(self):
+        """Returnerer (første, sidste+1) indeks for de rækker der skal vises"""
+        top = self.canvas.canvasy(0)
+        foerste = max(0, bisect.bisect_right(self.positioner, top) - 1)
+        sidste = bisect.bisect_left(self.positioner, top + self._hoejde)
+        sidste = min(len(self.spoergsmaal), sidste + 1, foerste + len(self._raekker))
+        return foerste, sidste
+
+    def opdater(self):
+        """Placerer og binder de synlige rækker; resten af puljen skjules"""
+        if not self._raekker:
+            return
+        # Ændrer nye målinger højderne, flyttes rækkerne, og andre spørgsmål
+        # kan komme ind i billedet, så der placeres igen. Hvert gennemløb
+        # måler kun spørgsmål der ikke er målt før, så løkken slutter
+        while self._placer():
+            pass
+
+    def _placer(self):
+        """Ét gennemløb af opdater; returnerer True hvis en ny måling ændrede positionerne"""
+        foerste, sidste = self.synlige()
+        antal = len(self._raekker)
+        brugte = set()
+        nye = []
+        for indeks in range(foerste, sidste):
+            # Hvert spørgsmål har en fast plads i puljen, så et scroll på én
+            # række kun binder den række der kommer ind i billedet
+            raekke = self._raekker[indeks % antal]
+            brugte.add(indeks % antal)
+            sp = self.spoergsmaal[indeks]
+            if raekke.sp is not sp:
+                raekke.vis(sp)
+                if sp.id not in self.hoejder:
+                    nye.append(raekke)
+            self.canvas.coords(raekke.vindue, 0, self.positioner[indeks])
+            self.canvas.itemconfigure(raekke.vindue, state="normal")
+        for plads, raekke in enumerate(self._raekker):
+            if plads not in brugte:
+                self.canvas.itemconfigure(raekke.vindue, state="hidden")
+                raekke.sp = None
+        return self._maal(nye)
+
+    def _maal(self, raekker):
+        """Måler nyviste rækker og flytter de øvrige hvis et skøn var forkert"""
+        if not raekker:
+            return False
+        mindste = self.mindste_hoejde()
+        # Ombrydningen beregnes først når geometrien er opdateret
+        self.canvas.update_idletasks()
+        aendret = False
+        for raekke in raekker:
+            hoejde = raekke.frame.winfo_reqheight()
+            aendret |= hoejde != (self.hoejder.get(raekke.sp.id) or self._skoen(raekke.sp))
+            self.hoejder[raekke.sp.id] = hoejde
+        if not aendret:
+            return False
+        self._beregn_positioner()
+        self._saet_scrollomraade()
+        if self.mindste_hoejde() < mindste:
+            self._tilpas_pulje()
+        return True